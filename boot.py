@@ -0,0 +1,39 @@
+# Boot setup
+'''
+CircuitPython keeps the CIRCUITPY drive read-only to code.py. The
+schedule cache, the fixture index updates and the team digest (wc_cache,
+wc_fixtures, wc_team) live in sleep memory, which is all a deep sleep
+needs; their copies on the drive, which outlive a power cycle, are a
+best effort that is skipped while the drive is the computer's.
+
+To opt in, copy an empty file named drive_to_code (DRIVE_TO_CODE) to the
+root of the drive. boot.py runs on every reset, deep-sleep wakes
+included, and then remounts the drive writable to code, which makes it
+read-only to the computer. Hold button A while pressing reset to leave
+the drive to the computer for that boot, to copy new files on or delete
+drive_to_code.
+'''
+
+import os
+
+import board
+import storage
+from digitalio import DigitalInOut, Pull
+
+DRIVE_TO_CODE = '/drive_to_code'
+
+
+def _exists(file_name):
+    try:
+        os.stat(file_name)
+        return(True)
+    except OSError:
+        return(False)
+
+
+if _exists(DRIVE_TO_CODE):
+    button = DigitalInOut(board.BUTTON_A)
+    button.switch_to_input(pull=Pull.UP)
+    if button.value:  # not pressed
+        storage.remount('/', readonly=False)
+    button.deinit()
@@ -4,16 +4,17 @@
 Functionality changed. Inverted will show tomorrow's schedule.
 Rightside up now show's today's schedule and automatically changes to Live Game
 when a game is on.
-- Favorite team details when turned vertically.
+- DONE. Favorite team details when turned vertically.
 - IN PROGRESS. Fine-tune refresh times so MagTag only updates at midnight, just before a match, and then at regular intervals during a match.
 - NOT POSSIBLE YET. In-game stats when available.
 - DONE. remove need for Adafruit credentials
-- DONE. (displaying current day schedule instead) Display next game info on Live Match page when no game is being played.
+- DONE. Display next game info on Live Match page when no game is being played.
 '''
 
 # built-in modules
 import gc
 import time as atime
+import asyncio
 import alarm
 import random
 import rtc
@@ -32,10 +33,8 @@ import ipaddress
 
 # External Modules
 # Time
-from adafruit_bitmap_font import bitmap_font
 from adafruit_display_text import bitmap_label as label
 from adafruit_display_shapes.rect import Rect
-# import adafruit_ntp
 from adafruit_datetime import datetime, date, time, timedelta
 # Network
 import adafruit_requests as aio_requests
@@ -45,6 +44,36 @@ from adafruit_io.adafruit_io import IO_HTTP
 # Hardware
 import adafruit_lis3dh
 import neopixel
+import pwmio
+# Local modules
+import wc_stream
+import wc_match
+import wc_events
+import wc_alert
+import wc_motion
+import wc_power
+import wc_nextmatch
+import wc_team
+from wc_view import LiveMatchView, NextMatchView, ScheduleView, TeamView
+from wc_poll import PollingClient
+import wc_wake
+import wc_cache
+import wc_fetch
+import wc_fixtures
+from wc_time import DAY
+from wc_format import schedule_text
+import wc_wifi
+import wc_fonts
+from wc_render import Renderer
+import wc_ledger
+import wc_clock
+import wc_timesource
+
+# Wake ledger: times each phase of this wake.
+# Type 'ledger' on the serial console at startup to dump it as CSV.
+ledger = wc_ledger.Ledger()
+if supervisor.runtime.serial_bytes_available and input().strip() == 'ledger':
+    wc_ledger.dump(alarm.sleep_memory)
 
 # See sample secrets.py file for details.
 from secrets import secrets
@@ -55,6 +84,8 @@ from secrets import secrets
 # WiFi Credentials
 SSID = secrets["ssid"]
 PASSWORD = secrets["password"]
+# Reuse the last IP configuration instead of waiting for DHCP.
+WIFI_REUSE_IP = True
 
 # Change these to meet your location
 TIME_ZONE_NAME = 'PST'
@@ -63,10 +94,40 @@ TIME_ZONE_OFFSET = -8
 # Refresh times
 GAME_ON_REFRESH = 12  # in seconds (10 sec minimum. API rate limit is 10.
 GAME_OFF_REFRESH = (10 * 60)  # in seconds
+# During a match the accelerometer is read this often; turning the MagTag
+# over shows tomorrow's schedule until it is turned back.
+ORIENTATION_CHECK = 0.5  # in seconds
+ORIENTATION_THRESHOLD = 4.9  # m/s^2, half a g
+# Turning the MagTag over always wakes it; with this a tap does too (the
+# accelerometer then samples at 100 Hz in deep sleep instead of 10 Hz).
+TAP_TO_REFRESH = True
+
+# Battery governor: when the battery will not last through the rest of
+# today's matches, follow them by deep-sleep wakes instead of the live
+# loop, and stretch the other wakes (see wc_power).
+BATTERY_GOVERNOR = True
+GOVERNOR_CHECK = 10 * 60  # seconds between checks in the live loop
+
+# With no match on, the live side shows the next match and a countdown to
+# it instead of today's schedule. The countdown goes down in steps of
+# COUNTDOWN_STEP in its last two hours; the board wakes to redraw it.
+NEXT_MATCH_PANEL = True
+COUNTDOWN_STEP = 15 * 60  # in seconds
+
+# Standing the MagTag on its side shows this team (FIFA code): its
+# results, group table and next fixture, kept up to date from the
+# schedules the other views fetch (wc_team). None turns it off.
+FAVORITE_TEAM = 'USA'
 
 # For future, change to timezone of cup host
 HOST_TIME = 3
 
+# Data sources. Point at host/wc_server.py to test against a local stand-in.
+WORLD_CUP = 'https://worldcupjson.net/'
+AIO_TIME = 'https://io.adafruit.com/api/v2/time/seconds'  # POSIX/Unix timestamp
+NTP_SERVER = 'pool.ntp.org'  # or a LAN NTP server, or host/ntp_server.py
+NTP_PORT = 123
+
 
 # Configurations ------
 
@@ -81,18 +142,24 @@ NP_POWER.switch_to_output(True)  # OFF = True, ON = False
 lis = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
 voltage_pin = AnalogIn(board.VOLTAGE_MONITOR)
 pixels = neopixel.NeoPixel(board.NEOPIXEL, 4, brightness=1, auto_write=True)
+SPEAKER_POWER = DigitalInOut(board.SPEAKER_ENABLE)
+SPEAKER_POWER.switch_to_output(False)  # False = OFF, True = ON
+speaker = pwmio.PWMOut(board.SPEAKER, duty_cycle=0, frequency=440, variable_frequency=True)
+
+# Goal and card alerts play as an asyncio task beside the live loop.
+alerts = wc_alert.AlertEngine(pixels, speaker, SPEAKER_POWER)
+
+# The RTC drifts in deep sleep; clock.now() corrects for the measured drift.
+clock = wc_clock.Clock(alarm.sleep_memory, rtc.RTC())
+
+# The tournament's fixtures on the drive (host/build_fixtures.py), or None.
+fixtures = wc_fixtures.open_index()
+
+# The favorite team's digest, from sleep memory or the drive.
+digest = wc_team.load(alarm.sleep_memory, FAVORITE_TEAM) if FAVORITE_TEAM else None
 
 
 # Useful functions ---------
-# a function to facilitate audio signals
-def sound_signal(duration=0, frequency=0, time_off=0):
-    #TODO Add beep to signal a goal.
-    # 
-    # board.SPEAKER
-    # board.SPEAKER_ENABLE
-    # SPEAKER_POWER.switch_to_output(False)  # Flase = ON, True = OFF
-    return
-    
 # flashing LEDs routine
 def np_signal(color=0x220000, flashes=3, interval=.15, time_off=1):
     # NP_POWER.switch_to_output(False)  # Flase = ON, True = OFF
@@ -102,17 +169,13 @@ def np_signal(color=0x220000, flashes=3, interval=.15, time_off=1):
         atime.sleep(interval)
         pixels.fill(0)
 
+# Goal and card alerts only queue their pattern; it plays while the
+# live loop waits for the next poll.
 def update_alert():
-    #TODO trigger an audo alert on goal change.
-    # sound_signal()
-    # Blink LEDs to signal a change in goals.
-    colors = [0x110900, 0x001111, 0x110011]
-    flashes = 1
-    interval = 0.5
-    time_off = 0.1
-    for i in range(len(colors)):
-        np_signal(color=colors[i], flashes=flashes,
-                  interval=interval, time_off=time_off)
+    alerts.goal()
+
+def card_alert(red=False):
+    alerts.card(red)
         
         
 def goal_simulator():  #  A simple function to simulate a new goal when testing.
@@ -139,7 +202,11 @@ def update_data():
 
     # Battery Voltage
     # battery = voltage_pin.value
-    battery = ((voltage_pin.value / 65535.0) * 3.3 * 2) * 1
+    # Oversampled, and kept in the governor's history while the radio is
+    # still off (once the clock has been set).
+    battery = wc_power.measure(voltage_pin)
+    if clock.synced_at is not None:
+        wc_power.record(alarm.sleep_memory, clock.now(), battery)
     
     # On-board accelerometer
     x, y, z = lis.acceleration
@@ -147,15 +214,24 @@ def update_data():
     return(x, y, z, battery)
 
 
+# Battery governor level for the rest of the day. spent_mah is what this
+# wake has used so far.
+def governor_level(kickoffs, spent_mah=0):
+    if not BATTERY_GOVERNOR:
+        return(wc_power.NORMAL)
+    return(wc_power.plan(alarm.sleep_memory, clock.now(), kickoffs, spent_mah))
+
+
 # Time Functions ------------------
 
 # Adafruit delivers time based on user's IP.
 # This function helps move time between time zones.
 def local_time(hours = 0, minutes = 0, seconds = 0):    
-    dt_current_time = datetime.fromtimestamp(atime.time()) # update the datetime object
+    now = clock.now()
+    dt_current_time = datetime.fromtimestamp(now) # update the datetime object
     show_date = dt_current_time + timedelta(hours = hours, minutes = minutes, seconds = seconds) 
     times = {
-        'ts' : atime.time(),
+        'ts' : now,
         'iso' : show_date.isoformat(),
         'ctime' : show_date.ctime(),
         'date' : show_date.date(),
@@ -176,24 +252,23 @@ def NETWORK_FUNCTIONS():
 
 def wifi_connect(choice=0):
     # Connect to local network
-    print("\nAvailable WiFi networks:")
-
-    for network in wifi.radio.start_scanning_networks():
-        print("  {:>18}   RSSI: {:<4}  Channel: {:<2}".format(
-            str(network.ssid, "utf-8"), network.rssi, network.channel ))
-    wifi.radio.stop_scanning_networks()
-
-    while not wifi.radio.ipv4_address:
-        try:
-            print("\nConnecting to {}".format(SSID))
-            wifi.radio.connect(SSID)
-            # wifi.radio.connect(SSID, PASSWORD)
-        except ConnectionError as e:
-            print("Connection Error: {}".format(e))
-            print("Retrying in 10 seconds")
+    # Goes straight to the last good access point kept in sleep memory,
+    # scanning only after repeated failures.
+    ledger.phase('wifi')
+    ledger.radio(True)
+    try:
+        wc_wifi.connect(wifi.radio, SSID, mem=alarm.sleep_memory, reuse_ip=WIFI_REUSE_IP)
+        # wc_wifi.connect(wifi.radio, SSID, PASSWORD, mem=alarm.sleep_memory, reuse_ip=WIFI_REUSE_IP)
+    except ConnectionError as e:
+        print("Connection Error: {}".format(e))
+        print("Retrying in {} seconds".format(GAME_OFF_REFRESH))
+        ledger.save(alarm.sleep_memory)
+        time_alarm = alarm.time.TimeAlarm(monotonic_time=atime.monotonic() + GAME_OFF_REFRESH)
+        motion_alarm = wc_motion.arm(lis, board.ACCELEROMETER_INTERRUPT, alarm.sleep_memory,
+                                     taps=TAP_TO_REFRESH, sideways=digest is not None)
+        alarm.exit_and_deep_sleep_until_alarms(time_alarm, motion_alarm)
     print("Connected!\n")
     np_signal(color=0x000100, flashes=3, interval=0.15, time_off=0.3)
-    atime.sleep(10)
     gc.collect()
 
 
@@ -239,35 +314,41 @@ def TEXT_FORMAT():
     return
 
 # This function GETs today's schedule (GMT times).
-def world_cup(hours = 0):
-    if wifi.radio.ipv4_gateway is None:
-        try:
-            import os
-            with open("wc_test_data.json", "r") as fp:
-                x = fp.read()
-                match_schedule = json.loads(x)
-                
-        except OSError as e:
-            raise Exception("Could not read text file.")
+# fresh=True fetches again even if this wake already has it.
+def world_cup(hours = 0, fresh = False):
+    ledger.phase('schedule')
+    schedule_day = (clock.now() + hours * 3600) // DAY
+    
+    if wifi.radio.ipv4_gateway is not None:
+        # One request covers today and tomorrow; a fresh copy kept
+        # through deep sleep saves even that.
+        match_schedule = planner.matches(schedule_day, clock.now(), fresh)
+        page_title, the_schedule, kickoffs = wc_schedule(match_schedule, hours)
     
-        page_title, the_schedule = wc_schedule(match_schedule)
-        
     else:
-        GET_DATE = ((local_time(hours=hours))['date'])
-        WORLD_CUP = 'https://worldcupjson.net/'
-        API_PARAMETERS = 'start_date={0}&end_date={0}'.format(GET_DATE)
+        cached_schedule = wc_cache.fresh_matches(
+            alarm.sleep_memory, schedule_day, clock.now(), TIME_ZONE_OFFSET * 3600)
+        if cached_schedule is None:
+            cached_schedule = wc_fixtures.future_matches(
+                fixtures, schedule_day, clock.now(), TIME_ZONE_OFFSET * 3600)
+        if cached_schedule is not None:
+            print('Using cached schedule.\n')
+            page_title, the_schedule, kickoffs = wc_schedule(cached_schedule, hours)
         
-        # Fetching World Cup Today
-        json_header = {"Accept": "application/json"}
-        print("GETting schedule from:\n{}matches?{}".format(WORLD_CUP, API_PARAMETERS))
-        match_schedule = requests.get("{}matches?{}".format(WORLD_CUP, API_PARAMETERS), headers = json_header)
-        # matches_today.close()
-        match_schedule = match_schedule.json()
-
-        page_title, the_schedule = wc_schedule(match_schedule, hours)
+        else:
+            try:
+                import os
+                with open("wc_test_data.json", "r") as fp:
+                    x = fp.read()
+                    match_schedule = json.loads(x)
+                    
+            except OSError as e:
+                raise Exception("Could not read text file.")
+        
+            page_title, the_schedule, kickoffs = wc_schedule(match_schedule)
         
     game_info = True
-    return(game_info, the_schedule, page_title)
+    return(game_info, the_schedule, page_title, kickoffs)
 
 # Function to build schedule text for MagTag display
 def wc_schedule(match_schedule, adjust_hours = 0):
@@ -281,154 +362,67 @@ def wc_schedule(match_schedule, adjust_hours = 0):
     else:
         tod_morrow = 'Tomorrow'
     
-    the_schedule = ''
     page_title = ('{}: {}\n'.format(tod_morrow, title_date))
-
     
-    for i in match_schedule:
-        game_time = (i['datetime'])
-        game_time = (game_time[0:19])
-        game_time = (datetime.fromisoformat(game_time) +  # Game time as local time.
-               timedelta(hours = TIME_ZONE_OFFSET))
-
-        schedule_items = [
-            i['away_team']['name'],
-            i['away_team']['goals'],
-            i['home_team']['name'],
-            i['home_team']['goals']
-            ]
-        
-        # I gotta learn List Comprehension.
-        # https://docs.python.org/3/tutorial/datastructures.html?highlight=list%20comprehension#list-comprehensions
-        schedule_items = ['' if v is None else v for v in schedule_items]
-        
-        # home_team_goals = str(i['home_team']['goals'])
-        
-        the_schedule = the_schedule + ('{:<5} {:>11} ({}) v ({}) {:<0}\n'.format(
-            str(game_time.time())[0:5],
-            schedule_items[0],
-            schedule_items[1],
-            schedule_items[3],
-            schedule_items[2],
-            ))
+    # Rows with game times as local time, built in one pass.
+    # kickoffs are (kickoff as device time, status) for the wake planner.
+    the_schedule, kickoffs = schedule_text(match_schedule, TIME_ZONE_OFFSET)
     
-    return(page_title, the_schedule)
+    return(page_title, the_schedule, kickoffs)
+
 
 
+# What the live view reads from /matches/current, and the event feed
+# that hands out each goal, card and substitution once.
+LIVE_PATHS = wc_stream.CURRENT_MATCH_PATHS + wc_events.EVENT_PATHS
+feed = wc_events.EventFeed()
+
 
 # Function GETs current game stats.
-def wc_current(old_score):
+# Returns (state, events): the current match's MatchState, False when no
+# match is on, or None when nothing changed since the last poll, and the
+# match's events that are new since the last poll.
+def wc_current():
+    ledger.phase('current')
     
     if wifi.radio.ipv4_gateway is None:
         import os
         try:
-            with open("wc_current_match.json", "r") as fp:
-                x = fp.read()
-                # parse x:
-                current_match = json.loads(x)              
+            # Only the fields wc_match and wc_events read are kept.
+            current_match = wc_stream.select_file(
+                "wc_current_match.json", LIVE_PATHS)
         except OSError as e:
             raise Exception("Could not read text file.")
     
-        game_stats = match_stats(current_match, old_score)
+        if current_match:
+            home = current_match[0]['home_team']
+            home['goals'] = (home.get('goals') or 0) + goal_simulator()
 
         print('Using test data.\n')
 
     else:
-        WORLD_CUP = 'https://worldcupjson.net/'
-        
         # Fetch World Cup Today
         json_header = {"Accept": "application/json"}
         print("{}matches/current\n".format(WORLD_CUP))
-        current_match = requests.get("{}matches/current".format(WORLD_CUP), headers = json_header)
-        
-        game_stats = match_stats(current_match.json(), old_score)
-        
-    return(game_stats)
-
-
-# This function parses information on the current match.
-def match_stats(current_match, old_score):
-
-    try:
-        # Parse current_match
-        match_details = {
-            # Match Title
-            "away_team" : current_match[0]['home_team']['name'], 
-            "home_team" : current_match[0]['away_team']['name'],      
-            "away_team_goals" : current_match[0]['home_team']['goals'],
-            "home_team_goals" : current_match[0]['away_team']['goals'],
-            # General Info
-            "match_time" : current_match[0]['time'],
-            "location" : current_match[0]['location'],
-            "stage_name" : current_match[0]['stage_name'],
-            # Team Info
-            "away_tactics" : current_match[0]['home_team_lineup']['tactics'],
-            "away_penalties" : current_match[0]['home_team']['penalties'],
-            "home_tactics" : current_match[0]['away_team_lineup']['tactics'],
-            "home_penalties" : current_match[0]['away_team']['penalties']
-            }
-            
-            
-        if wifi.radio.ipv4_gateway is None:
-            add_goal = goal_simulator()
-            match_details['away_team_goals'] = (match_details['away_team_goals'] + add_goal)
-                
-        new_score = (match_details['away_team_goals'], match_details['home_team_goals'])
-        
-        if new_score == old_score:
-            new_goal = False
-        else:
-            new_goal = True
+        # Conditional GET, parsed straight from the socket keeping only
+        # what wc_match and wc_events read. None when nothing changed.
+        current_match = poller.get("{}matches/current".format(WORLD_CUP),
+                                   LIVE_PATHS, headers = json_header)
+        print(poller.stats())
+        if current_match is None:
+            return(None, [])
         
-        # Host Time
-        local_time_offset = (-1 * TIME_ZONE_OFFSET + HOST_TIME)
-        host_hours = (local_time(hours = local_time_offset))
-        host_hours = str(host_hours['time'])[0:5]
-        location = ('{!s}'.format(
-            match_details['location'], host_hours))
-              
-        # Create texts
-        game_info = ('{:>7}{:^29}{:<12}'.format(
-            match_details['match_time'], match_details['stage_name'], location))
-        
-        match_title = ('{1:>12}{0:^6}{2:<12}'.format(
-            '', match_details['away_team'], match_details['home_team']))
-        
-        if new_goal:
-            game_score = ('{1:^7d}{0:^15}{2:^7d}'.format(
-                'Gol', match_details['away_team_goals'], match_details['home_team_goals']))
-        if not new_goal:
-            game_score = ('{1:^7d}{0:^15}{2:^7d}'.format(
-                '---', match_details['away_team_goals'], match_details['home_team_goals']))
-            
-        game_tactics = ('{:>2}{:^21}{:<2}'.format(
-            match_details['away_tactics'], 'Tac', match_details['home_tactics']))
-        
-        game_penalties = ('{:^7d}{:^21}{:^7d}'.format(
-            match_details['away_penalties'], 'Pen', match_details['home_penalties']))
-        
-        old_score = new_score
-
+    ledger.phase('stats')
+    if not current_match:
+        # No match on: the next-match panel (wc_nextmatch) is shown once
+        # the live loop has ended, from fixtures already on the board.
+        return(False, [])
     
-    except:
-        #TODO Determine next match and display basic stats.
-        # - GET list of upcoming matches
-        # - Convert times to timestamp for easy comparisons
-        # - Compare each game-time to local-time
-        # - Eliminate times before local-time
-        # - Select game with lowest of remaining time
-        # - Parse match data to display: Home & Away teams, time of match and time till match.
-        
-        game_info = False
-        match_title = ''
-        game_score = ''
-        game_tactics = ''
-        game_penalties = ''
-        
-    
-    print('match_stats Old Goals: {}'.format(old_score))
-    game_stats =  (game_info, match_title, game_score, game_tactics, game_penalties, old_score)    
-    return(game_stats)
+    state = wc_match.from_json(current_match[0])
+    events = [e for e in feed.update(current_match) if e.match_id == state.match_id]
+    for event in events:
+        print('event: {}'.format(event.text()))
+    return(state, events)
 
 
 
@@ -445,23 +439,16 @@ display.show(main_group)
 
 
 # Font definitions
-SPARTAN_LIGHT = bitmap_font.load_font("fonts/LeagueSpartan-Light.bdf")
-SPARTAN_BOLD_16 = bitmap_font.load_font("fonts/LeagueSpartan-Bold-16.bdf")
-HELVETICA_BOLD_16 = bitmap_font.load_font("fonts/Helvetica-Bold-16.bdf")
-JUNCTION_24 = bitmap_font.load_font("fonts/Junction-regular-24.bdf")
+# Names of files in fonts/. Each is loaded by wc_fonts the first time a
+# screen uses it, from the packed .pbf when there is one.
+SPARTAN_LIGHT = 'LeagueSpartan-Light'
+SPARTAN_BOLD_16 = 'LeagueSpartan-Bold-16'
+HELVETICA_BOLD_16 = 'Helvetica-Bold-16'
 TERMINAL_FONT = terminalio.FONT 
 
 
-def try_refresh():
-    try:
-        board.DISPLAY.refresh()
-    except RuntimeError as too_soon_error:
-        # catch refresh too soon
-        print(too_soon_error)
-        print("waiting before retry refresh()")
-        time.sleep(10)
-        board.DISPLAY.refresh()
-        
+renderer = Renderer(display)
+
 
 # Create labels
 # https://docs.circuitpython.org/projects/display_text/en/latest/api.html#adafruit-display-text
@@ -479,22 +466,67 @@ def set_page_footer():
     return(page_footer)
 
 
+# The favorite team's page (title, body, footer) from its digest, which
+# drops a kickoff gone by and takes what it lacks from the fixture index.
+def team_page():
+    if digest.update([], clock.now() - TIME_ZONE_OFFSET * 3600, fixtures):
+        wc_team.save(alarm.sleep_memory, digest)
+    page_title, page_body = digest.texts(TIME_ZONE_OFFSET * 3600)
+    return(page_title, page_body, 'Bat: {:0.1f}v'.format(battery))
+
+
+# Portrait, the right way up on whichever side the MagTag stands.
+def team_rotation(x):
+    return(0 if x > 0 else 180)
+
+
 # ------ Main Program ------
 
 def MAIN_PROGRAM():
     return
 
+x, y, z, battery = update_data()
+
+# On its side (x past y) with a favorite team set: the team's page, from
+# its digest and today's schedule.
+sideways = digest is not None and abs(x) > abs(y)
+
+# Cached Schedule
+# When the schedule for the selected view was cached on an earlier wake
+# and is still fresh, the radio can stay off for this whole wake. So it
+# can when the fixture index has the whole day and none of its matches
+# has started, once the clock has been set: after a power-on only a sync
+# tells what day it is.
+schedule_hours = 0 if y > 0 or sideways else 24
+schedule_day = (clock.now() + schedule_hours * 3600) // DAY
+use_cache = (wc_cache.fresh_matches(
+    alarm.sleep_memory, schedule_day, clock.now(), TIME_ZONE_OFFSET * 3600) is not None
+    or clock.synced_at is not None and wc_fixtures.future_matches(
+        fixtures, schedule_day, clock.now(), TIME_ZONE_OFFSET * 3600) is not None)
+
 # Comment out for test mode and use cached JSON files.
 # choice= option to choose what SSID to connect with.
-wifi_connect(choice=0)
+if not use_cache:
+    wifi_connect(choice=0)
 
-x, y, z, battery = update_data()
 print("My gateway is {}".format(wifi.radio.ipv4_gateway))
 print("My IP address is {}\n".format(wifi.radio.ipv4_address))
 
 print('Battery: {}'.format(battery))
 print('x: {} y: {} z: {}\n'.format(x, y, z))
 
+last_plan = wc_wake.load_plan(alarm.sleep_memory)
+if last_plan:
+    print('Woke for: {} (planned for {})\n'.format(last_plan[1], last_plan[0]))
+    ledger.reason = last_plan[1]
+
+# Turned over or tapped in deep sleep. The view follows the orientation
+# as on any wake, from the cached schedule when it is fresh.
+motion = wc_motion.woke_by(lis, alarm.sleep_memory, alarm.wake_alarm)
+if motion:
+    print('Woke by a {}\n'.format(motion))
+    ledger.reason = motion
+
 
 # WiFi Setup ------------------
 
@@ -507,16 +539,9 @@ else:  # use live data
     
     pool = socketpool.SocketPool(wifi.radio)
     requests = aio_requests.Session(pool, ssl.create_default_context())
-    
-    # For using NTP instead of AdafruitIO
-    '''
-    # set RTC clock
-    ntp = adafruit_ntp.NTP(pool, tz_offset=TIME_ZONE_OFFSET)
-    rtc.RTC().datetime = ntp.datetime
-    r = rtc.RTC()
-    now_time = local_time()
-    print('The current datetime is: {}, ({})'.format(now_time['iso'], ts()))
-    '''
+    poller = PollingClient(requests)
+    planner = wc_fetch.FetchPlanner(requests, WORLD_CUP, alarm.sleep_memory, TIME_ZONE_OFFSET * 3600,
+                                    index=fixtures, digest=digest)
     
     # For storing data on AdafruitIO via MQTT
     '''
@@ -555,18 +580,25 @@ else:  # use live data
     print('The current datetime is: {}, ({})'.format(now_time['iso'], ts()))
     '''
     
-    # AIO Time
-    # Get time from Adafruit public time server. Time can fetched as a regular GET
-    # request. This eliminates need for dedicated NTP library.
-    AIO_TIME = 'https://io.adafruit.com/api/v2/time/seconds'  # POSIX/Unix timestamp
-    text_header = {"Accept": "application/text"}
-    print("Fetching time from Adafruit IO...\n")
-    
-    # Set time using io.adafruit.com time feed
-    time_from_aio = requests.get('{}'.format(AIO_TIME), headers = text_header)
-    time_from_aio = (datetime.fromtimestamp(int(time_from_aio.text)))
-    time_from_aio = time_from_aio + timedelta(hours = TIME_ZONE_OFFSET)
-    rtc.RTC().datetime = time_from_aio.timetuple()
+    # Time
+    # One SNTP exchange over UDP is far cheaper than a TLS session, so NTP
+    # goes first; the Adafruit IO time feed over HTTPS is the fallback.
+    # Only when the clock may have drifted too far, or a kickoff is near.
+    planned_kickoffs = [kickoff for kickoff, status in last_plan[2]] if last_plan else []
+    if clock.needs_sync(planned_kickoffs):
+        print("Fetching time...\n")
+        ledger.phase('time')
+        
+        time_sources = [wc_timesource.SNTPSource(pool, NTP_SERVER, NTP_PORT)]
+        time_sources.append(wc_timesource.HTTPTimeSource(requests, AIO_TIME))
+        utc, time_source = wc_timesource.fetch_time(time_sources)
+        wc_timesource.report(time_sources)
+        if utc is not None:
+            offset = clock.sync(utc + TIME_ZONE_OFFSET * 3600)
+            print('Clock was off by {}s, drift {:0.0f} ppm ({})\n'.format(
+                offset, clock.drift * 1000000, time_source.name))
+    else:
+        print('Clock within {:0.1f}s, skipping the time fetch\n'.format(clock.error()))
     
     # Get local time
     now_time = (local_time())['time']
@@ -578,164 +610,261 @@ else:  # use live data
 # Rotation determines what screen to display and refresh_time.
 # Logic to display game stats when a game is live.
 
-#TODO a vertical orientation to display favorite team details.
-
-if y > 0:
-    def game_is_running():
-        return
-    inverted = False  # Display live score
-    DISPLAY_ROTATION = 270
-    display.rotation = DISPLAY_ROTATION
-    
-    refresh_time = GAME_ON_REFRESH  # seconds
-    # refresh_time = 20  # seconds
-    old_game_stats = ('FIRST RUN', '','')
-    old_score = (0, 0)
+# Live Match tasks
+# The poller polls every refresh_time seconds on a fixed cadence and
+# updates the live view. Beside it run three tasks: the orientation
+# watcher, which shows tomorrow's schedule the moment the MagTag is turned
+# over (and the match again when it is turned back), from the schedule
+# already in memory, or the favorite team's page on its side; the
+# renderer, which refreshes as soon as the panel allows, once for
+# everything that changed while it waited; and the alert task. Returns (game_info, live_view, level) once no match is on, or with
+# the live view still up when the battery governor wants the match
+# followed by wakes from here on (level). Below wc_power.NORMAL the loop
+# is such a wake and polls once; at MINIMAL only teams and score are shown.
+
+# What the live loop shows, 'live', 'schedule' or 'team', and the views.
+screen = {'view': 'live', 'live': None, 'schedule': None, 'team': None}
+schedule_group = displayio.Group()
+team_group = displayio.Group()
+
+
+def show_view(view):
+    screen['view'] = view
+    if view == 'live':
+        display.show(main_group)
+        display.rotation = 270
+    elif view == 'team':
+        ledger.phase('labels')
+        if screen['team'] is None:
+            screen['team'] = TeamView(team_group, (wc_fonts.font(SPARTAN_BOLD_16), TERMINAL_FONT))
+        screen['team'].update(*team_page())
+        display.show(team_group)
+        display.rotation = team_rotation(lis.acceleration[0])
+        ledger.phase('wait')
+    else:
+        ledger.phase('labels')
+        if screen['schedule'] is None:
+            screen['schedule'] = ScheduleView(schedule_group, (
+                wc_fonts.font(SPARTAN_BOLD_16), TERMINAL_FONT))
+        game_info, the_schedule, page_title, kickoffs = world_cup(hours = 24)
+        screen['schedule'].update(page_title, the_schedule, 'Bat: {:0.1f}v'.format(battery))
+        display.show(schedule_group)
+        display.rotation = 90
+        ledger.phase('wait')
+    renderer.invalidate_all()
+
+
+# Reads the accelerometer every ORIENTATION_CHECK seconds. A turn counts
+# once y (x, on its side) is past half a g the other way, so a MagTag
+# lying flat stays put.
+async def watch_orientation():
+    while True:
+        await asyncio.sleep(ORIENTATION_CHECK)
+        x, y, z = lis.acceleration
+        if digest is not None and abs(x) > ORIENTATION_THRESHOLD and screen['view'] != 'team':
+            print('Turned on its side, showing {}\n'.format(FAVORITE_TEAM))
+            show_view('team')
+        elif y < -ORIENTATION_THRESHOLD and screen['view'] != 'schedule':
+            print('Turned over, showing tomorrow\'s schedule\n')
+            show_view('schedule')
+        elif y > ORIENTATION_THRESHOLD and screen['view'] != 'live':
+            print('Turned upright, showing the match\n')
+            show_view('live')
+
+
+async def game_on(kickoffs, level = wc_power.NORMAL):
+    once = level != wc_power.NORMAL
+    score_only = level == wc_power.MINIMAL
+    tasks = [asyncio.create_task(alerts.run()),
+             asyncio.create_task(renderer.run()),
+             asyncio.create_task(watch_orientation())]
+    old_state = None
+    old_gol = False
+    game_info = False
+    
+    # Poll cadence: how far the time between poll starts strayed from
+    # refresh_time, the jitter a blocking alert used to add.
+    next_poll = atime.monotonic()
+    last_start = None
+    jitter = 0
+    polls = 0
+    last_check = next_poll
     
     while True:        
-        game_stats = wc_current(old_score)
-        # game_stats = (game_info, match_title, game_score, game_tactics, game_penalties, old_goals)
+        started = atime.monotonic()
+        if last_start is not None:
+            jitter = max(jitter, abs(started - last_start - refresh_time))
+        last_start = started
+        polls += 1
         
-        print('{}\n\n{}\n\n{}\n\n'.format(game_stats[0], game_stats, old_game_stats))
-        
-        if game_stats[2] == old_game_stats[2]:
-            gol = False
-            print('no new gol\n')
-        else:
-            print('NEW gol!\n')
-            gol = True
+        state, events = wc_current()
         
-        if game_stats[0] == False:
-            game_info = game_stats[0]
+        if state is False:
+            game_info = False
             break
         
-        if game_stats == old_game_stats:
-            pass
+        if state is None:  # nothing changed since the last poll
+            print('no changes, next update in {}s\n'.format(refresh_time))
         
         else:
-        
-            game_info = game_stats[0]
-            match_title = game_stats[1]
-            game_score = game_stats[2]
-            game_tactics = game_stats[3]
-            game_penalties = game_stats[4]
-            
-            old_game_stats = game_stats
-            
-            print(game_info)
-            print(match_title)
-            print(game_score)
-            print(game_tactics)
-            print(game_penalties)
-            
-            page_footer = '{:0.1f}v'.format(battery)
-            print(page_footer)
-            
-            # Label Setup
-            
-            # Make the background white
-            rect = Rect(0, 0, WIDTH, HEIGHT, fill=0xFFFFFF, outline=0xFFFFFF)
-
-            game_page_title = label.Label(
-                SPARTAN_BOLD_16,
-                text=match_title,
-                color=0x000000,
-                anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 - 46),
-                anchor_point = (0.5, 0.5),
-                base_alignment=True,
-            )
-
-            game_page_body1 = label.Label(
-                HELVETICA_BOLD_16,
-                scale = 1,
-                text=game_score,
-                color=0x000000,
-                anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 - 26),
-                anchor_point = (0.5, 0.5),
-                base_alignment=True,
-            )
-
-            game_page_body2 = label.Label(
-                SPARTAN_LIGHT,
-                scale = 1,
-                text=game_tactics,
-                color=0x000000,
-                anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 - 8),
-                anchor_point = (0.5, 0.5),
-                base_alignment=True,
-            )
-
-            game_page_body3 = label.Label(
-                SPARTAN_LIGHT,
-                scale = 1,
-                text=game_penalties,
-                color=0x000000,
-                anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 + 10),
-                anchor_point = (0.5, 0.5),
-                base_alignment=True,
-            )
-            '''
-            WIDTH = 296
-            HEIGHT = 128
-            '''
-            
-            game_page_body0 = label.Label(
-                TERMINAL_FONT,
-                scale = 1,
-                text=game_info,
-                color=0x000000,
-                anchor_point = (0.5, 1),
-                anchored_position = (WIDTH * 0.5 - 0, HEIGHT - 2),
-                base_alignment=True,
-            )
-            
-            game_page_footer = label.Label(
-                TERMINAL_FONT,
-                text=page_footer,
-                bg_color=0xFFFFFF,
-                color=0x000000,
-                anchor_point = (1, 0),
-                anchored_position = (WIDTH  - 3, 2),
-                base_alignment=True,
-            )
+            # Goals are told by the integer scores, not the rendered text.
+            # The scorer, when the goal event came with it, replaces 'Gol'.
+            gol = old_state is not None and wc_match.score(state) != wc_match.score(old_state)
+            print('{}\n\n{}\n\n'.format(state, old_state))
+            print('NEW gol!\n' if gol else 'no new gol\n')
+            if gol:
+                for event in events:
+                    if event.kind == wc_events.GOAL:
+                        gol = event.text()
             
-            main_group.append(rect)
-            main_group.append(game_page_body0)
-            main_group.append(game_page_title)
-            main_group.append(game_page_body1)
-            main_group.append(game_page_body2)
-            main_group.append(game_page_body3)
-            main_group.append(game_page_footer)
-
-            # show the group
-            display.show(main_group)
+            if state != old_state or gol != old_gol:
+                
+                # Only formatted when what is shown changed.
+                game_info, match_title, game_score, game_tactics, game_penalties = \
+                    wc_match.texts(state, gol)
+                
+                old_state = state
+                old_gol = gol
+                
+                print(game_info)
+                print(match_title)
+                print(game_score)
+                print(game_tactics)
+                print(game_penalties)
+                
+                if score_only:
+                    match_time, game_tactics, game_penalties = '', '', ''
+                else:
+                    match_time = game_info
+                
+                page_footer = '{:0.1f}v'.format(battery)
+                print(page_footer)
+                
+                # Label Setup
+                # Built once, then only changed texts are updated. The
+                # renderer refreshes them, unless the schedule is shown.
+                ledger.phase('labels')
+                if screen['live'] is None:
+                    screen['live'] = LiveMatchView(main_group, (
+                        wc_fonts.font(SPARTAN_BOLD_16), wc_fonts.font(HELVETICA_BOLD_16),
+                        wc_fonts.font(SPARTAN_LIGHT), TERMINAL_FONT))
+                    if screen['view'] == 'live':
+                        renderer.invalidate_all()
+                
+                dirty = screen['live'].update(
+                    match_time, match_title, game_score,
+                    game_tactics, game_penalties, page_footer)
+                if screen['view'] == 'live':
+                    renderer.invalidate(dirty)
+                
+                # Alerts are queued and play while the loop waits.
+                if gol:
+                    update_alert()
+                for event in events:
+                    if event.kind == wc_events.BOOKING:
+                        card_alert(event.red())
             
-            # refresh display
-            if gol:
-                update_alert()
-            try_refresh()
+            print('\nnext update in {}s\n'.format(refresh_time))
+        
+        if once:
+            game_info = game_info or True
+            break
         
-        print('\nnext update in {}s\n'.format(refresh_time))
-        atime.sleep(refresh_time)
+        # Battery governor: can the battery keep this up until today's
+        # last match ends? If not, the match is followed by wakes.
+        if BATTERY_GOVERNOR and started - last_check >= GOVERNOR_CHECK:
+            last_check = started
+            awake = (atime.monotonic_ns() - ledger.started) / 1000000000
+            level = governor_level(kickoffs, awake * (wc_ledger.AWAKE_MA + wc_ledger.RADIO_MA) / 3600)
+            if level != wc_power.NORMAL:
+                print('Battery governor: {}, leaving the live loop\n'.format(wc_power.LEVELS[level]))
+                game_info = game_info or True
+                break
+        
+        ledger.phase('wait')
+        next_poll = max(next_poll + refresh_time, atime.monotonic())
+        await asyncio.sleep(next_poll - atime.monotonic())
+    
+    # Let the last alert finish before the schedule page, and when the
+    # live view stays up, let it reach the panel.
+    await alerts.idle()
+    if game_info:
+        await renderer.idle()
+    for task in tasks:
+        task.cancel()
+    await asyncio.sleep(0)
+    print('{} polls, cadence off by up to {:0.2f}s; alerts: {} played, {} dropped, {:0.2f}s late at most'.format(
+        polls, jitter, alerts.played, alerts.dropped, alerts.late))
+    print('{} refreshes, {} waited for the panel'.format(renderer.refreshes, renderer.batched))
+    return(game_info, screen['live'], level)
+
+
+if sideways:  # Display the favorite team
+    inverted = False
+    DISPLAY_ROTATION = team_rotation(x)
+    refresh_time = GAME_OFF_REFRESH  # seconds
+    live = False
+    level = None
+    print('On its side, showing {}\n'.format(FAVORITE_TEAM))
+    
+    # Today's schedule, fetched only when the cache is stale, brings the
+    # digest up to date and gives the kickoffs to plan the wake around.
+    game_info, the_schedule, page_title, kickoffs = world_cup(hours = 0)
+    
+elif y > 0 and not use_cache:
+    def game_is_running():
+        return
+    inverted = False  # Display live score
+    DISPLAY_ROTATION = 270
+    display.rotation = DISPLAY_ROTATION
+    
+    refresh_time = GAME_ON_REFRESH  # seconds
+    # refresh_time = 20  # seconds
+    live_view = None
+    level = None
+    
+    # The date-range schedule already has every match's status, so the
+    # live endpoint is only asked when a match is actually in progress.
+    # The test data always shows the live view.
+    game_info, the_schedule, page_title, kickoffs = world_cup(hours = 0)
+    live = wc_fetch.needs_detail(kickoffs) or wifi.radio.ipv4_gateway is None
+    if not live:
+        print('No match in progress.\n')
+        game_info = False
+    else:
+        level = governor_level(kickoffs)
+        print('Battery governor: {}\n'.format(wc_power.LEVELS[level]))
+        game_info, live_view, level = asyncio.run(game_on(kickoffs, level))
     
     print('Exiting game on loop.\n')
     
+elif y > 0:  # the cached schedule says no match is on
+    inverted = False
+    game_info = False
+    live = False
+    level = None
+    
 else:
     def show_me_the_schedule():
         return
     inverted = True  # Display schedule
     DISPLAY_ROTATION = 90
     refresh_time = GAME_OFF_REFRESH  # seconds
+    live = False
+    level = None
     print('Game is on: {}'.format(inverted))
     print('Refresh: {}s\n'.format(refresh_time))
     
     # game_info, match_title, game_score, game_tactics, game_penalties = wc_current()
-    game_info, the_schedule, page_title = world_cup(hours = 24)   
+    game_info, the_schedule, page_title, kickoffs = world_cup(hours = 24)   
     
     print('\ninverted: {}\ngame_info: {}\n'.format(inverted, game_info))
 
     #  inverted = False & game_info = False then get tomorrow's schedule
 
+# The live view stays up when the battery governor ended the loop early.
+live_up = live and bool(game_info)
+
 if not game_info:  # when the game ends or no game is running
     inverted = True  # This triggers the schedule routine.
     DISPLAY_ROTATION = 270
@@ -744,13 +873,50 @@ if not game_info:  # when the game ends or no game is running
     print('Game is: {} / Info is: {}'.format(inverted, game_info))
     print('Refresh: {}s\n'.format(refresh_time))
 
-    game_info, the_schedule, page_title = world_cup(hours = 0)
+    # After a match was shown the statuses have moved on, so fetch them again.
+    game_info, the_schedule, page_title, kickoffs = world_cup(
+        hours = 0, fresh = live and live_view is not None)
     
 else:
     print('Game is: {} / Info is: {}'.format(inverted, game_info))
     print('Refresh: {}s\n'.format(refresh_time))
     
 
+# Next Match Panel
+# Upright with no match on: the next match from the fixture index or the
+# cached schedule, worked out here without a request.
+next_match = None
+countdown_at = None
+if NEXT_MATCH_PANEL and y > 0 and not sideways and not live_up:
+    next_match = wc_nextmatch.find(
+        fixtures, wc_cache.load(alarm.sleep_memory, clock.now() // DAY),
+        clock.now() - TIME_ZONE_OFFSET * 3600)
+if next_match:
+    page_title, match_teams, match_kickoff, match_countdown, countdown_at = wc_nextmatch.texts(
+        next_match, clock.now(), TIME_ZONE_OFFSET * 3600, COUNTDOWN_STEP)
+    print('{}: {}, {}, {}\n'.format(page_title, match_teams, match_kickoff, match_countdown))
+    
+
+# Wake Planning
+# Sleep until just before the next kickoff, the in-game cadence or midnight,
+# whichever comes first, instead of a fixed GAME_OFF_REFRESH. A turn or a
+# tap wakes the board in between, so there is no need for a MAX_SLEEP wake.
+# With the next-match panel up, also when its countdown changes.
+# Short of battery, the governor stretches the in-game cadence, or sets it
+# to its live wakes when the live view is up.
+if level is None:
+    level = governor_level(kickoffs)
+if live_up:
+    in_game_refresh = wc_power.LIVE_WAKE[level]
+else:
+    in_game_refresh = GAME_OFF_REFRESH * (1 + level)
+wake_at, wake_reason = wc_wake.plan_wake(clock.now(), kickoffs, in_game_refresh,
+                                         max_sleep = wc_wake.MOTION_MAX_SLEEP,
+                                         countdown_at = countdown_at)
+refresh_time = wake_at - clock.now()
+wc_wake.save_plan(alarm.sleep_memory, wake_at, wake_reason, kickoffs)
+print('Next wake: {} in {}s ({} battery)\n'.format(wake_reason, refresh_time, wc_power.LEVELS[level]))
+
 page_footer = set_page_footer()
 
 print(str(game_info) + '\n')
@@ -759,67 +925,56 @@ print(the_schedule)
 print(page_footer)
 
 
-# Make the background white
-rect = Rect(0, 0, WIDTH, HEIGHT, fill=0xFFFFFF, outline=0xFFFFFF)
-
-schedule_page_title = label.Label(
-    SPARTAN_BOLD_16,
-    text=page_title,
-    color=0x000000,
-    anchored_position = (10, 10),
-    anchor_point = (0, 0),
-    base_alignment=True,
-)
-
-schedule_page_body = label.Label(
-    TERMINAL_FONT,
-    scale = 1,
-    text=the_schedule,
-    color=0x000000,
-    anchored_position = (WIDTH * 0.5 - 0, HEIGHT * 0.5 + 0),
-    anchor_point = (0.5, 0.5),
-    base_alignment=True,
-)
-
-schedule_page_footer = label.Label(
-    TERMINAL_FONT,
-    text=page_footer,
-    bg_color=0xFFFFFF,
-    color=0x000000,
-    anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 + 56),
-    anchor_point = (0.5, 0.5),
-    base_alignment=True,
-)
-
-
-display = board.DISPLAY
-main_group = displayio.Group()
-display.show(main_group)
-display.rotation = DISPLAY_ROTATION
-
-main_group.append(rect)
-main_group.append(schedule_page_title)
-main_group.append(schedule_page_body)
-main_group.append(schedule_page_footer)
-
-# show the group
-display.show(main_group)
-
-# refresh display
-# update_alert()
-try_refresh()
+# Schedule page, next-match panel or team page, unless the live view
+# stays up.
+if not live_up:
+    ledger.phase('labels')
+    display = board.DISPLAY
+    main_group = displayio.Group()
+    if sideways:
+        team_view = TeamView(main_group, (wc_fonts.font(SPARTAN_BOLD_16), TERMINAL_FONT))
+        team_view.update(*team_page())
+    elif next_match:
+        next_match_view = NextMatchView(main_group, (
+            wc_fonts.font(SPARTAN_BOLD_16), wc_fonts.font(HELVETICA_BOLD_16), TERMINAL_FONT))
+        next_match_view.update(page_title, match_teams, match_kickoff, match_countdown,
+                               page_footer)
+    else:
+        schedule_view = ScheduleView(main_group, (wc_fonts.font(SPARTAN_BOLD_16), TERMINAL_FONT))
+        schedule_view.update(page_title, the_schedule, page_footer)
+    display.rotation = DISPLAY_ROTATION
+    
+    # show the group
+    display.show(main_group)
+    
+    # refresh display
+    # update_alert()
+    ledger.phase('refresh')
+    # Waits out the panel's minimum refresh interval, retrying once.
+    renderer.flush()
+ledger.phase('sleep')
 
 
-print('\nscreen refreshed\ngoing to sleep for {:0.0f} minutes.'.format(refresh_time/60))
+print('\nscreen refreshed\ngoing to sleep for {:0.0f} minutes ({}).'.format(refresh_time/60, wake_reason))
+if wifi.radio.ipv4_gateway is not None:
+    print('worldcupjson requests this wake: {} schedule, {} live'.format(
+        planner.requests, poller.requests))
 # Turn things off:
 wifi.radio.enabled = False
+ledger.radio(False)
 NP_POWER.switch_to_output(False)  # Flase = ON, True = OFF
 # SPEAKER_POWER.switch_to_output(False)  # Flase = ON, True = OFF
 
 def go_to_sleep():
     return
+# Record this wake in the ledger.
+ledger.save(alarm.sleep_memory, renderer.refreshes)
+
 # Create a an alarm 
 time_alarm = alarm.time.TimeAlarm(monotonic_time=atime.monotonic() + refresh_time)
-# Exit the program, and then deep sleep until the alarm wakes us.
-alarm.exit_and_deep_sleep_until_alarms(time_alarm)
+# and one for the accelerometer, turned over or tapped.
+motion_alarm = wc_motion.arm(lis, board.ACCELEROMETER_INTERRUPT, alarm.sleep_memory,
+                             taps=TAP_TO_REFRESH, sideways=digest is not None)
+# Exit the program, and then deep sleep until an alarm wakes us.
+alarm.exit_and_deep_sleep_until_alarms(time_alarm, motion_alarm)
 # Does not return, so we never get here.
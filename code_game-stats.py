@@ -73,6 +73,10 @@ GAME_OFF_REFRESH = (10 * 60)  # in seconds
 # For future, change to timezone of cup host
 HOST_TIME = 3
 
+# Data sources. Point at host/wc_server.py to test against a local stand-in.
+WORLD_CUP = 'https://worldcupjson.net/'
+AIO_TIME = 'https://io.adafruit.com/api/v2/time/seconds'  # POSIX/Unix timestamp
+
 
 # Configurations ------
 
@@ -311,7 +315,6 @@ def match_stats(current_match):
 # This function GETs today's schedule (in GMT times).
 def world_cup():
     TODAY = ((local_time(hours=0))['date'])
-    WORLD_CUP = 'https://worldcupjson.net/'
     API_PARAMETERS = 'start_date={0}&end_date={0}'.format(TODAY)
     
     # Fetching World Cup Today
@@ -330,8 +333,6 @@ def wc_current():
     # pool = socketpool.SocketPool(wifi.radio)
     # requests = aio_requests.Session(pool, ssl.create_default_context())
     
-    WORLD_CUP = 'https://worldcupjson.net/'
-    
     # Fetching World Cup Today
     json_header = {"Accept": "application/json"}
     
@@ -485,7 +486,6 @@ else:  # use live data
     # AIO Time
     # Get time from Adafruit public time server. Time can fetched as a regular GET
     # request. This eliminates need for dedicated NTP library.
-    AIO_TIME = 'https://io.adafruit.com/api/v2/time/seconds'  # POSIX/Unix timestamp
     text_header = {"Accept": "application/text"}
     
     print("Fetching time from Adafruit IO...\n")
@@ -0,0 +1,143 @@
+# Host-side benchmark: blocking alerts vs the asyncio alert engine
+'''
+Runs a stand-in for code.py's live loop on the virtual clock: every
+--refresh seconds a poll that blocks for --latency seconds (the HTTPS
+request and parse), with goals and cards landing on some polls, a burst
+of three goals and two cards on one of them. Three ways:
+
+    none       no alerts: the cadence the loop can keep
+    blocking   what code.py did: update_alert() blinking through
+               np_signal() with time.sleep() inside the loop
+    engine     wc_alert.AlertEngine as an asyncio task beside the loop
+
+Reports how far the time between poll starts strayed from the refresh
+period (the poll-latency jitter), how much later than due an alert step
+started (a step due while a poll blocks waits for it), the alerts the
+engine played and dropped (its queue holds QUEUE_SIZE), and the blinks
+and tones read back from the NeoPixel and speaker shims.
+
+    python3 host/bench_alerts.py [--polls 450] [--latency 0.4] [--refresh 12]
+'''
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, 'shims'))
+sys.path.insert(0, HOST)
+sys.path.insert(0, os.path.join(HOST, '..'))
+import neopixel  # noqa: E402
+import pwmio  # noqa: E402
+import vclock  # noqa: E402
+import wc_alert  # noqa: E402
+
+GAME_ON_REFRESH = 12
+# poll number -> alerts it brings
+ALERTS = {40: ('goal',), 95: ('card',), 160: ('goal', 'goal', 'goal', 'red', 'card'),
+          161: ('goal',), 300: ('card',), 410: ('goal',)}
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+
+# code.py's update_alert() before wc_alert.
+def np_signal(pixels, color=0x220000, flashes=3, interval=.15, time_off=1):
+    for i in range(flashes):
+        time.sleep(interval * time_off)
+        pixels.fill(color)
+        time.sleep(interval)
+        pixels.fill(0)
+
+
+def blocking_alert(pixels, kind):
+    if kind == 'goal':
+        for color in (0x110900, 0x001111, 0x110011):
+            np_signal(pixels, color=color, flashes=1, interval=0.5, time_off=0.1)
+    else:
+        np_signal(pixels, color=0x110000 if kind == 'red' else 0x110900, flashes=2,
+                  interval=0.3, time_off=0.5)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return(values[min(len(values) - 1, int(len(values) * fraction))])
+
+
+def run(flow, polls, latency, refresh):
+    neopixel.history.clear()
+    pwmio.history.clear()
+    pixels = neopixel.NeoPixel(Pin('NEOPIXEL'), 4)
+    speaker = pwmio.PWMOut(Pin('SPEAKER'), variable_frequency=True)
+    alerts = wc_alert.AlertEngine(pixels, speaker)
+    starts = []
+
+    def poll(n):
+        starts.append(time.monotonic())
+        time.sleep(latency)  # the request and parse block
+        return(ALERTS.get(n, ()))
+
+    with vclock.VirtualClock(0):
+        if flow == 'engine':
+            async def loop():
+                task = asyncio.create_task(alerts.run())
+                next_poll = time.monotonic()
+                for n in range(polls):
+                    for kind in poll(n):
+                        if kind == 'goal':
+                            alerts.goal()
+                        else:
+                            alerts.card(kind == 'red')
+                    next_poll = max(next_poll + refresh, time.monotonic())
+                    await asyncio.sleep(next_poll - time.monotonic())
+                await alerts.idle()
+                task.cancel()
+            asyncio.run(loop())
+        else:
+            for n in range(polls):
+                for kind in poll(n):
+                    if flow == 'blocking':
+                        blocking_alert(pixels, kind)
+                time.sleep(refresh)
+
+    periods = [b - a for a, b in zip(starts, starts[1:])]
+    jitter = [abs(p - refresh) for p in periods]
+    blinks = tones = 0
+    lit = sound = False
+    for t, colors in neopixel.history:
+        blinks += any(colors[0]) and not lit
+        lit = any(colors[0])
+    for t, pin, frequency, duty in pwmio.history:
+        tones += bool(duty) and (frequency, duty) != sound
+        sound = (frequency, duty)
+    return({'p95': percentile(jitter, 0.95), 'max': max(jitter), 'late': alerts.late,
+            'played': alerts.played, 'dropped': alerts.dropped, 'blinks': blinks, 'tones': tones})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--polls', type=int, default=450)
+    parser.add_argument('--latency', type=float, default=0.4, help='seconds a poll blocks')
+    parser.add_argument('--refresh', type=float, default=GAME_ON_REFRESH)
+    args = parser.parse_args()
+
+    queued = sum(len(kinds) for n, kinds in ALERTS.items() if n < args.polls)
+    print('{} polls every {} s, each blocking {} s; {} alerts'.format(
+        args.polls, args.refresh, args.latency, queued))
+    print('{:<9} {:>13} {:>13} {:>12} {:>7} {:>8} {:>7} {:>6}'.format(
+        'flow', 'jitter p95 s', 'jitter max s', 'step late s', 'played', 'dropped', 'blinks', 'tones'))
+    for flow in ('none', 'blocking', 'engine'):
+        r = run(flow, args.polls, args.latency, args.refresh)
+        engine = flow == 'engine'
+        print('{:<9} {:>13.2f} {:>13.2f} {:>12} {:>7} {:>8} {:>7} {:>6}'.format(
+            flow, r['p95'], r['max'], '{:.2f}'.format(r['late']) if engine else '-',
+            r['played'] if engine else '-', r['dropped'] if engine else '-', r['blinks'], r['tones']))
+
+
+if __name__ == '__main__':
+    main()
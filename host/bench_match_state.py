@@ -0,0 +1,196 @@
+# Host-side benchmark: match state records
+'''
+Compares how code.py kept a live match before and after wc_match:
+
+    dict+texts  the 11-key match_details dict, formatted into the 6-tuple
+                game_stats on every poll, goals told apart by comparing
+                the score text
+    MatchState  wc_match's namedtuple, compared with ==, goals told apart
+                by the integer scores, texts rebuilt only when the
+                fingerprint moves
+
+Reports the bytes each record holds (tracemalloc, strings the parser made
+included, interned strings shared across records not counted again), the
+cost of comparing two equal records, and the per-poll cost over a whole
+replayed match polled every GAME_ON_REFRESH seconds, with the goals each
+flow alerted against the goals scored. A __slots__ class is sized
+alongside for reference; on CircuitPython a tuple is the layout that is
+known to be compact.
+
+    python3 host/bench_match_state.py [--records 1000]
+'''
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, '..'))
+import wc_match  # noqa: E402
+import wc_stream  # noqa: E402
+from replay import SECOND_HALF_END, Replay  # noqa: E402
+from wc_time import iso_to_epoch  # noqa: E402
+
+GAME_ON_REFRESH = 12
+KICKOFF = '2022-11-26T19:00:00Z'
+SPEC = {'start': KICKOFF, 'matches': [
+    {'file': 'wc_current_match.json', 'index': 0, 'kickoff': KICKOFF}]}
+
+
+# What code.py did before wc_match.
+def old_details(item):
+    return({
+        "away_team": item['home_team']['name'],
+        "home_team": item['away_team']['name'],
+        "away_team_goals": item['home_team']['goals'],
+        "home_team_goals": item['away_team']['goals'],
+        "match_time": item['time'],
+        "location": item['location'],
+        "stage_name": item['stage_name'],
+        "away_tactics": (item.get('home_team_lineup') or {}).get('tactics'),
+        "away_penalties": item['home_team']['penalties'],
+        "home_tactics": (item.get('away_team_lineup') or {}).get('tactics'),
+        "home_penalties": item['away_team']['penalties'],
+        })
+
+
+def old_stats(details, old_score):
+    new_score = (details['away_team_goals'], details['home_team_goals'])
+    return((
+        '{:>7}{:^29}{:<12}'.format(details['match_time'], details['stage_name'], details['location']),
+        '{1:>12}{0:^6}{2:<12}'.format('', details['away_team'], details['home_team']),
+        '{1:^7d}{0:^15}{2:^7d}'.format('---' if new_score == old_score else 'Gol', *new_score),
+        '{:>2}{:^21}{:<2}'.format(details['away_tactics'] or '', 'Tac', details['home_tactics'] or ''),
+        '{:^7d}{:^21}{:^7d}'.format(details['away_penalties'] or 0, 'Pen', details['home_penalties'] or 0),
+        new_score))
+
+
+class SlottedState:
+    __slots__ = wc_match.MatchState._fields
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+# A fresh copy of the parsed item, as every poll's parse makes.
+def parsed(payload):
+    return(wc_stream.select(io.BytesIO(payload), wc_stream.CURRENT_MATCH_PATHS)[0])
+
+
+def bytes_per_record(payload, build, count):
+    items = [parsed(payload) for n in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [build(item) for item in items]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del records
+    return(size / count)
+
+
+def per_call(function, count):
+    began = time.perf_counter()
+    for n in range(count):
+        function()
+    return((time.perf_counter() - began) / count)
+
+
+def replay_polls():
+    replay = Replay(SPEC)
+    start = iso_to_epoch(KICKOFF)
+    now = start
+    payloads = []
+    while now < start + SECOND_HALF_END * 60:
+        payloads.append(json.dumps(replay.current(now)).encode())
+        now += GAME_ON_REFRESH
+    return([parsed(p) for p in payloads])
+
+
+def run_old(items):
+    old_stats_tuple = ('FIRST RUN', '', '')
+    old_score = (0, 0)
+    formats = goals = 0
+    for item in items:
+        stats = old_stats(old_details(item), old_score)
+        formats += 1
+        old_score = stats[5]
+        goals += stats[2] != old_stats_tuple[2]
+        if stats != old_stats_tuple:
+            old_stats_tuple = stats
+    return(formats, goals)
+
+
+def run_new(items):
+    old_state = None
+    old_gol = False
+    shown = None
+    formats = goals = 0
+    for item in items:
+        state = wc_match.from_json(item)
+        gol = old_state is not None and wc_match.score(state) != wc_match.score(old_state)
+        goals += gol
+        if state != old_state or gol != old_gol:
+            wc_match.texts(state, gol)
+            if (wc_match.fingerprint(state), gol) != shown:
+                shown = (wc_match.fingerprint(state), gol)
+                formats += 1
+            old_state = state
+            old_gol = gol
+    return(formats, goals)
+
+
+def scored(items):
+    scores = [(i['home_team']['goals'] or 0, i['away_team']['goals'] or 0) for i in items]
+    return(sum(a != b for a, b in zip(scores, scores[1:])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--compares', type=int, default=200000)
+    args = parser.parse_args()
+
+    with open(os.path.join(HOST, '..', 'wc_current_match.json'), 'rb') as f:
+        payload = json.dumps(json.load(f)[:1]).encode()
+    item = parsed(payload)
+
+    def slotted(item):
+        return(SlottedState(*wc_match.from_json(item)))
+
+    builds = (
+        ('dict', old_details),
+        ('dict+texts', lambda item: old_stats(old_details(item), (0, 0))),
+        ('MatchState', wc_match.from_json),
+        ('__slots__', slotted),
+        )
+    pairs = (
+        ('dict', old_details(item), old_details(parsed(payload))),
+        ('dict+texts', old_stats(old_details(item), (0, 0)), old_stats(old_details(parsed(payload)), (0, 0))),
+        ('MatchState', wc_match.from_json(item), wc_match.from_json(parsed(payload))),
+        )
+
+    print('{:<11} {:>8} {:>11}'.format('record', 'bytes', 'compare ns'))
+    compares = dict((name, '{:.0f}'.format(per_call(lambda: a == b, args.compares) * 1e9))
+                    for name, a, b in pairs)
+    for name, build in builds:
+        print('{:<11} {:>8.0f} {:>11}'.format(
+            name, bytes_per_record(payload, build, args.records), compares.get(name, '-')))
+
+    items = replay_polls()
+    print('\n{} polls of one match, every {} s, {} goals scored'.format(
+        len(items), GAME_ON_REFRESH, scored(items)))
+    print('{:<11} {:>8} {:>14} {:>10}'.format('flow', 'formats', 'goals alerted', 'us/poll'))
+    for name, run in (('dict+texts', run_old), ('MatchState', run_new)):
+        formats, goals = run(items)
+        cost = per_call(lambda: run(items), 20) / len(items)
+        print('{:<11} {:>8} {:>14} {:>10.1f}'.format(name, formats, goals, cost * 1e6))
+
+
+if __name__ == '__main__':
+    main()
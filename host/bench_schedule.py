@@ -0,0 +1,105 @@
+# Host-side benchmark: schedule text builders
+'''
+Compares the original wc_schedule() loop (string concatenation, datetime
+and timedelta per row) with wc_format.schedule_text() on a synthetic
+64-match day, for peak heap (tracemalloc) and time.
+
+    python3 host/bench_schedule.py [--matches 64] [--repeat 200]
+
+The original loop is reproduced here with CPython's datetime, which
+stands in for adafruit_datetime. CPython grows a concatenated string in
+place, so its peak here is lower than on the device, where MicroPython
+copies the whole string on every +.
+'''
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import wc_format  # noqa: E402
+from wc_teams import TEAMS  # noqa: E402
+
+TIME_ZONE_OFFSET = -8
+
+
+# The loop of the original wc_schedule(), minus the page title.
+def original_schedule(match_schedule):
+    the_schedule = ''
+    for i in match_schedule:
+        game_time = (i['datetime'])
+        game_time = (game_time[0:19])
+        game_time = (datetime.fromisoformat(game_time) +
+                     timedelta(hours = TIME_ZONE_OFFSET))
+        schedule_items = [
+            i['away_team']['name'],
+            i['away_team']['goals'],
+            i['home_team']['name'],
+            i['home_team']['goals']
+            ]
+        schedule_items = ['' if v is None else v for v in schedule_items]
+        the_schedule = the_schedule + ('{:<5} {:>11} ({}) v ({}) {:<0}\n'.format(
+            str(game_time.time())[0:5],
+            schedule_items[0],
+            schedule_items[1],
+            schedule_items[3],
+            schedule_items[2],
+            ))
+    return(the_schedule)
+
+
+def synthetic_day(count):
+    codes = sorted(TEAMS)
+    matches = []
+    for n in range(count):
+        home = codes[(2 * n) % len(codes)]
+        away = codes[(2 * n + 1) % len(codes)]
+        played = n < count // 2
+        matches.append({
+            'id': n + 1,
+            'status': 'completed' if played else 'future_scheduled',
+            'datetime': '2022-11-{:02d}T{:02d}:{:02d}:00Z'.format(20 + n // 24, n % 24, (n * 7) % 60),
+            'home_team': {'country': home, 'name': TEAMS[home], 'goals': n % 4 if played else None},
+            'away_team': {'country': away, 'name': TEAMS[away], 'goals': n % 3 if played else None},
+            })
+    return(matches)
+
+
+def measure(fn, repeat):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn()
+    return(peak, (time.perf_counter() - start) / repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--matches', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    day = synthetic_day(args.matches)
+
+    def one_pass():
+        return(wc_format.schedule_text(day, TIME_ZONE_OFFSET)[0])
+
+    assert original_schedule(day) == one_pass()
+
+    print('{} matches'.format(args.matches))
+    print('{:<14} {:>10} {:>10}'.format('builder', 'peak heap', 'time'))
+    for name, fn in (('original', lambda: original_schedule(day)),
+                     ('schedule_text', one_pass)):
+        peak, elapsed = measure(fn, args.repeat)
+        print('{:<14} {:>8.1f}KB {:>8.3f}ms'.format(name, peak / 1024, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# Host-side benchmark: wc_stream.select() vs json.loads()
+'''
+Compares peak heap and parse time of the selective reader against a full
+json.loads() of the same /matches/current payload.
+
+    python3 host/bench_stream.py [file.json] [--repeat N]
+
+Peak heap is measured with tracemalloc and includes the raw text for
+json.loads() (that is what response.json() holds on the device).
+
+First checks that both give the same selected values, and that escaped
+strings, surrogate pairs and unpaired surrogates (as U+FFFD) read the
+same as json.loads() with every chunk size.
+'''
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import wc_stream  # noqa: E402
+
+
+def measure(fn, repeat):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    return(peak, elapsed)
+
+
+# The parts of a parsed tree that paths select, as wc_stream.select()
+# builds them: '*' is every item of a list.
+def project(tree, paths):
+    if isinstance(tree, list):
+        return([project(item, [p[1:] for p in paths if p[0] == '*']) for item in tree])
+    kept = {}
+    for key in tree:
+        rest = [p[1:] for p in paths if p[0] == key]
+        if not rest:
+            continue
+        if () in rest or not isinstance(tree[key], (dict, list)):
+            kept[key] = tree[key]
+        else:
+            kept[key] = project(tree[key], rest)
+    return(kept)
+
+
+# Strings with escapes, read by wc_stream and by json.loads(), whose
+# unpaired surrogates are replaced as wc_stream replaces them.
+STRINGS = (
+    r'"caf\u00e9 \"q\" \\ \/ \n"',
+    r'"\ud83c\udff4 \u26bd"',
+    r'"\ud83c"', r'"\udff4 x"', r'"\ud83c\ud83c\udff4"', r'"\ud83cx"',
+    )
+
+
+def check_strings():
+    for text in STRINGS:
+        expected = json.loads(text).encode('utf-16', 'surrogatepass').decode('utf-16', 'replace')
+        payload = '{{"name": {}}}'.format(text).encode()
+        for chunk in (1, 2, 3, 64):
+            got = wc_stream.select(io.BytesIO(payload), [('name',)], chunk)['name']
+            assert got == expected, (text, chunk, got, expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('file', nargs='?', default=os.path.join(
+        os.path.dirname(__file__), '..', 'wc_current_match.json'))
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--chunk', type=int, default=wc_stream.CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with open(args.file, 'rb') as fp:
+        payload = fp.read()
+
+    def full():
+        # What response.json() does: whole body, then the whole tree.
+        text = io.BytesIO(payload).read()
+        return(json.loads(text))
+
+    def selective():
+        return(wc_stream.select(io.BytesIO(payload),
+                                wc_stream.CURRENT_MATCH_PATHS, args.chunk))
+
+    assert selective() == project(full(), wc_stream.CURRENT_MATCH_PATHS)
+    check_strings()
+
+    print('payload: {} bytes, chunk: {} bytes'.format(len(payload), args.chunk))
+    print('{:<12} {:>12} {:>12}'.format('parser', 'peak heap', 'time'))
+    for name, fn in (('json.loads', full), ('wc_stream', selective)):
+        peak, elapsed = measure(fn, args.repeat)
+        print('{:<12} {:>10.1f}KB {:>10.2f}ms'.format(
+            name, peak / 1024, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Host-side benchmark: per-view polling vs the multi-match tracker
+'''
+Plays 2 to 4 simultaneous matches from a replay and polls them every
+GAME_ON_REFRESH seconds for the whole match, switching the shown match
+every --switch minutes, two ways:
+
+    per-view   what test_two-games.py did: every poll parses the array
+               for the shown match only, one old_score is kept for
+               whichever match is shown, and a switch needs a poll
+               before the new match can be drawn.
+    tracker    wc_tracker: one parse per poll updates every match's
+               state, and a switch is drawn from the table.
+
+Reports requests, bytes, parse time per poll, goals alerted out of the
+goals scored, and alerts that were not goals (a switch to a match with a
+different score looks like a goal to a single old_score).
+
+    python3 host/bench_tracker.py [--matches 2 3 4] [--switch 5]
+'''
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, '..'))
+import wc_stream  # noqa: E402
+import wc_tracker  # noqa: E402
+from replay import SECOND_HALF_END, Replay  # noqa: E402
+from wc_time import iso_to_epoch  # noqa: E402
+
+GAME_ON_REFRESH = 12
+KICKOFF = '2022-11-26T19:00:00Z'
+
+
+# n matches kicking off together, each with its own goals.
+def replay_spec(n):
+    matches = [{'file': 'wc_current_match.json', 'index': 0, 'kickoff': KICKOFF}]
+    for i in range(1, n):
+        matches.append({
+            'file': 'wc_test_data.json', 'index': i, 'kickoff': KICKOFF,
+            'events': {
+                'home': [{'type_of_event': 'goal', 'player': 'Home', 'time': "{}'".format(10 + 17 * i)}],
+                'away': [{'type_of_event': 'goal', 'player': 'Away', 'time': "{}'".format(30 + 11 * i)},
+                         {'type_of_event': 'goal', 'player': 'Away', 'time': "{}'".format(70 + 3 * i)}],
+                },
+            })
+    return({'start': KICKOFF, 'matches': matches})
+
+
+def run(n, switch_minutes, per_view):
+    replay = Replay(replay_spec(n))
+    start = iso_to_epoch(KICKOFF)
+    end = start + SECOND_HALF_END * 60
+    tracker = wc_tracker.MatchTracker()
+    scores = {}
+    result = {'requests': 0, 'bytes': 0, 'parse': 0.0, 'goals': 0, 'alerted': 0, 'false': 0}
+    old_score = None
+    view = 0
+    now = start
+    while now < end:
+        new_view = int((now - start) // (switch_minutes * 60)) % n
+        switched = new_view != view
+        view = new_view
+        polls = 2 if per_view and switched else 1  # the poll plus the one the switch needs
+        for poll in range(polls):
+            payload = json.dumps(replay.current(now)).encode()
+            result['requests'] += 1
+            result['bytes'] += len(payload)
+
+            began = time.perf_counter()
+            if per_view:
+                current = wc_stream.select(io.BytesIO(payload), wc_stream.CURRENT_MATCH_PATHS)
+                match = current[view] if view < len(current) else None
+                score = None if match is None else (match['home_team']['goals'], match['away_team']['goals'])
+                alerted = score is not None and old_score is not None and score != old_score
+                alerted = {view: alerted}
+                old_score = score
+            else:
+                current = wc_stream.select(io.BytesIO(payload), wc_tracker.TRACKER_PATHS)
+                changes = tracker.update(current)
+                ids = tracker.order
+                alerted = {ids.index(i): True for i, change in changes if change == 'goal'}
+            result['parse'] += time.perf_counter() - began
+
+            # What actually changed, from the replay itself.
+            for i, match in enumerate(json.loads(payload)):
+                score = (match['home_team']['goals'] or 0, match['away_team']['goals'] or 0)
+                scored = i in scores and score != scores[i]
+                scores[i] = score
+                result['goals'] += scored
+                if alerted.get(i):
+                    result['alerted'] += scored
+                    result['false'] += not scored
+        now += GAME_ON_REFRESH
+    result['parse'] /= result['requests']
+    return(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--matches', type=int, nargs='+', default=[2, 3, 4])
+    parser.add_argument('--switch', type=float, default=5, help='minutes between view switches')
+    args = parser.parse_args()
+
+    print('{:>7} {:<9} {:>8} {:>9} {:>10} {:>14} {:>12}'.format(
+        'matches', 'flow', 'requests', 'KB', 'parse ms', 'goals alerted', 'false alerts'))
+    for n in args.matches:
+        for name, per_view in (('per-view', True), ('tracker', False)):
+            r = run(n, args.switch, per_view)
+            print('{:>7} {:<9} {:>8} {:>9.0f} {:>10.2f} {:>9}/{:<4} {:>12}'.format(
+                n, name, r['requests'], r['bytes'] / 1024, r['parse'] * 1000,
+                r['alerted'], r['goals'], r['false']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# Build the fixture index from the worldcupjson /matches output
+'''
+Writes the tournament's fixtures as the binary index read by
+wc_fixtures.FixtureIndex (layout documented there). Copy the result to
+the root of the CIRCUITPY drive.
+
+    curl -o matches.json https://worldcupjson.net/matches
+    python3 host/build_fixtures.py matches.json [-o wc_fixtures.bin] [--bench]
+    python3 host/build_fixtures.py --synthetic --bench
+
+--synthetic stands in a 64-match tournament shaped like 2022 (eight
+groups of four, then the knockouts with their pairings not yet known)
+for the download. --bench compares, per query, what a wake does without
+the index, parsing the whole /matches body and scanning it, with
+opening the index and looking the same thing up: the next match after a
+time, one team's matches and one day's matches.
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, '..'))
+
+import wc_fixtures  # noqa: E402
+from wc_teams import TEAMS  # noqa: E402
+from wc_time import DAY, epoch_to_iso, iso_to_epoch  # noqa: E402
+
+VENUES = ('Al Bayt Stadium', 'Khalifa International Stadium', 'Al Thumama Stadium',
+          'Ahmad Bin Ali Stadium', 'Lusail Stadium', 'Stadium 974', 'Education City Stadium',
+          'Al Janoub Stadium')
+TEMPLATE = os.path.join(HOST, '..', 'wc_test_data.json')
+QUERY_TIME = '2022-11-29T12:00:00Z'
+QUERY_TEAM = 'ARG'
+REPEAT = 200
+
+
+def _team(code):
+    if code is None:
+        return({'country': 'TBD', 'name': 'To Be Determined', 'goals': None, 'penalties': None})
+    return({'country': code, 'name': TEAMS.get(code, code), 'goals': None, 'penalties': None})
+
+
+def _match(template, n, kickoff, stage, home=None, away=None):
+    match = dict(template)
+    match.update({
+        'id': n, 'venue': VENUES[n % len(VENUES)], 'status': 'future_scheduled',
+        'attendance': None, 'stage_name': stage, 'datetime': epoch_to_iso(kickoff),
+        'home_team_country': home, 'away_team_country': away, 'winner': None,
+        'winner_code': None, 'home_team': _team(home), 'away_team': _team(away),
+        })
+    return(match)
+
+
+# 48 group matches over 12 days, four a day, then 16 knockout matches.
+def synthetic_tournament():
+    with open(TEMPLATE) as fp:
+        template = json.load(fp)[0]
+    codes = sorted(TEAMS)
+    groups = [codes[g::8] for g in range(8)]
+    pairs = ((0, 1), (2, 3), (0, 2), (3, 1), (3, 0), (1, 2))
+    first = iso_to_epoch('2022-11-20T10:00:00Z')
+    matches = []
+    for n in range(48):
+        group = groups[(n // 2) % 8 if n < 16 else (n - 16) // 2 % 8]
+        home, away = pairs[(n // 16) * 2 + n % 2]
+        kickoff = first + n // 4 * DAY + n % 4 * 3 * 3600
+        matches.append(_match(template, n + 1, kickoff, 'First stage', group[home], group[away]))
+    rounds = (('Round of 16', 8, 2), ('Quarter-final', 4, 2), ('Semi-final', 2, 1),
+              ('Play-off for third place', 1, 1), ('Final', 1, 1))
+    day = first + 13 * DAY
+    for stage, count, per_day in rounds:
+        for k in range(count):
+            kickoff = day + k // per_day * DAY + 5 * 3600 + k % per_day * 4 * 3600
+            matches.append(_match(template, len(matches) + 1, kickoff, stage))
+        day += (count + per_day - 1) // per_day * DAY + DAY
+    return(matches)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for n in range(REPEAT):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / REPEAT
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return(result, elapsed, peak)
+
+
+def bench(body, index_name):
+    now = iso_to_epoch(QUERY_TIME)
+    day = now // DAY
+
+    def parsed(query):
+        def run():
+            matches = json.loads(body)
+            return(query(matches))
+        return(run)
+
+    def indexed(query):
+        def run():
+            with wc_fixtures.FixtureIndex(index_name) as index:
+                found = query(index)
+                run.reads = index.reads
+            return(found)
+        return(run)
+
+    queries = (
+        ('next match', lambda ms: min((m for m in ms if iso_to_epoch(m['datetime']) >= now),
+                                      key=lambda m: m['datetime'])['id'],
+         lambda index: index.next_match(now)[1]),
+        ('team ' + QUERY_TEAM, lambda ms: [m['id'] for m in ms if QUERY_TEAM in (
+            m['home_team']['country'], m['away_team']['country'])],
+         lambda index: [r[1] for r in index.team(QUERY_TEAM)]),
+        ('day ' + QUERY_TIME[:10], lambda ms: [m['id'] for m in ms
+                                             if iso_to_epoch(m['datetime']) // DAY == day],
+         lambda index: [r[1] for r in index.day(day)]),
+        )
+    print('{:<16} {:<7} {:>10} {:>10} {:>12} {:>6}'.format(
+        'query', 'from', 'time us', 'peak heap', 'bytes read', 'reads'))
+    for name, scan, lookup in queries:
+        full, elapsed, peak = measure(parsed(scan))
+        print('{:<16} {:<7} {:>10.1f} {:>9.1f}K {:>12} {:>6}'.format(
+            name, 'json', elapsed * 1000000, peak / 1024, len(body), 1))
+        run = indexed(lookup)
+        found, elapsed, peak = measure(run)
+        if isinstance(found, list):
+            found, full = sorted(found), sorted(full)
+        assert found == full, (name, found, full)
+        read = wc_fixtures.HEADER_SIZE + run.reads * wc_fixtures.RECORD_SIZE
+        print('{:<16} {:<7} {:>10.1f} {:>9.1f}K {:>12} {:>6}'.format(
+            '', 'index', elapsed * 1000000, peak / 1024, read, run.reads + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('matches', nargs='?', help='the /matches output as a JSON file')
+    parser.add_argument('-o', '--output', default='wc_fixtures.bin')
+    parser.add_argument('--synthetic', action='store_true', help='a made-up 64-match tournament')
+    parser.add_argument('--bench', action='store_true')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        body = json.dumps(synthetic_tournament())
+    elif args.matches:
+        with open(args.matches) as fp:
+            body = fp.read()
+    else:
+        parser.error('give the /matches output or --synthetic')
+    matches = json.loads(body)
+    data = wc_fixtures.encode(matches)
+    with open(args.output, 'wb') as fp:
+        fp.write(data)
+    unknown = len([m for m in matches if m['home_team'].get('country') in (None, 'TBD')])
+    print('{}: {} fixtures ({} pairings not known yet), {} B of JSON -> {} B'.format(
+        args.output, len(matches), unknown, len(body), len(data)))
+    if args.bench:
+        bench(body, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# Convert the BDF fonts to packed fonts
+'''
+Converts the .bdf fonts code.py draws with (FONTS, or each --font) in
+fonts/ to the packed .pbf format read by wc_fonts.PackedFont (layout
+documented there). A .license file next to the BDF is copied too. Fonts
+only the older scripts load, such as Junction-regular-24, stay BDF so no
+unused .pbf is copied to the drive.
+
+    python3 host/build_fonts.py [fonts dir] [--font NAME ...] [--bench]
+
+--bench compares, per font, a full BDF parse with opening the packed font
+and loading the glyphs of a typical Live Match screen.
+'''
+
+import argparse
+import os
+import shutil
+import struct
+import sys
+import time
+import tracemalloc
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, 'shims'))
+sys.path.insert(0, os.path.join(HOST, '..'))
+
+import wc_fonts  # noqa: E402
+
+FONTS = ('Helvetica-Bold-16', 'LeagueSpartan-Bold-16', 'LeagueSpartan-Light')
+SAMPLE_TEXT = "   Argentina        Mexico    2   Gol   0 4-4-2 Tac 5-3-2 Pen 90' 3.9v"
+
+
+class BdfGlyph:
+
+    def __init__(self):
+        self.code_point = None
+        self.shift_x = 0
+        self.width = self.height = self.dx = self.dy = 0
+        self.rows = []
+
+
+# Parse a whole BDF file. Returns (properties, glyphs).
+def parse_bdf(file_name):
+    properties = {}
+    glyphs = []
+    glyph = None
+    in_bitmap = False
+    with open(file_name, 'r', encoding='latin-1') as fp:
+        for line in fp:
+            parts = line.split()
+            if not parts:
+                continue
+            key = parts[0]
+            if in_bitmap:
+                if key == 'ENDCHAR':
+                    in_bitmap = False
+                    glyphs.append(glyph)
+                    glyph = None
+                else:
+                    glyph.rows.append(bytes.fromhex(key))
+            elif key == 'STARTCHAR':
+                glyph = BdfGlyph()
+            elif glyph is not None:
+                if key == 'ENCODING':
+                    glyph.code_point = int(parts[1])
+                elif key == 'DWIDTH':
+                    glyph.shift_x = int(parts[1])
+                elif key == 'BBX':
+                    glyph.width, glyph.height, glyph.dx, glyph.dy = (int(p) for p in parts[1:5])
+                elif key == 'BITMAP':
+                    in_bitmap = True
+            elif key == 'FONTBOUNDINGBOX':
+                properties['bounding_box'] = tuple(int(p) for p in parts[1:5])
+            elif key in ('FONT_ASCENT', 'FONT_DESCENT'):
+                properties[key] = int(parts[1])
+    return(properties, glyphs)
+
+
+def pack_rows(glyph):
+    row_bytes = (glyph.width + 7) // 8
+    data = bytearray()
+    for row in glyph.rows[:glyph.height]:
+        # BDF rows are MSB first, padded to whole bytes.
+        data.extend(row[:row_bytes] + bytes(max(0, row_bytes - len(row))))
+    return(data)
+
+
+def convert(bdf_name, pbf_name):
+    properties, glyphs = parse_bdf(bdf_name)
+    glyphs = sorted((g for g in glyphs if g.code_point is not None
+                     and 0 <= g.code_point <= 0xFFFF), key=lambda g: g.code_point)
+    w, h, x, y = properties['bounding_box']
+    header = struct.pack(wc_fonts.HEADER, wc_fonts.MAGIC,
+                         properties.get('FONT_ASCENT', h + y),
+                         properties.get('FONT_DESCENT', -y),
+                         x, y, w, h, len(glyphs))
+    offset = len(header) + len(glyphs) * wc_fonts.INDEX_SIZE
+    index = bytearray()
+    bitmaps = bytearray()
+    for glyph in glyphs:
+        index.extend(struct.pack(wc_fonts.INDEX, glyph.code_point, glyph.width, glyph.height,
+                                 glyph.dx, glyph.dy, glyph.shift_x, offset + len(bitmaps)))
+        bitmaps.extend(pack_rows(glyph))
+    with open(pbf_name, 'wb') as fp:
+        fp.write(header)
+        fp.write(index)
+        fp.write(bitmaps)
+    if os.path.exists(bdf_name + '.license'):
+        shutil.copyfile(bdf_name + '.license', pbf_name + '.license')
+    return(len(glyphs))
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return(result, elapsed, peak)
+
+
+def bench(bdf_name, pbf_name):
+    def packed():
+        font = wc_fonts.PackedFont(pbf_name)
+        font.load_glyphs(SAMPLE_TEXT)
+        return(font)
+    for label, fn in (('bdf full parse', lambda: parse_bdf(bdf_name)),
+                      ('pbf + screen glyphs', packed)):
+        result, elapsed, peak = measure(fn)
+        print('  {:<20} {:>8.2f}ms {:>9.1f}KB'.format(label, elapsed * 1000, peak / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fonts', nargs='?', default=os.path.join(HOST, '..', 'fonts'))
+    parser.add_argument('--font', action='append', help='font to pack (default: FONTS)')
+    parser.add_argument('--bench', action='store_true')
+    args = parser.parse_args()
+
+    for font in args.font or FONTS:
+        name = font + '.bdf'
+        bdf_name = os.path.join(args.fonts, name)
+        if not os.path.exists(bdf_name):
+            print('{}: not in {}'.format(name, args.fonts))
+            continue
+        pbf_name = bdf_name[:-4] + '.pbf'
+        count = convert(bdf_name, pbf_name)
+        print('{}: {} glyphs, {} -> {} bytes'.format(
+            name, count, os.path.getsize(bdf_name), os.path.getsize(pbf_name)))
+        if args.bench:
+            bench(bdf_name, pbf_name)
+
+
+if __name__ == '__main__':
+    main()
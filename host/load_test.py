@@ -0,0 +1,91 @@
+# Host-side load test against the worldcupjson stand-in
+'''
+Runs several simulated devices against host/wc_server.py, each polling
+/matches/current through the same PollingClient and wc_stream path that
+code.py uses, and reports response times, 304s, 429s and parsed updates.
+
+    python3 host/wc_server.py --replay host/replays/two_matches.json --speed 30 \\
+        --rate-limit --latency 0.2 --jitter 0.3 --quiet
+    python3 host/load_test.py --clients 8 --interval 12 --duration 120
+
+Needs adafruit_requests on the host (pip install adafruit-circuitpython-requests);
+CPython's socket module stands in for the socket pool. Every client
+polls from the same address, so give --interval per client above the
+server's rate limit times --clients to stay under it, or below it to
+measure how the device copes with 429s.
+'''
+
+import argparse
+import os
+import socket
+import ssl
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import adafruit_requests  # noqa: E402
+import wc_stream  # noqa: E402
+from wc_poll import PollingClient  # noqa: E402
+
+
+def client(url, interval, until, results):
+    session = adafruit_requests.Session(socket, ssl.create_default_context())
+    poller = PollingClient(session)
+    timings = []
+    updates = 0
+    errors = 0
+    while time.monotonic() < until:
+        start = time.monotonic()
+        try:
+            if poller.get(url, wc_stream.CURRENT_MATCH_PATHS,
+                          headers={"Accept": "application/json"}) is not None:
+                updates += 1
+        except (OSError, RuntimeError, ValueError):
+            errors += 1
+        elapsed = time.monotonic() - start
+        timings.append(elapsed)
+        time.sleep(max(0, interval - elapsed))
+    results.append((poller, timings, updates, errors))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return(values[min(len(values) - 1, int(len(values) * fraction))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000/')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--interval', type=float, default=12, help='seconds between polls per client')
+    parser.add_argument('--duration', type=float, default=60)
+    args = parser.parse_args()
+
+    url = '{}matches/current'.format(args.url)
+    until = time.monotonic() + args.duration
+    results = []
+    threads = [threading.Thread(target=client, args=(url, args.interval, until, results))
+               for n in range(args.clients)]
+    for thread in threads:
+        thread.start()
+        time.sleep(args.interval / args.clients)  # spread the clients out
+    for thread in threads:
+        thread.join()
+
+    timings = [t for result in results for t in result[1]]
+    requests = sum(r[0].requests for r in results)
+    print('{} clients, {} requests in {:0.0f}s'.format(args.clients, requests, args.duration))
+    print('response  mean {:0.3f}s  p50 {:0.3f}s  p95 {:0.3f}s  max {:0.3f}s'.format(
+        sum(timings) / len(timings), percentile(timings, 0.5),
+        percentile(timings, 0.95), max(timings)))
+    print('200 updates: {}  304: {}  429: {}  unchanged: {}  errors: {}'.format(
+        sum(r[2] for r in results), sum(r[0].not_modified for r in results),
+        sum(r[0].rate_limited for r in results), sum(r[0].unchanged for r in results),
+        sum(r[3] for r in results)))
+    print('body bytes saved: {}'.format(sum(r[0].bytes_saved for r in results)))
+
+
+if __name__ == '__main__':
+    main()
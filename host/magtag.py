@@ -0,0 +1,478 @@
+# MagTag simulator
+'''
+Runs code.py (or test_two-games.py, code_game-stats.py) under CPython
+with the hardware shims in host/shims and a virtual clock, so a whole
+tournament day goes by in seconds.
+
+    python3 host/magtag.py code.py --replay host/replays/two_matches.json \\
+        --hours 24 --png /tmp/frames
+    python3 -m cProfile -s cumtime host/magtag.py code.py --quiet
+    python3 host/magtag.py code.py --heap --quiet
+
+Each boot runs the script from the top in a fresh module state, as after
+a deep sleep: modules it imported are dropped, while sleep memory, the
+display and the clock carry over. When the script calls
+alarm.exit_and_deep_sleep_until_alarms() the clock jumps to the earliest
+alarm and the next boot starts. time.sleep() returns at once.
+
+--turn, --side and --tap move the simulated LIS3DH; --side stands the
+MagTag on its (left) side and a --turn after that stands it back the way
+it was. Its INT1 line drives the ACCELEROMETER_INTERRUPT pin alarm, so a
+board sleeping with the accelerometer armed (wc_motion) wakes when it is
+turned over, onto its side or tapped; every boot is listed with what
+woke it and how long its radio was on.
+
+--cell runs the board off a simulated LiPo of that many mAh, starting
+at --charge of it (analogio.Cell). It is drained by the clock with
+wc_ledger's currents: awake, radio on while the WiFi shim's radio is
+powered, deep sleep, and a panel refresh for each refresh. Once it is
+flat the run stops; refreshes and calls after that never happened. --set
+NAME=VALUE replaces a setting in the script (a line 'NAME = ...'), so
+host/sim_battery.py can run code.py with and without BATTERY_GOVERNOR.
+
+The network is host/wc_server.py, served in-process: every HTTP(S)
+request from the script reaches it whatever the host, so worldcupjson
+and the AIO time feed both come from the replay. Every UDP datagram is
+answered by host/ntp_server.py from the same clock; --no-ntp drops them,
+so the script falls back to the AIO time feed. The simulated WiFi
+network is 'ssid_1', which is what the injected secrets use.
+
+Files the script writes to the root of the drive ('/name') go to --drive.
+The Adafruit libraries the scripts import (adafruit_display_text,
+adafruit_display_shapes, adafruit_datetime, adafruit_requests,
+adafruit_io, adafruit_bitmap_font, ...) must be importable: pip install
+the adafruit-circuitpython-* packages, or point --lib at a folder of
+their .py sources.
+
+At the end every refresh, network call and boot is listed. --png writes
+each refresh as a grayscale PNG. With a replay, every score change is
+listed with its end-to-end latency: from the minute the score moved at
+the API to the first refresh whose live view shows it (the same match's
+title and the new score), or 'not shown' when no refresh showed it
+before the score moved again. The wake ledger the script kept in sleep
+memory (wc_ledger) is printed as CSV with its mAh/day estimate, the same
+dump the device gives over serial; --ledger also writes the CSV to a file.
+'''
+
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import re
+import ssl
+import sys
+import tempfile
+import time
+import tracemalloc
+import traceback
+import types
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.normpath(os.path.join(HOST, '..'))
+sys.path.insert(0, os.path.join(HOST, 'shims'))
+sys.path.insert(0, HOST)
+sys.path.insert(0, ROOT)
+
+import ntp_server  # noqa: E402
+import vclock  # noqa: E402
+from replay import SECOND_HALF_END, SHOOTOUT, Replay  # noqa: E402
+from wc_time import epoch_to_iso, iso_to_epoch  # noqa: E402
+
+# Hardware modules that outlive each boot.
+HARDWARE = ('adafruit_lis3dh', 'alarm', 'analogio', 'board', 'busio', 'digitalio', 'displayio',
+            'fontio', 'micropython', 'neopixel', 'pwmio', 'rtc', 'simpleio', 'socketpool',
+            'supervisor', 'terminalio', 'wifi')
+
+SECRETS = {
+    'ssid': 'ssid_1',
+    'password': 'password_1',
+    'aio_username': 'username',
+    'aio_key': 'key',
+    }
+
+
+class Boot:
+
+    def __init__(self, number, started, epoch):
+        self.number = number
+        self.started = started  # monotonic
+        self.epoch = epoch
+        self.awake = 0
+        self.radio = 0  # seconds the radio was powered
+        self.refreshes = 0
+        self.calls = 0
+        self.heap = None
+        self.wall = 0
+        self.ended = ''
+        self.woke_by = ''
+
+
+# open() that sends files in the root of the drive to drive.
+def drive_open(drive, real_open):
+    def opener(file, *args, **kwargs):
+        if isinstance(file, str) and file.startswith('/') and file.count('/') == 1:
+            file = os.path.join(drive, file[1:])
+        return(real_open(file, *args, **kwargs))
+    return(opener)
+
+
+# Answers datagrams as an SNTP server latency seconds away.
+def sntp_responder(clock, latency):
+    def respond(data):
+        time.sleep(latency / 2)
+        answer = ntp_server.reply(data, clock.now())
+        time.sleep(latency / 2)
+        return(answer)
+    return(respond)
+
+
+# The live view's score line for home - away: the two scores at either end,
+# anything but the tactics or penalties label between them.
+def shows_score(texts, home, away, score):
+    if not any(home in text and away in text for text in texts):
+        return(False)
+    for text in texts:
+        words = text.split()
+        if (len(words) >= 2 and words[0] == str(score[0]) and words[-1] == str(score[1])
+                and words[1] not in ('Tac', 'Pen')):
+            return(True)
+    return(False)
+
+
+# (match, score, epoch it changed at the API, seconds until a refresh
+# showed it or None, whether the screen showed that match when it changed)
+# for every score change of the replay.
+def score_latency(replay, start, display):
+    shown = [(start + at, texts) for (at, rotation, frame), texts in zip(display.refreshes, display.texts)]
+    rows = []
+    for match in replay.matches:
+        home, away = match.base['home_team']['name'], match.base['away_team']['name']
+        changes = []
+        last = (0, 0)
+        for minute in range(SECOND_HALF_END + SHOOTOUT + 1):
+            payload = match.payload(match.kickoff + minute * 60)
+            score = (payload['home_team']['goals'] or 0, payload['away_team']['goals'] or 0)
+            if score != last:
+                changes.append((match.kickoff + minute * 60, score))
+                last = score
+        for n, (changed, score) in enumerate(changes):
+            until = changes[n + 1][0] if n + 1 < len(changes) else None
+            before = [texts for epoch, texts in shown if epoch < changed]
+            on_screen = bool(before) and any(home in t and away in t for t in before[-1])
+            latency = None
+            for epoch, texts in shown:
+                if epoch < changed or (until is not None and epoch >= until):
+                    continue
+                if shows_score(texts, home, away, score):
+                    latency = epoch - changed
+                    break
+            rows.append(('{} - {}'.format(home, away), score, changed, latency, on_screen))
+    return(rows)
+
+
+def woken_by(wake_alarm):
+    if wake_alarm is None:
+        return('power on')
+    pin = getattr(wake_alarm, 'pin', None)
+    return('timer' if pin is None else getattr(pin, 'name', str(pin)))
+
+
+# The source with each NAME=VALUE in settings replacing the line 'NAME = ...'.
+def apply_settings(source, settings):
+    for setting in settings:
+        name, value = setting.split('=', 1)
+        source, n = re.subn(r'^{} = [^#\n]*'.format(re.escape(name)),
+                            lambda m: '{} = {} '.format(name, value), source, count=1, flags=re.M)
+        if not n:
+            raise SystemExit('--set: no setting {} in the script'.format(name))
+    return(source)
+
+
+# wc_ledger's currents, imported and dropped again so the boots import
+# their own copy.
+def ledger_currents():
+    before = set(sys.modules)
+    import wc_ledger
+    currents = {name: getattr(wc_ledger, name)
+                for name in ('AWAKE_MA', 'RADIO_MA', 'REFRESH_MA', 'REFRESH_SECONDS', 'SLEEP_MA')}
+    for name in set(sys.modules) - before:
+        del sys.modules[name]
+    return(currents)
+
+
+# Clock listener that adds up the seconds the radio is powered.
+def radio_timer(radio, totals):
+    def count(seconds):
+        if radio.powered:
+            totals[0] += seconds
+    return(count)
+
+
+# Clock listener that drains cell with what the board draws.
+def drainer(cell, state, radio, display):
+    currents = ledger_currents()
+    seen = [0]
+
+    def load():
+        if state['asleep']:
+            return(currents['SLEEP_MA'])
+        return(currents['AWAKE_MA'] + (currents['RADIO_MA'] if radio.powered else 0))
+
+    def drain(seconds):
+        for n in range(seen[0], len(display.refreshes)):
+            cell.drain(currents['REFRESH_MA'], currents['REFRESH_SECONDS'])
+        seen[0] = len(display.refreshes)
+        cell.drain(load(), seconds)
+
+    cell.load = load
+    return(drain)
+
+
+def run_boot(code, path, hardware, clock, heap):
+    alarm, supervisor = hardware['alarm'], hardware['supervisor']
+    before = set(sys.modules)
+    if heap is not None:
+        tracemalloc.start()
+    try:
+        exec(code, {'__name__': '__main__', '__file__': path})
+        return('finished', None)
+    except alarm.DeepSleepRequest as request:
+        return('deep sleep', request.alarms)
+    except supervisor.ReloadRequest:
+        return('reload', None)
+    except Exception:
+        traceback.print_exc()
+        return('error', None)
+    finally:
+        if heap is not None:
+            heap.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        for name in set(sys.modules) - before:
+            del sys.modules[name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('script', nargs='?', default='code.py')
+    parser.add_argument('--replay', default=os.path.join(HOST, 'replays', 'two_matches.json'),
+                        help='recorded timeline to serve')
+    parser.add_argument('--static', action='store_true',
+                        help='serve the sample JSON files instead of a replay')
+    parser.add_argument('--start', help='UTC start time, default an hour before the first kickoff')
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds per HTTP response')
+    parser.add_argument('--ntp-latency', type=float, default=0.05, help='seconds per SNTP reply')
+    parser.add_argument('--no-ntp', action='store_true', help='drop every UDP datagram')
+    parser.add_argument('--rate-limit', type=float, default=0)
+    parser.add_argument('--upside-down', action='store_true', help='hold the MagTag inverted')
+    parser.add_argument('--turn', type=float, action='append', default=[],
+                        help='turn the MagTag over this many seconds in (repeatable)')
+    parser.add_argument('--side', type=float, action='append', default=[],
+                        help='stand the MagTag on its side this many seconds in (repeatable)')
+    parser.add_argument('--tap', type=float, action='append', default=[],
+                        help='tap the MagTag this many seconds in (repeatable)')
+    parser.add_argument('--battery', type=float, help='hold the battery at this voltage')
+    parser.add_argument('--cell', type=float, help='run off a LiPo of this many mAh')
+    parser.add_argument('--charge', type=float, default=1.0, help="the cell's charge at the start, 0..1")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='replace a setting in the script (repeatable)')
+    parser.add_argument('--drift', type=float, default=0, help='RTC drift in ppm, + runs fast')
+    parser.add_argument('--panel-seconds', type=float, default=5.0,
+                        help="the panel's minimum time between refreshes")
+    parser.add_argument('--png', help='write each refresh to this folder')
+    parser.add_argument('--drive', help='folder standing in for CIRCUITPY, default a temp folder')
+    parser.add_argument('--lib', action='append', default=[], help='extra library folder')
+    parser.add_argument('--heap', action='store_true', help='trace peak heap per boot')
+    parser.add_argument('--quiet', action='store_true', help="hide the script's output")
+    parser.add_argument('--ledger', help='write the wake ledger CSV to this file')
+    parser.add_argument('--max-boots', type=int, default=1000)
+    args = parser.parse_args()
+
+    for lib in args.lib:
+        sys.path.append(os.path.abspath(lib))
+    path = os.path.join(ROOT, args.script)
+    with open(path) as fp:
+        code = compile(apply_settings(fp.read(), args.set), path, 'exec')
+
+    replay = None if args.static else Replay.load(args.replay)
+    if args.start:
+        start = iso_to_epoch(args.start)
+    elif replay:
+        start = min(m.kickoff for m in replay.matches) - 3600
+    else:
+        start = int(time.time())
+    if replay:
+        replay.start = start
+
+    clock = vclock.VirtualClock(start, args.drift / 1000000).install()
+    hardware = {name: __import__(name) for name in HARDWARE}
+    import wc_server
+    server = wc_server.make_server(0, quiet=True, replay=replay, rate_limit=args.rate_limit,
+                                   latency=args.latency)
+    hardware['socketpool'].network = server
+    if args.no_ntp:
+        hardware['socketpool'].datagrams = lambda data: None
+    else:
+        hardware['socketpool'].datagrams = sntp_responder(server.clock, args.ntp_latency)
+
+    lis3dh = hardware['adafruit_lis3dh']
+    upside_down = args.upside_down
+    lis3dh.script = [(0, lis3dh.UPSIDE_DOWN if upside_down else lis3dh.UPRIGHT)]
+    for at, side in sorted([(at, False) for at in args.turn] + [(at, True) for at in args.side]):
+        if side:
+            lis3dh.script.append((at, lis3dh.LEFT))
+            continue
+        if lis3dh.script[-1][1] != lis3dh.LEFT:
+            upside_down = not upside_down
+        lis3dh.script.append((at, lis3dh.UPSIDE_DOWN if upside_down else lis3dh.UPRIGHT))
+    lis3dh.taps = sorted(args.tap)
+    hardware['alarm'].pin.events['ACCELEROMETER_INTERRUPT'] = lis3dh.int1
+    if args.battery:
+        hardware['analogio'].battery.curve = [(0, args.battery)]
+    cell = None
+    state = {'asleep': False}
+    radio_on = [0.0]
+    clock.listeners.append(radio_timer(hardware['wifi'].radio, radio_on))
+    if args.cell:
+        cell = hardware['analogio'].battery = hardware['analogio'].Cell(args.cell, args.charge)
+        clock.listeners.append(drainer(cell, state, hardware['wifi'].radio,
+                                       hardware['board'].DISPLAY))
+    secrets = types.ModuleType('secrets')
+    secrets.secrets = dict(SECRETS)
+    sys.modules['secrets'] = secrets
+
+    drive = args.drive or tempfile.mkdtemp(prefix='circuitpy-')
+    saved = (builtins.open, ssl.create_default_context, os.getcwd())
+    builtins.open = drive_open(drive, builtins.open)
+    ssl.create_default_context = hardware['socketpool'].create_default_context
+    os.chdir(ROOT)
+
+    display = hardware['board'].DISPLAY
+    display.seconds_per_frame = args.panel_seconds
+    calls = hardware['socketpool'].calls
+    alarm = hardware['alarm']
+    boots = []
+    began = time.perf_counter()
+    try:
+        while len(boots) < args.max_boots and clock.now < args.hours * 3600:
+            if cell and cell.flat_at is not None:
+                break
+            boot = Boot(len(boots) + 1, clock.now, clock.time())
+            boot.woke_by = woken_by(alarm.wake_alarm)
+            boots.append(boot)
+            refreshes, requests, heap = len(display.refreshes), len(calls), []
+            radio_before = radio_on[0]
+            wall = time.perf_counter()
+            output = io.StringIO() if args.quiet else sys.stdout
+            with contextlib.redirect_stdout(output):
+                boot.ended, alarms = run_boot(code, path, hardware, clock, heap if args.heap else None)
+            boot.wall = time.perf_counter() - wall
+            boot.awake = clock.now - boot.started
+            boot.radio = radio_on[0] - radio_before
+            boot.refreshes = len(display.refreshes) - refreshes
+            boot.calls = len(calls) - requests
+            boot.heap = heap[0] if heap else None
+
+            if boot.ended == 'reload':
+                continue
+            if boot.ended != 'deep sleep':
+                break
+            at, wake = alarm.first(alarms)
+            if wake is None:
+                boot.ended = 'deep sleep, no alarm'
+                break
+            state['asleep'] = True
+            clock.sleep(at - clock.now)
+            state['asleep'] = False
+            alarm.wake_alarm = wake
+            hardware['wifi'].radio._reset()
+    finally:
+        builtins.open, ssl.create_default_context = saved[0], saved[1]
+        os.chdir(saved[2])
+        server.server_close()
+        clock.uninstall()
+    wall = time.perf_counter() - began
+    browned_out = []
+    if cell and cell.flat_at is not None:
+        browned_out = [r for r in display.refreshes if r[0] >= cell.flat_at]
+        del display.refreshes[len(display.refreshes) - len(browned_out):]
+        calls[:] = [c for c in calls if c.time < cell.flat_at]
+
+    print('\nBoots')
+    print('{:>4} {:<21} {:>8} {:>8} {:>9} {:>6} {:>8} {:>10}  {}'.format(
+        '#', 'woke (device time)', 'awake s', 'radio s', 'refreshes', 'calls', 'wall s', 'peak heap',
+        'ended'))
+    for boot in boots:
+        print('{:>4} {:<21} {:>8.1f} {:>8.1f} {:>9} {:>6} {:>8.2f} {:>10}  {}, woke by {}'.format(
+            boot.number, epoch_to_iso(boot.epoch), boot.awake, boot.radio, boot.refreshes, boot.calls,
+            boot.wall, '' if boot.heap is None else '{:0.1f}KB'.format(boot.heap / 1024), boot.ended,
+            boot.woke_by))
+
+    print('\nRefreshes')
+    for n, (at, rotation, frame) in enumerate(display.refreshes):
+        name = ''
+        if args.png:
+            os.makedirs(args.png, exist_ok=True)
+            name = os.path.join(args.png, '{:03d}_{:07.0f}s.png'.format(n + 1, at))
+            with saved[0](name, 'wb') as fp:
+                fp.write(display.png(frame))
+        print('{:>4} {:>10.1f}s rotation {:>3} {}'.format(n + 1, at, rotation, name))
+
+    if replay:
+        rows = score_latency(replay, start, display)
+        print('\nScore changes (API to pixels)')
+        for name, score, changed, latency, on_screen in rows:
+            print('  {:<28} {}-{}  at {}  {}{}'.format(
+                name, score[0], score[1], epoch_to_iso(changed),
+                'not shown' if latency is None else '{:0.1f}s'.format(latency),
+                '' if on_screen else ' (another screen was up)'))
+        shown = [r[3] for r in rows if r[3] is not None and r[4]]
+        if shown:
+            print('  {} changes on screen, latency mean {:0.1f}s, max {:0.1f}s'.format(
+                len(shown), sum(shown) / len(shown), max(shown)))
+
+    if args.turn or args.side:
+        print('\nTurns (accelerometer to pixels)')
+        for at in sorted(args.turn + args.side):
+            after = [(t, rotation) for t, rotation, frame in display.refreshes if t >= at]
+            print('  {:>8.1f}s  {}'.format(at, 'no refresh' if not after else
+                                           '{:0.1f}s, rotation {}'.format(after[0][0] - at, after[0][1])))
+
+    print('\nNetwork calls')
+    for call in calls:
+        print(call)
+
+    # Imported only now, so the boots above imported their own copy.
+    import wc_ledger
+    records = wc_ledger.read(alarm.sleep_memory)
+    print('\nWake ledger (last {} wakes)'.format(len(records)))
+    wc_ledger.dump(alarm.sleep_memory)
+    if args.ledger:
+        with saved[0](args.ledger, 'w') as fp:
+            for line in wc_ledger.csv_lines(records):
+                fp.write(line + '\n')
+
+    if cell:
+        print('\nBattery')
+        print('  {:0.0f} mAh cell, {:0.0f}% at the start, {:0.0f}% at the end'.format(
+            cell.capacity, args.charge * 100, cell.charge * 100))
+        if cell.flat_at is None:
+            print('  not flat after {:0.1f} hours'.format(clock.now / 3600))
+        else:
+            print('  flat at {:0.1f} hours ({}), {} refreshes after it dropped'.format(
+                cell.flat_at / 3600, epoch_to_iso(start + int(cell.flat_at)), len(browned_out)))
+        if display.refreshes:
+            print('  last refresh at {:0.1f} hours'.format(display.refreshes[-1][0] / 3600))
+
+    simulated = clock.now
+    print('\n{} boots, {} refreshes, {} requests ({} B in) over {:0.1f} simulated hours in {:0.1f}s'.format(
+        len(boots), len(display.refreshes), len(calls), sum(c.received for c in calls),
+        simulated / 3600, wall))
+    print('Awake {:0.0f}s in total, radio on {:0.0f}s'.format(
+        sum(b.awake for b in boots), sum(b.radio for b in boots)))
+
+
+if __name__ == '__main__':
+    main()
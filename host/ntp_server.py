@@ -0,0 +1,103 @@
+# Local SNTP stand-in
+'''
+Answers SNTP requests over UDP with the host's clock, or a replay clock,
+so wc_timesource.SNTPSource can be tested on a LAN.
+
+    python3 host/ntp_server.py [--port 1123] [--latency 0.05] [--offset 0]
+
+Then set NTP_SERVER = '<laptop ip>' and NTP_PORT = 1123 in code.py
+(port 123 needs root). --offset serves a clock that is off by that many
+seconds, --latency is the round trip added to each reply, as a distant
+server would have.
+host/wc_server.py --ntp-port serves the same replies from its replay
+clock.
+
+reply() is also what the simulator's socket pool calls for every
+datagram the MagTag code sends.
+'''
+
+import argparse
+import socketserver
+import struct
+import time
+
+NTP_EPOCH = 2208988800  # 1900-01-01 to 1970-01-01
+PACKET = '!BBbbII4sIIIIIIII'  # 48 bytes
+
+
+class Clock:
+
+    def __init__(self, offset=0):
+        self.offset = offset
+
+    def now(self):
+        return(time.time() + self.offset)
+
+
+def _timestamp(epoch):
+    seconds = int(epoch)
+    return(seconds + NTP_EPOCH, int((epoch - seconds) * 0x100000000))
+
+
+# The answer to an SNTP request at time now, or None if it is not one.
+def reply(request, now):
+    if len(request) < 48 or request[0] & 0x07 != 3:
+        return(None)
+    version = (request[0] >> 3) & 0x07
+    fields = struct.unpack(PACKET, bytes(request[0:48]))
+    stamp = _timestamp(now)
+    return(struct.pack(
+        PACKET,
+        (version << 3) | 4,  # no leap warning, server
+        1, 6, -20,  # stratum, poll, precision
+        0, 0, b'LOCL',  # root delay, dispersion, reference id
+        *_timestamp(now - 60),  # reference
+        fields[13], fields[14],  # originate: the client's transmit
+        *stamp, *stamp))  # received, transmitted
+
+
+class Handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        data, sock = self.request
+        server = self.server
+        time.sleep(server.latency / 2)
+        answer = reply(data, server.clock.now())
+        if answer is None:
+            return
+        time.sleep(server.latency / 2)
+        sock.sendto(answer, self.client_address)
+        server.replies += 1
+        if not server.quiet:
+            print('{} SNTP reply'.format(self.client_address[0]))
+
+
+def make_server(port=1123, clock=None, latency=0, quiet=False):
+    server = socketserver.ThreadingUDPServer(('', port), Handler)
+    server.clock = clock or Clock()
+    server.latency = latency
+    server.quiet = quiet
+    server.replies = 0
+    return(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=1123)
+    parser.add_argument('--latency', type=float, default=0, help='seconds before each reply')
+    parser.add_argument('--offset', type=float, default=0, help='seconds to add to the clock')
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    server = make_server(args.port, Clock(args.offset), args.latency, args.quiet)
+    print('Serving SNTP on UDP port {}'.format(args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print('{} replies'.format(server.replies))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# Recorded match replay
+'''
+Plays back one or more recorded matches on a clock, producing the
+worldcupjson payloads they would have had at any moment.
+
+A replay file lists the matches and when they kick off:
+
+    {"start": "2022-11-26T18:55:00Z",
+     "matches": [
+        {"file": "wc_current_match.json", "index": 0,
+         "kickoff": "2022-11-26T19:00:00Z"},
+        {"file": "wc_test_data.json", "index": 2,
+         "kickoff": "2022-11-26T19:30:00Z",
+         "events": {"home": [{"type_of_event": "goal", "player": "...", "time": "36'"}],
+                    "away": []},
+         "penalties": {"home": 4, "away": 3}}]}
+
+"file" and "index" pick the recorded payload (paths are relative to the
+repo). Its home_team_events / away_team_events are the timeline; "events"
+adds to them. Goals are counted from the events shown so far, so the
+score moves exactly when the recording says.
+
+Match clock, in real minutes after kickoff: first half to 47, half-time
+to 62, second half to 111 (shown as 46'..90'+n'), then a 10 minute
+shootout when "penalties" is given, then completed.
+'''
+
+import copy
+import json
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, ROOT)
+from wc_time import epoch_to_iso, iso_to_epoch  # noqa: E402
+
+FIRST_HALF_END = 47
+SECOND_HALF_START = 62
+SECOND_HALF_END = 111
+SHOOTOUT = 10
+
+
+# "64'" -> 64, "90'+3'" -> 93
+def event_minute(text):
+    total = 0
+    for part in text.replace("'", '').split('+'):
+        total += int(part or 0)
+    return(total)
+
+
+# Match minute and clock text for real minutes after kickoff.
+# Returns (status, minute, time_text).
+def match_clock(real_minutes, shootout):
+    if real_minutes < 0:
+        return('future_scheduled', None, None)
+    if real_minutes < FIRST_HALF_END:
+        minute = int(real_minutes) + 1
+        text = "{}'".format(minute) if minute <= 45 else "45'+{}'".format(minute - 45)
+        return('in_progress', minute, text)
+    if real_minutes < SECOND_HALF_START:
+        return('in_progress', 45, 'half-time')
+    if real_minutes < SECOND_HALF_END:
+        minute = int(real_minutes - SECOND_HALF_START) + 46
+        text = "{}'".format(minute) if minute <= 90 else "90'+{}'".format(minute - 90)
+        return('in_progress', minute, text)
+    if shootout and real_minutes < SECOND_HALF_END + SHOOTOUT:
+        return('in_progress', 120, 'penalties')
+    return('completed', 120, 'full-time')
+
+
+class ReplayMatch:
+
+    def __init__(self, spec):
+        with open(os.path.join(ROOT, spec['file'])) as fp:
+            self.base = json.load(fp)[spec.get('index', 0)]
+        self.kickoff = iso_to_epoch(spec.get('kickoff', self.base['datetime']))
+        self.penalties = spec.get('penalties')
+        self.events = {}
+        next_id = 100000
+        for side in ('home', 'away'):
+            events = list(self.base.get('{}_team_events'.format(side)) or [])
+            for event in spec.get('events', {}).get(side, []):
+                event = dict(event)
+                event.setdefault('id', next_id)
+                event.setdefault('extra_info', None)
+                next_id += 1
+                events.append(event)
+            self.events[side] = sorted(events, key=lambda e: (event_minute(e['time']), e['id']))
+
+    def _goals(self, side, events, other_events):
+        goals = sum(1 for e in events if e['type_of_event'] in ('goal', 'goal-penalty'))
+        return(goals + sum(1 for e in other_events if e['type_of_event'] == 'goal-own'))
+
+    # The payload at epoch now, and the epoch it last changed.
+    def payload(self, now):
+        real_minutes = (now - self.kickoff) / 60
+        status, minute, clock = match_clock(real_minutes, self.penalties is not None)
+        match = copy.deepcopy(self.base)
+        match['datetime'] = epoch_to_iso(self.kickoff)
+        match['status'] = status
+        match['time'] = clock
+        if isinstance(match.get('detailed_time'), dict):
+            match['detailed_time']['current_time'] = clock
+
+        if status == 'future_scheduled':
+            changed = self.kickoff - 3600
+            shown = {'home': [], 'away': []}
+            for side in ('home', 'away'):
+                match['{}_team'.format(side)]['goals'] = None
+                match['{}_team'.format(side)]['penalties'] = None
+        else:
+            # Changes once per real minute while the match runs.
+            changed = self.kickoff + int(min(real_minutes, SECOND_HALF_END + SHOOTOUT)) * 60
+            shown = {side: [e for e in self.events[side] if event_minute(e['time']) <= minute]
+                     for side in ('home', 'away')}
+            for side, other in (('home', 'away'), ('away', 'home')):
+                team = match['{}_team'.format(side)]
+                team['goals'] = self._goals(side, shown[side], shown[other])
+                team['penalties'] = 0
+                if self.penalties and clock in ('penalties', 'full-time'):
+                    team['penalties'] = self.penalties[side]
+
+        for side in ('home', 'away'):
+            if '{}_team_events'.format(side) in match or self.events[side]:
+                match['{}_team_events'.format(side)] = shown[side]
+
+        if status == 'completed':
+            home = (match['home_team']['goals'], match['home_team']['penalties'])
+            away = (match['away_team']['goals'], match['away_team']['penalties'])
+            winner = match['home_team'] if home > away else match['away_team'] if away > home else None
+            match['winner'] = winner['name'] if winner else 'Draw'
+            match['winner_code'] = winner['country'] if winner else 'Draw'
+        else:
+            match['winner'] = None
+            match['winner_code'] = None
+
+        match['last_changed_at'] = epoch_to_iso(changed)
+        match['last_checked_at'] = epoch_to_iso(int(now) // 60 * 60)  # checked once a minute
+        return(match)
+
+
+class Replay:
+
+    def __init__(self, spec):
+        self.matches = [ReplayMatch(m) for m in spec['matches']]
+        first = min(m.kickoff for m in self.matches)
+        self.start = iso_to_epoch(spec['start']) if 'start' in spec else first - 300
+
+    @classmethod
+    def load(cls, file_name):
+        with open(file_name) as fp:
+            return(cls(json.load(fp)))
+
+    @property
+    def end(self):
+        return(max(m.kickoff for m in self.matches) + (SECOND_HALF_END + SHOOTOUT + 5) * 60)
+
+    # Matches in progress at epoch now, like /matches/current.
+    def current(self, now):
+        payloads = [m.payload(now) for m in self.matches]
+        return([p for p in payloads if p['status'] == 'in_progress'])
+
+    # Matches kicking off on the given UTC dates, like /matches?start_date=..
+    def schedule(self, now, start_date=None, end_date=None):
+        result = []
+        for m in self.matches:
+            day = epoch_to_iso(m.kickoff)[0:10]
+            if (start_date and day < start_date) or (end_date and day > end_date):
+                continue
+            result.append(m.payload(now))
+        return(result)
@@ -0,0 +1,198 @@
+# Host stand-in for the adafruit_lis3dh library
+'''
+A scriptable LIS3DH. acceleration follows script, a list of
+(seconds since start, (x, y, z)) in m/s^2; the latest entry whose time
+has passed applies. The default holds the MagTag upright.
+
+    import adafruit_lis3dh
+    adafruit_lis3dh.script = [(0, UPRIGHT), (3600, UPSIDE_DOWN)]
+
+Taps are scheduled the same way, as a list of seconds; tapped is True
+once for each tap that has passed.
+
+The chip's registers are kept here at module level, so like the real
+LIS3DH they keep their settings while the board deep sleeps. INT1 is
+worked out from them: int1 is an iterable of the times INT1 goes high,
+for alarm.pin.events['ACCELEROMETER_INTERRUPT']. A turn raises it when
+INT1_CFG has 6D movement on and CTRL_REG3 routes IA1, after
+INT1_DURATION samples: a turn into a position INT1_CFG enables (Y high
+and Y low for upright and upside down, X for on its side) other than the
+one before. A tap raises it when CTRL_REG3 routes
+clicks and the data rate is TAP_MIN_RATE or more. The line stays high
+until INT1_SRC / CLICK_SRC is read (LIR_INT1, LIR_Click), so an
+interrupt left latched wakes the board as soon as it sleeps.
+'''
+
+import time
+
+STANDARD_GRAVITY = 9.806
+
+UPRIGHT = (0.0, STANDARD_GRAVITY, 0.0)
+UPSIDE_DOWN = (0.0, -STANDARD_GRAVITY, 0.0)
+LEFT = (-STANDARD_GRAVITY, 0.0, 0.0)
+RIGHT = (STANDARD_GRAVITY, 0.0, 0.0)
+FLAT = (0.0, 0.0, STANDARD_GRAVITY)
+
+RANGE_2_G = 0
+RANGE_4_G = 1
+RANGE_8_G = 2
+RANGE_16_G = 3
+DATARATE_POWERDOWN = 0
+DATARATE_1_HZ = 1
+DATARATE_10_HZ = 2
+DATARATE_25_HZ = 3
+DATARATE_50_HZ = 4
+DATARATE_100_HZ = 5
+DATARATE_200_HZ = 6
+DATARATE_400_HZ = 7
+_HZ = {0: 0, 1: 1, 2: 10, 3: 25, 4: 50, 5: 100, 6: 200, 7: 400}
+
+TAP_MIN_RATE = DATARATE_100_HZ
+LATCHED = 0.01  # seconds until a board sleeping on a latched INT1 wakes
+
+_CTRL_REG1 = 0x20
+_CTRL_REG3 = 0x22
+_CTRL_REG4 = 0x23
+_CTRL_REG5 = 0x24
+_INT1_CFG = 0x30
+_INT1_SRC = 0x31
+_INT1_DURATION = 0x33
+_CLICK_CFG = 0x38
+_CLICK_SRC = 0x39
+_CLICK_THS = 0x3A
+_TIME_LIMIT = 0x3B
+_TIME_LATENCY = 0x3C
+_TIME_WINDOW = 0x3D
+
+script = [(0, UPRIGHT)]
+taps = []
+registers = bytearray(0x40)
+_cleared = {_INT1_SRC: 0.0, _CLICK_SRC: 0.0}  # when each source was last read
+
+
+def _reading(at):
+    value = script[0][1]
+    for t, reading in script:
+        if t <= at:
+            value = reading
+    return(value)
+
+
+def _rate():
+    return(registers[_CTRL_REG1] >> 4)
+
+
+# The 6D position of a reading among those INT1_CFG enables, as (axis,
+# sign), or None.
+def _position(reading):
+    config = registers[_INT1_CFG]
+    for axis in range(3):
+        low, high = 1 << (2 * axis), 2 << (2 * axis)
+        if config & high and reading[axis] > STANDARD_GRAVITY / 2:
+            return((axis, 1))
+        if config & low and reading[axis] < -STANDARD_GRAVITY / 2:
+            return((axis, -1))
+    return(None)
+
+
+# Times a turn or a tap raised INT1, from the scripts and the registers.
+def _raised():
+    rate = _rate()
+    if not rate:
+        return([], [])
+    turns = []
+    if registers[_CTRL_REG3] & 0x40 and registers[_INT1_CFG] & 0xC0 == 0x40:
+        hold = max(1, registers[_INT1_DURATION]) / _HZ[rate]
+        for (before, a), (at, b) in zip(script, script[1:]):
+            if _position(b) is not None and _position(b) != _position(a):
+                turns.append(at + hold)
+    tapped = []
+    if registers[_CTRL_REG3] & 0x80 and registers[_CLICK_CFG] and rate >= TAP_MIN_RATE:
+        tapped = list(taps)
+    return(turns, tapped)
+
+
+class _Int1:
+
+    def __iter__(self):
+        now = time.monotonic()
+        turns, tapped = _raised()
+        times = []
+        for source, raised in ((_INT1_SRC, turns), (_CLICK_SRC, tapped)):
+            for at in raised:
+                if at > now:
+                    times.append(at)
+                elif at > _cleared[source]:
+                    times.append(now + LATCHED)  # latched high since then
+        return(iter(times))
+
+
+int1 = _Int1()
+
+
+class LIS3DH_I2C:
+
+    def __init__(self, i2c, *, address=0x18, int1=None, int2=None):
+        self.address = address
+        # What the driver writes: all axes, 400 Hz, high resolution, BDU,
+        # INT1 latched.
+        registers[_CTRL_REG1] = (DATARATE_400_HZ << 4) | 0x07
+        registers[_CTRL_REG4] = 0x88
+        registers[_CTRL_REG5] = 0x08
+        self._taps_seen = len([t for t in taps if t <= time.monotonic()])
+
+    def _read_register_byte(self, register):
+        if register in _cleared:
+            _cleared[register] = time.monotonic()
+        return(registers[register])
+
+    def _write_register_byte(self, register, value):
+        registers[register] = value & 0xFF
+
+    @property
+    def range(self):
+        return((registers[_CTRL_REG4] >> 4) & 0x03)
+
+    @range.setter
+    def range(self, value):
+        registers[_CTRL_REG4] = (registers[_CTRL_REG4] & ~0x30) | (value << 4)
+
+    @property
+    def data_rate(self):
+        return(_rate())
+
+    @data_rate.setter
+    def data_rate(self, value):
+        registers[_CTRL_REG1] = (registers[_CTRL_REG1] & 0x0F) | (value << 4)
+
+    @property
+    def acceleration(self):
+        return(_reading(time.monotonic()))
+
+    def shake(self, shake_threshold=30, avg_count=10, total_delay=0.1):
+        return(False)
+
+    # As the driver: click interrupt on INT1, single (1) or double (2) tap
+    # on all axes, 0 turns it off.
+    def set_tap(self, tap, threshold, *, time_limit=10, time_latency=20, time_window=255,
+                click_cfg=None):
+        if tap == 0 and click_cfg is None:
+            registers[_CTRL_REG3] &= ~0x80
+            registers[_CLICK_CFG] = 0
+            return
+        registers[_CTRL_REG3] |= 0x80
+        registers[_CLICK_CFG] = click_cfg if click_cfg is not None else (0x15 if tap == 1 else 0x2A)
+        registers[_CLICK_THS] = 0x80 | threshold
+        registers[_TIME_LIMIT] = time_limit
+        registers[_TIME_LATENCY] = time_latency
+        registers[_TIME_WINDOW] = time_window
+
+    @property
+    def tapped(self):
+        if not registers[_CLICK_CFG]:
+            return(False)
+        passed = len([t for t in taps if t <= time.monotonic()])
+        if passed > self._taps_seen:
+            self._taps_seen += 1
+            return(True)
+        return(False)
@@ -0,0 +1,43 @@
+# Host stand-in for CircuitPython's alarm module
+'''
+sleep_memory survives simulated deep sleeps because this module outlives
+each run of the script. exit_and_deep_sleep_until_alarms() raises
+DeepSleepRequest; the simulator catches it, moves the virtual clock to
+the earliest alarm and starts the script again with wake_alarm set.
+light_sleep_until_alarms() moves the clock and returns at once.
+'''
+
+import time as _time
+
+from . import pin, time  # noqa: F401
+
+sleep_memory = bytearray(8192)
+wake_alarm = None
+
+
+class DeepSleepRequest(BaseException):
+
+    def __init__(self, alarms):
+        super().__init__()
+        self.alarms = alarms
+
+
+# The alarm that fires first and when, on the monotonic clock.
+def first(alarms):
+    timed = [a for a in alarms if isinstance(a, time.TimeAlarm)]
+    fired = [a for a in alarms if isinstance(a, pin.PinAlarm) and a.fires_at() is not None]
+    events = [(a.monotonic_time, a) for a in timed] + [(a.fires_at(), a) for a in fired]
+    if not events:
+        return(None, None)
+    return(min(events, key=lambda e: e[0]))
+
+
+def exit_and_deep_sleep_until_alarms(*alarms, preserve_dios=()):
+    raise DeepSleepRequest(alarms)
+
+
+def light_sleep_until_alarms(*alarms):
+    at, alarm = first(alarms)
+    if alarm is not None:
+        _time.sleep(at - _time.monotonic())
+    return(alarm)
@@ -0,0 +1,26 @@
+# Host stand-in for CircuitPython's alarm.pin module
+'''
+A PinAlarm fires at the first time in events[pin name] that is still
+ahead of the clock, so pin wakes can be scripted:
+
+    import alarm
+    alarm.pin.events['ACCELEROMETER_INTERRUPT'] = [5400]
+'''
+
+import time
+
+events = {}
+
+
+class PinAlarm:
+
+    def __init__(self, pin, value=False, edge=False, pull=False):
+        self.pin = pin
+        self.value = value
+        self.edge = edge
+        self.pull = pull
+
+    def fires_at(self):
+        now = time.monotonic()
+        ahead = [t for t in events.get(getattr(self.pin, 'name', self.pin), ()) if t > now]
+        return(min(ahead) if ahead else None)
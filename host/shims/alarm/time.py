@@ -0,0 +1,12 @@
+# Host stand-in for CircuitPython's alarm.time module
+
+import time
+
+
+class TimeAlarm:
+
+    def __init__(self, *, monotonic_time=None, epoch_time=None):
+        if monotonic_time is None:
+            monotonic_time = time.monotonic() + (epoch_time - time.time())
+        self.monotonic_time = monotonic_time
+        self.epoch_time = epoch_time
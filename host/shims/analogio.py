@@ -0,0 +1,109 @@
+# Host stand-in for CircuitPython's analogio module
+'''
+AnalogIn on board.VOLTAGE_MONITOR reads the simulated battery. The
+MagTag measures the battery through a 1:2 divider against 3.3 V, so
+value = volts / 2 / 3.3 * 65535.
+
+battery.curve is a list of (hours since start, volts), interpolated
+linearly and held after the last point:
+
+    import analogio
+    analogio.battery.curve = [(0, 4.1), (48, 3.7), (60, 3.4)]
+
+A Cell in its place is a LiPo that runs down with what the board draws:
+drain() takes mA over seconds off its charge, and voltage is the open-
+circuit voltage for the charge left on a typical LiPo curve, less the
+sag of load() mA across the cell's internal resistance, plus ADC noise.
+flat_at is when the charge fell to where the open-circuit voltage is
+CUTOFF and the board browns out.
+
+    analogio.battery = analogio.Cell(420, charge=0.3)
+'''
+
+import random
+import time
+
+CUTOFF = 3.4  # volts at which the MagTag browns out
+
+# Open-circuit voltage of a typical LiPo cell at each tenth of charge.
+CURVE = (3.27, 3.69, 3.73, 3.77, 3.79, 3.82, 3.87, 3.92, 3.98, 4.06, 4.20)
+
+
+class Battery:
+
+    def __init__(self, curve=((0, 4.15), (96, 3.85), (168, 3.7), (200, 3.4))):
+        self.curve = list(curve)
+
+    @property
+    def voltage(self):
+        hours = time.monotonic() / 3600
+        points = self.curve
+        if hours <= points[0][0]:
+            return(points[0][1])
+        for (h0, v0), (h1, v1) in zip(points, points[1:]):
+            if hours <= h1:
+                return(v0 + (v1 - v0) * (hours - h0) / (h1 - h0))
+        return(points[-1][1])
+
+
+def _ocv(charge):
+    charge = max(0.0, min(1.0, charge)) * 10
+    i = min(int(charge), 9)
+    return(CURVE[i] + (CURVE[i + 1] - CURVE[i]) * (charge - i))
+
+
+def _charge_at(volts):
+    for i in range(10):
+        if volts < CURVE[i + 1]:
+            return((i + max(0.0, volts - CURVE[i]) / (CURVE[i + 1] - CURVE[i])) / 10)
+    return(1.0)
+
+
+class Cell:
+
+    def __init__(self, capacity, charge=1.0, resistance=0.2, noise=0.02, seed=1):
+        self.capacity = capacity  # mAh
+        self.left = capacity * charge  # mAh
+        self.resistance = resistance  # ohms
+        self.noise = noise  # volts, standard deviation of a reading
+        self.load = lambda: 0  # mA the board draws now
+        self.flat_at = None  # monotonic
+        self._floor = capacity * _charge_at(CUTOFF)
+        self._random = random.Random(seed)
+
+    @property
+    def charge(self):
+        return(self.left / self.capacity)
+
+    def drain(self, ma, seconds):
+        if ma <= 0 or seconds <= 0:
+            return
+        used = ma * seconds / 3600
+        if self.flat_at is None and self.left - used <= self._floor:
+            self.flat_at = time.monotonic() + max(0.0, self.left - self._floor) / ma * 3600
+        self.left = max(0.0, self.left - used)
+
+    @property
+    def voltage(self):
+        sag = self.load() / 1000 * self.resistance
+        return(_ocv(self.charge) - sag + self._random.gauss(0, self.noise))
+
+
+battery = Battery()
+
+
+class AnalogIn:
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.reference_voltage = 3.3
+        self.level = 0  # value for pins other than VOLTAGE_MONITOR
+
+    @property
+    def value(self):
+        if getattr(self.pin, 'name', None) == 'VOLTAGE_MONITOR':
+            return(min(65535, int(battery.voltage / 2 / self.reference_voltage * 65535)))
+        return(self.level)
+
+    def deinit(self):
+        pass
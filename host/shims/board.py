@@ -0,0 +1,39 @@
+# Host stand-in for the MagTag's board module
+'''
+Pin names of the Adafruit MagTag, and DISPLAY as a simulated 296x128
+e-ink panel (see displayio.EPaperDisplay).
+'''
+
+import displayio
+
+
+class Pin:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return('board.{}'.format(self.name))
+
+
+ACCELEROMETER_INTERRUPT = Pin('ACCELEROMETER_INTERRUPT')
+BUTTON_A = Pin('BUTTON_A')
+BUTTON_B = Pin('BUTTON_B')
+BUTTON_C = Pin('BUTTON_C')
+BUTTON_D = Pin('BUTTON_D')
+D10 = Pin('D10')
+LIGHT = Pin('LIGHT')
+NEOPIXEL = Pin('NEOPIXEL')
+NEOPIXEL_POWER = Pin('NEOPIXEL_POWER')
+SCL = Pin('SCL')
+SDA = Pin('SDA')
+SPEAKER = Pin('SPEAKER')
+SPEAKER_ENABLE = Pin('SPEAKER_ENABLE')
+VOLTAGE_MONITOR = Pin('VOLTAGE_MONITOR')
+
+DISPLAY = displayio.EPaperDisplay()
+
+
+def I2C():
+    import busio
+    return(busio.I2C(SCL, SDA))
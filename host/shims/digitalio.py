@@ -0,0 +1,45 @@
+# Host stand-in for CircuitPython's digitalio module
+
+
+class Direction:
+    INPUT = 'INPUT'
+    OUTPUT = 'OUTPUT'
+
+
+class Pull:
+    UP = 'UP'
+    DOWN = 'DOWN'
+
+
+class DriveMode:
+    PUSH_PULL = 'PUSH_PULL'
+    OPEN_DRAIN = 'OPEN_DRAIN'
+
+
+class DigitalInOut:
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.drive_mode = DriveMode.PUSH_PULL
+        self.value = False
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self.drive_mode = drive_mode
+        self.value = value
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+        self.value = pull == Pull.UP
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,367 @@
+# Host stand-in for CircuitPython's displayio module
+'''
+Enough of displayio for the MagTag code to run on a laptop.
+
+Groups, TileGrids, Bitmaps and Palettes behave like the real ones, and
+EPaperDisplay.refresh() renders the shown group into a 296x128 grayscale
+framebuffer (four gray levels, like the MagTag panel). Every refresh is
+recorded with its time and frame, and frames can be written out as PNG.
+The texts of the labels drawn are recorded alongside (texts), so a host
+script can tell what a refresh showed without reading pixels.
+'''
+
+import struct
+import time
+import zlib
+
+GRAY_LEVELS = 4
+
+
+class Bitmap:
+
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._data = bytearray(width * height)
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            x, y = key
+            return(y * self.width + x)
+        return(key)
+
+    def __getitem__(self, key):
+        return(self._data[self._index(key)])
+
+    def __setitem__(self, key, value):
+        self._data[self._index(key)] = value
+
+    def fill(self, value):
+        for i in range(len(self._data)):
+            self._data[i] = value
+
+    # Copy a region of source into this bitmap at (x, y).
+    def blit(self, x, y, source, *, x1=0, y1=0, x2=None, y2=None, skip_index=None):
+        x2 = source.width if x2 is None else min(x2, source.width)
+        y2 = source.height if y2 is None else min(y2, source.height)
+        for sy in range(y1, y2):
+            ty = y + sy - y1
+            if not 0 <= ty < self.height:
+                continue
+            for sx in range(x1, x2):
+                tx = x + sx - x1
+                if not 0 <= tx < self.width:
+                    continue
+                value = source._data[sy * source.width + sx]
+                if value != skip_index:
+                    self._data[ty * self.width + tx] = value
+
+
+class Palette:
+
+    def __init__(self, color_count, *, dither=False):
+        self._colors = [0] * color_count
+        self._transparent = set()
+        self.dither = dither
+
+    def __len__(self):
+        return(len(self._colors))
+
+    def __getitem__(self, index):
+        return(self._colors[index])
+
+    def __setitem__(self, index, color):
+        if isinstance(color, (tuple, list, bytes, bytearray)):
+            color = (color[0] << 16) | (color[1] << 8) | color[2]
+        self._colors[index] = color
+
+    def make_transparent(self, index):
+        self._transparent.add(index)
+
+    def make_opaque(self, index):
+        self._transparent.discard(index)
+
+    def is_transparent(self, index):
+        return(index in self._transparent)
+
+
+class ColorConverter:
+
+    def __init__(self, *, input_colorspace=None, dither=False):
+        self.dither = dither
+
+    def convert(self, color):
+        return(color)
+
+    # As a pixel_shader the bitmap holds colors.
+    def __getitem__(self, color):
+        return(color)
+
+    def is_transparent(self, color):
+        return(False)
+
+
+class TileGrid:
+
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1, tile_width=None,
+                 tile_height=None, default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self._width = width
+        self._height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+        self._tiles = bytearray([default_tile] * (width * height))
+
+    # Size in tiles.
+    @property
+    def width(self):
+        return(self._width)
+
+    @property
+    def height(self):
+        return(self._height)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            index = index[1] * self._width + index[0]
+        return(self._tiles[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            index = index[1] * self._width + index[0]
+        self._tiles[index] = value
+
+    def contains(self, touch_tuple):
+        x, y = touch_tuple[0], touch_tuple[1]
+        return(self.x <= x < self.x + self._width * self.tile_width
+               and self.y <= y < self.y + self._height * self.tile_height)
+
+
+class Group:
+
+    # Kept in underscore attributes, like the native type's own fields, so
+    # subclasses can override the properties (display_text labels do).
+    def __init__(self, *, scale=1, x=0, y=0):
+        self._scale = scale
+        self._x = x
+        self._y = y
+        self._hidden = False
+        self._items = []
+
+    @property
+    def scale(self):
+        return(self._scale)
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = value
+
+    @property
+    def x(self):
+        return(self._x)
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+
+    @property
+    def y(self):
+        return(self._y)
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+
+    @property
+    def hidden(self):
+        return(self._hidden)
+
+    @hidden.setter
+    def hidden(self, value):
+        self._hidden = value
+
+    def append(self, layer):
+        self._items.append(layer)
+
+    def insert(self, index, layer):
+        self._items.insert(index, layer)
+
+    def index(self, layer):
+        return(self._items.index(layer))
+
+    def pop(self, i=-1):
+        return(self._items.pop(i))
+
+    def remove(self, layer):
+        self._items.remove(layer)
+
+    def sort(self, key=None, reverse=False):
+        self._items.sort(key=key, reverse=reverse)
+
+    def __len__(self):
+        return(len(self._items))
+
+    def __getitem__(self, index):
+        return(self._items[index])
+
+    def __setitem__(self, index, layer):
+        self._items[index] = layer
+
+    def __delitem__(self, index):
+        del self._items[index]
+
+    def __iter__(self):
+        return(iter(self._items))
+
+
+# Texts of the (display_text) labels in a group, in drawing order.
+def label_texts(layer):
+    if getattr(layer, 'hidden', False):
+        return([])
+    text = getattr(layer, 'text', None)
+    if isinstance(text, str):
+        return([text])
+    if isinstance(layer, Group):
+        return([t for item in layer for t in label_texts(item)])
+    return([])
+
+
+def release_displays():
+    pass
+
+
+# 0..255 gray for a 0xRRGGBB color, quantized to the panel's levels.
+def gray(color):
+    luma = (299 * (color >> 16 & 0xFF) + 587 * (color >> 8 & 0xFF) + 114 * (color & 0xFF)) // 1000
+    step = 255 // (GRAY_LEVELS - 1)
+    return((luma + step // 2) // step * step)
+
+
+# An 8-bit grayscale PNG of a width x height frame.
+def png(frame, width, height):
+    def chunk(kind, data):
+        body = kind + data
+        return(struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body)))
+    rows = b''.join(b'\x00' + bytes(frame[y * width:(y + 1) * width]) for y in range(height))
+    return(b'\x89PNG\r\n\x1a\n'
+           + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+           + chunk(b'IDAT', zlib.compress(rows))
+           + chunk(b'IEND', b''))
+
+
+class EPaperDisplay:
+    # The panel is 296x128; rotation 270 is the MagTag held upright.
+
+    def __init__(self, width=296, height=128, *, rotation=270, seconds_per_frame=5.0):
+        self._panel = (width, height)
+        self.rotation = rotation
+        self.seconds_per_frame = seconds_per_frame
+        self.root_group = None
+        self.frame = bytearray([255]) * (width * height)
+        self.refreshes = []  # (monotonic time, rotation, frame)
+        self.texts = []  # label texts shown by each refresh
+        self._last_refresh = None
+
+    @property
+    def width(self):
+        return(self._panel[0] if self.rotation % 180 else self._panel[1])
+
+    @property
+    def height(self):
+        return(self._panel[1] if self.rotation % 180 else self._panel[0])
+
+    @property
+    def time_to_refresh(self):
+        if self._last_refresh is None:
+            return(0)
+        return(max(0, self._last_refresh + self.seconds_per_frame - time.monotonic()))
+
+    @property
+    def busy(self):
+        return(False)
+
+    def show(self, group):
+        self.root_group = group
+
+    def refresh(self):
+        if self.time_to_refresh > 0:
+            raise RuntimeError('Refresh too soon')
+        self._last_refresh = time.monotonic()
+        self.render()
+        self.refreshes.append((self._last_refresh, self.rotation, bytes(self.frame)))
+        self.texts.append(label_texts(self.root_group))
+
+    # Draw the shown group into the framebuffer.
+    def render(self):
+        panel_width, panel_height = self._panel
+        for i in range(len(self.frame)):
+            self.frame[i] = 255
+        width, height = self.width, self.height
+        turn = (self.rotation - 270) % 360
+        frame = self.frame
+
+        def plot(x, y, value):
+            if not (0 <= x < width and 0 <= y < height):
+                return
+            if turn == 0:
+                px, py = x, y
+            elif turn == 180:
+                px, py = panel_width - 1 - x, panel_height - 1 - y
+            elif turn == 90:
+                px, py = panel_width - 1 - y, x
+            else:
+                px, py = y, panel_height - 1 - x
+            frame[py * panel_width + px] = value
+
+        if self.root_group is not None:
+            _draw(self.root_group, 0, 0, 1, plot)
+
+    def png(self, frame=None):
+        return(png(self.frame if frame is None else frame, *self._panel))
+
+
+def _draw(item, x, y, scale, plot):
+    if isinstance(item, Group):
+        if item._hidden:
+            return
+        x += item._x * scale
+        y += item._y * scale
+        scale *= item._scale
+        for layer in item:
+            _draw(layer, x, y, scale, plot)
+        return
+
+    # TileGrid
+    if item.hidden:
+        return
+    bitmap = item.bitmap
+    shader = item.pixel_shader
+    tw, th = item.tile_width, item.tile_height
+    tiles_across = bitmap.width // tw
+    left = x + item.x * scale
+    top = y + item.y * scale
+    for ty in range(item._height):
+        for tx in range(item._width):
+            tile = item._tiles[ty * item._width + tx]
+            bx0 = (tile % tiles_across) * tw
+            by0 = (tile // tiles_across) * th
+            for py in range(th):
+                row = (by0 + py) * bitmap.width
+                for px in range(tw):
+                    value = bitmap._data[row + bx0 + px]
+                    if shader.is_transparent(value):
+                        continue
+                    shade = gray(shader[value])
+                    sx = left + (tx * tw + px) * scale
+                    sy = top + (ty * th + py) * scale
+                    for dy in range(scale):
+                        for dx in range(scale):
+                            plot(sx + dx, sy + dy, shade)
@@ -0,0 +1,28 @@
+# Host stand-in for CircuitPython's fontio module
+
+
+class Glyph:
+
+    def __init__(self, bitmap, tile_index, width, height, dx, dy, shift_x, shift_y):
+        self.bitmap = bitmap
+        self.tile_index = tile_index
+        self.width = width
+        self.height = height
+        self.dx = dx
+        self.dy = dy
+        self.shift_x = shift_x
+        self.shift_y = shift_y
+
+
+# What the display libraries type fonts as.
+class FontProtocol:
+
+    def get_bounding_box(self):
+        raise NotImplementedError
+
+    def get_glyph(self, codepoint):
+        raise NotImplementedError
+
+
+class BuiltinFont(FontProtocol):
+    pass
@@ -0,0 +1,53 @@
+# Host stand-in for the neopixel library
+'''
+A NeoPixel strip that keeps its colors in memory. Every change that is
+shown is recorded in history as (monotonic time, colors).
+'''
+
+import time
+
+GRB = 'GRB'
+RGB = 'RGB'
+
+history = []
+
+
+class NeoPixel:
+
+    def __init__(self, pin, n, *, bpp=3, brightness=1.0, auto_write=True, pixel_order=None):
+        self.pin = pin
+        self.n = n
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self._pixels = [(0, 0, 0)] * n
+
+    def _color(self, value):
+        if isinstance(value, int):
+            return((value >> 16 & 0xFF, value >> 8 & 0xFF, value & 0xFF))
+        return(tuple(value))
+
+    def __len__(self):
+        return(self.n)
+
+    def __getitem__(self, index):
+        return(self._pixels[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            for i, v in zip(range(*index.indices(self.n)), value):
+                self._pixels[i] = self._color(v)
+        else:
+            self._pixels[index] = self._color(value)
+        if self.auto_write:
+            self.show()
+
+    def fill(self, color):
+        self._pixels = [self._color(color)] * self.n
+        if self.auto_write:
+            self.show()
+
+    def show(self):
+        history.append((time.monotonic(), tuple(self._pixels)))
+
+    def deinit(self):
+        pass
@@ -0,0 +1,52 @@
+# Host stand-in for CircuitPython's pwmio module
+'''
+A PWMOut that keeps its frequency and duty cycle. Every change is
+recorded in history as (monotonic time, pin, frequency, duty_cycle), so
+the speaker's tones can be read back: a tone plays while duty_cycle is
+not 0.
+'''
+
+import time
+
+history = []
+
+
+class PWMOut:
+
+    def __init__(self, pin, *, duty_cycle=0, frequency=500, variable_frequency=False):
+        self.pin = pin
+        self.variable_frequency = variable_frequency
+        self._frequency = frequency
+        self._duty_cycle = duty_cycle
+
+    def _record(self):
+        history.append((time.monotonic(), self.pin, self._frequency, self._duty_cycle))
+
+    @property
+    def frequency(self):
+        return(self._frequency)
+
+    @frequency.setter
+    def frequency(self, value):
+        if not self.variable_frequency:
+            raise ValueError('PWM frequency not writable when variable_frequency is False.')
+        self._frequency = value
+        self._record()
+
+    @property
+    def duty_cycle(self):
+        return(self._duty_cycle)
+
+    @duty_cycle.setter
+    def duty_cycle(self, value):
+        self._duty_cycle = value
+        self._record()
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc):
+        self.deinit()
@@ -0,0 +1,27 @@
+# Host stand-in for CircuitPython's rtc module
+'''
+Setting RTC().datetime sets the virtual clock's time.time(), as setting
+the real RTC does; time.monotonic() is not affected.
+'''
+
+import calendar
+import time
+
+import vclock
+
+
+class RTC:
+
+    @property
+    def datetime(self):
+        return(time.localtime())
+
+    @datetime.setter
+    def datetime(self, value):
+        vclock.current.set_time(calendar.timegm(tuple(value)[0:6] + (0, 0, 0)))
+
+    calibration = 0
+
+
+def set_time_source(rtc):
+    pass
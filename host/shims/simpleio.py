@@ -0,0 +1,14 @@
+# Host stand-in for the simpleio library's tone()
+'''
+tone() takes its duration on the (virtual) clock and is recorded in
+tones as (monotonic time, frequency, duration).
+'''
+
+import time
+
+tones = []
+
+
+def tone(pin, frequency, duration=1, length=100):
+    tones.append((time.monotonic(), frequency, duration))
+    time.sleep(duration)
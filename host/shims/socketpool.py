@@ -0,0 +1,196 @@
+# Host stand-in for CircuitPython's socketpool module
+'''
+Sockets for the simulated radio. With no network set, they are real
+sockets to real hosts. With network set to an http.server instance
+(see host/wc_server.py), every connection, whatever the host, is served
+in-process by that server over a socket pair, so HTTPS URLs for
+worldcupjson.net and io.adafruit.com reach the stand-in too.
+
+Every request is recorded in calls, with the time it was sent, the
+request line, the response status and the bytes each way.
+
+UDP sockets work the same way: with datagrams set to a function of the
+request bytes that returns the reply bytes (or None to drop it, see
+host/ntp_server.py), every datagram, whatever the host, is answered by it
+in-process. Without, they are real UDP sockets.
+
+SSLContext stands in for ssl.create_default_context(): it wraps nothing,
+since the stand-in speaks plain HTTP.
+'''
+
+import socket as _socket
+import time
+
+AF_INET = _socket.AF_INET
+SOCK_STREAM = _socket.SOCK_STREAM
+SOCK_DGRAM = _socket.SOCK_DGRAM
+IPPROTO_TCP = _socket.IPPROTO_TCP
+IPPROTO_UDP = _socket.IPPROTO_UDP
+EAGAIN = 11
+ETIMEDOUT = 116
+
+network = None
+datagrams = None
+calls = []
+
+
+class Call:
+
+    def __init__(self, host, port, request):
+        self.time = time.monotonic()
+        self.host = host
+        self.port = port
+        self.request = request
+        self.status = None
+        self.sent = 0
+        self.received = 0
+
+    def __repr__(self):
+        return('{:10.1f} {}:{} {} -> {} ({} B out, {} B in)'.format(
+            self.time, self.host, self.port, self.request, self.status, self.sent, self.received))
+
+
+class Socket:
+
+    def __init__(self, pool, family=AF_INET, type=SOCK_STREAM, proto=0):
+        self._pool = pool
+        self._type = type
+        self._sock = None
+        self._address = None
+        self._call = None
+        self._line = b''
+        self._head = b''
+        self._timeout = None
+        self._replies = []
+
+    def settimeout(self, value):
+        self._timeout = value
+        if self._sock is not None:
+            self._sock.settimeout(value)
+
+    def setblocking(self, flag):
+        self.settimeout(None if flag else 0)
+
+    def connect(self, address, conntype=None):
+        if self._pool.radio is not None and self._pool.radio.ipv4_address is None:
+            raise OSError('No network')
+        self._address = address
+        if network is None:
+            self._sock = _socket.create_connection(address, self._timeout)
+            return
+        self._sock, theirs = _socket.socketpair()
+        self._sock.settimeout(self._timeout)
+        network.process_request(theirs, ('127.0.0.1', address[1]))
+
+    def sendto(self, data, address):
+        if self._pool.radio is not None and self._pool.radio.ipv4_address is None:
+            raise OSError('No network')
+        data = bytes(data)
+        call = self._call = Call(address[0], address[1], 'UDP {} B'.format(len(data)))
+        call.sent = len(data)
+        calls.append(call)
+        if datagrams is None:
+            if self._sock is None:
+                self._sock = _socket.socket(_socket.AF_INET, _socket.SOCK_DGRAM)
+                self._sock.settimeout(self._timeout)
+            return(self._sock.sendto(data, address))
+        reply = datagrams(data)
+        if reply is not None:
+            self._replies.append((reply, address))
+        return(len(data))
+
+    def recvfrom_into(self, buffer, nbytes=0):
+        call = self._call
+        if datagrams is None:
+            size, address = self._sock.recvfrom_into(buffer, nbytes or len(buffer))
+        elif self._replies:
+            reply, address = self._replies.pop(0)
+            size = min(len(reply), nbytes or len(buffer))
+            buffer[0:size] = reply[0:size]
+        else:
+            if self._timeout:
+                time.sleep(self._timeout)
+            call.status = 'timeout'
+            raise OSError(ETIMEDOUT)
+        call.status = 'reply'
+        call.received += size
+        return(size, address)
+
+    # A new call starts with the first bytes sent after a response.
+    def send(self, data):
+        data = bytes(data)
+        call = self._call
+        if call is None or call.status is not None:
+            call = self._call = Call(self._address[0], self._address[1], '')
+            self._line = b''
+            self._head = b''
+            calls.append(call)
+        if b'\r\n' not in self._line:
+            self._line += data
+            call.request = self._line.split(b'\r\n', 1)[0].decode()
+        call.sent += len(data)
+        return(self._sock.send(data))
+
+    def sendall(self, data):
+        self.send(data)
+
+    def recv_into(self, buffer, nbytes=0):
+        if self._type == SOCK_DGRAM:
+            return(self.recvfrom_into(buffer, nbytes)[0])
+        size = self._sock.recv_into(buffer, nbytes or len(buffer))
+        call = self._call
+        if call is not None and size:
+            if call.status is None:
+                self._head += bytes(buffer[0:size])
+                if len(self._head) >= 12 and self._head.startswith(b'HTTP/'):
+                    call.status = int(self._head[9:12])
+            call.received += size
+        return(size)
+
+    def recv(self, bufsize):
+        buffer = bytearray(bufsize)
+        size = self.recv_into(buffer, bufsize)
+        return(bytes(buffer[0:size]))
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SocketPool:
+    AF_INET = AF_INET
+    SOCK_STREAM = SOCK_STREAM
+    SOCK_DGRAM = SOCK_DGRAM
+    IPPROTO_TCP = IPPROTO_TCP
+    IPPROTO_UDP = IPPROTO_UDP
+    EAGAIN = EAGAIN
+    ETIMEDOUT = ETIMEDOUT
+
+    def __init__(self, radio=None):
+        self.radio = radio
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        return([(AF_INET, SOCK_STREAM, 0, '', (host, port))])
+
+    def socket(self, family=AF_INET, type=SOCK_STREAM, proto=0):
+        return(Socket(self, family, type, proto))
+
+
+class SSLContext:
+
+    def wrap_socket(self, sock, server_hostname=None):
+        return(sock)
+
+    def load_verify_locations(self, cadata=None):
+        pass
+
+
+def create_default_context():
+    return(SSLContext())
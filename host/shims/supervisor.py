@@ -0,0 +1,28 @@
+# Host stand-in for CircuitPython's supervisor module
+'''
+reload() raises ReloadRequest; the simulator catches it and starts the
+script again.
+'''
+
+import time
+
+
+class ReloadRequest(BaseException):
+    pass
+
+
+class Runtime:
+    serial_connected = True
+    serial_bytes_available = False
+    usb_connected = True
+
+
+runtime = Runtime()
+
+
+def reload():
+    raise ReloadRequest()
+
+
+def ticks_ms():
+    return(int(time.monotonic() * 1000) & 0x3FFFFFFF)
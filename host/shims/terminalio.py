@@ -0,0 +1,34 @@
+# Host stand-in for CircuitPython's terminalio module
+'''
+FONT is a fixed 6x12 cell font. It has no real glyph shapes: each printable
+character is drawn as a filled 4x7 block, which is enough to see layout,
+spacing and what changed between frames.
+'''
+
+import displayio
+from fontio import BuiltinFont, Glyph
+
+
+class _TerminalFont(BuiltinFont):
+
+    def __init__(self):
+        self._blank = Glyph(displayio.Bitmap(6, 12, 2), 0, 6, 12, 0, -2, 6, 0)
+        bitmap = displayio.Bitmap(6, 12, 2)
+        for y in range(2, 9):
+            for x in range(1, 5):
+                bitmap[x, y] = 1
+        self._block = Glyph(bitmap, 0, 6, 12, 0, -2, 6, 0)
+
+    def get_bounding_box(self):
+        return((6, 12, 0, -2))
+
+    def load_glyphs(self, code_points):
+        pass
+
+    def get_glyph(self, code_point):
+        if code_point <= 32 or code_point == 127:
+            return(self._blank)
+        return(self._block)
+
+
+FONT = _TerminalFont()
@@ -0,0 +1,142 @@
+# Host stand-in for CircuitPython's wifi module
+'''
+A fake wifi.radio for running the MagTag code on a laptop.
+
+Association and DHCP take configurable time, and the next N connects can
+be made to fail, so the fast-reconnect path can be exercised:
+
+    import wifi
+    wifi.radio.associate_time = 2.5
+    wifi.radio.fail_next = 2
+
+The radio "connects" to a local network that uses the host's loopback
+interface, so sockets opened afterwards work normally.
+
+powered is True from the first scan or connect until the radio is
+disabled, the stretch the wake ledger counts as radio-on; the simulated
+battery draws radio current for it.
+'''
+
+import ipaddress
+import time
+
+
+class SSID(bytes):
+    # Network.ssid is a str on the device, and MicroPython's str() also
+    # takes a str with an encoding, which code_game-stats.py relies on.
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            return(self.decode() == other)
+        return(bytes.__eq__(self, other))
+
+    __hash__ = bytes.__hash__
+
+    def __str__(self):
+        return(self.decode())
+
+    def __format__(self, spec):
+        return(format(self.decode(), spec))
+
+
+class Network:
+
+    def __init__(self, ssid, bssid, channel, rssi):
+        self.ssid = SSID(ssid.encode())
+        self.bssid = bssid
+        self.channel = channel
+        self.rssi = rssi
+
+
+class Radio:
+
+    def __init__(self):
+        self._enabled = True
+        self.powered = False
+        self.networks = [
+            Network('ssid_1', b'\x02\x00\x00\x00\x00\x01', 6, -48),
+            Network('ssid_1', b'\x02\x00\x00\x00\x00\x02', 11, -71),
+            Network('neighbour', b'\x02\x00\x00\x00\x00\x03', 1, -80),
+            ]
+        # Timing, in seconds
+        self.scan_time = 2.0
+        self.associate_time = 1.0
+        self.channel_search_time = 1.5  # extra when no channel/BSSID is given
+        self.dhcp_time = 1.2
+        self.fail_next = 0  # make the next N connects fail
+        self.stats = {'scans': 0, 'connects': 0, 'failures': 0, 'dhcp': 0}
+        self._reset()
+
+    @property
+    def enabled(self):
+        return(self._enabled)
+
+    @enabled.setter
+    def enabled(self, value):
+        self._enabled = value
+        if not value:
+            self.powered = False
+
+    def _reset(self):
+        self.powered = False
+        self.ap_info = None
+        self.ipv4_address = None
+        self.ipv4_gateway = None
+        self.ipv4_subnet = None
+        self.ipv4_dns = None
+        self._dhcp = True
+        self._static = None
+
+    def start_scanning_networks(self, *, start_channel=1, stop_channel=11):
+        self.stats['scans'] += 1
+        self.powered = True
+        time.sleep(self.scan_time)
+        return(iter(list(self.networks)))
+
+    def stop_scanning_networks(self):
+        pass
+
+    def start_dhcp(self):
+        self._dhcp = True
+
+    def stop_dhcp(self):
+        self._dhcp = False
+
+    def set_ipv4_address(self, *, ipv4, netmask, gateway, ipv4_dns=None):
+        self._static = (ipv4, netmask, gateway, ipv4_dns)
+
+    def connect(self, ssid, password='', *, channel=0, bssid=None, timeout=None):
+        self.stats['connects'] += 1
+        self.powered = True
+        self._reset_link()
+        candidates = [n for n in self.networks if n.ssid == ssid
+                      and (not bssid or bytes(n.bssid) == bytes(bssid))]
+        delay = self.associate_time
+        if not channel and not bssid:
+            delay += self.channel_search_time
+        if self.fail_next or not candidates:
+            if timeout is not None:
+                delay = min(delay, timeout)
+            time.sleep(delay)
+            self.fail_next = max(0, self.fail_next - 1)
+            self.stats['failures'] += 1
+            raise ConnectionError('No network with that ssid')
+        time.sleep(delay)
+        self.ap_info = max(candidates, key=lambda n: n.rssi)
+        if self._dhcp:
+            self.stats['dhcp'] += 1
+            time.sleep(self.dhcp_time)
+            self.ipv4_address = ipaddress.IPv4Address('127.0.0.1')
+            self.ipv4_subnet = ipaddress.IPv4Address('255.0.0.0')
+            self.ipv4_gateway = ipaddress.IPv4Address('127.0.0.1')
+            self.ipv4_dns = ipaddress.IPv4Address('127.0.0.1')
+        else:
+            self.ipv4_address, self.ipv4_subnet, self.ipv4_gateway, self.ipv4_dns = self._static
+
+    def _reset_link(self):
+        self.ap_info = None
+        self.ipv4_address = None
+        self.ipv4_gateway = None
+
+
+radio = Radio()
@@ -0,0 +1,70 @@
+# Host-side benchmark: code.py on a low battery, with and without the governor
+'''
+Runs host/magtag.py twice on a simulated LiPo (--cell, --charge): once
+as code.py stands, once with BATTERY_GOVERNOR = False, and tabulates how
+long the battery lasted, the charge left, the refreshes and requests the
+board made before it went flat, and how many of the replay's score
+changes the live view showed (and how late, from the API to pixels).
+
+    python3 host/sim_battery.py --lib /tmp/simlibs [--cell 420] [--charge 0.3] [--hours 30]
+
+Extra arguments are passed on to magtag.py.
+'''
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+
+PATTERNS = {
+    'flat': r'flat at ([\d.]+) hours',
+    'end': r'% at the start, (\d+)% at the end',
+    'boots': r'^(\d+) boots, (\d+) refreshes, (\d+) requests',
+    'shown': r'(\d+) changes on screen, latency mean ([\d.]+)s, max ([\d.]+)s',
+    }
+
+
+def run(args, extra, settings):
+    command = [sys.executable, os.path.join(HOST, 'magtag.py'), 'code.py', '--quiet',
+               '--hours', str(args.hours), '--cell', str(args.cell), '--charge', str(args.charge)]
+    for lib in args.lib:
+        command += ['--lib', lib]
+    for setting in settings:
+        command += ['--set', setting]
+    output = subprocess.run(command + extra, capture_output=True, text=True, check=True).stdout
+    found = {name: re.search(pattern, output, re.M) for name, pattern in PATTERNS.items()}
+    return({
+        'lasted': float(found['flat'].group(1)) if found['flat'] else None,
+        'end': int(found['end'].group(1)),
+        'refreshes': int(found['boots'].group(2)),
+        'requests': int(found['boots'].group(3)),
+        'shown': int(found['shown'].group(1)) if found['shown'] else 0,
+        'latency': float(found['shown'].group(2)) if found['shown'] else None,
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cell', type=float, default=420, help='mAh')
+    parser.add_argument('--charge', type=float, default=0.3, help='at the start, 0..1')
+    parser.add_argument('--hours', type=float, default=30)
+    parser.add_argument('--lib', action='append', default=[], help='extra library folder')
+    args, extra = parser.parse_known_args()
+
+    print('{:0.0f} mAh cell at {:0.0f}%, {} hours'.format(args.cell, args.charge * 100, args.hours))
+    print('{:<10} {:>10} {:>6} {:>10} {:>9} {:>14} {:>10}'.format(
+        'governor', 'lasted h', 'end %', 'refreshes', 'requests', 'scores shown', 'latency s'))
+    for name, settings in (('on', []), ('off', ['BATTERY_GOVERNOR=False'])):
+        r = run(args, extra, settings)
+        print('{:<10} {:>10} {:>6} {:>10} {:>9} {:>14} {:>10}'.format(
+            name, 'all' if r['lasted'] is None else '{:0.1f}'.format(r['lasted']), r['end'],
+            r['refreshes'], r['requests'], r['shown'],
+            '-' if r['latency'] is None else '{:0.1f}'.format(r['latency'])))
+
+
+if __name__ == '__main__':
+    main()
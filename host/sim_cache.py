@@ -0,0 +1,106 @@
+# Host-side check: the schedule cache through sleep memory and the drive
+'''
+Saves the sample schedule (wc_test_data.json) with wc_cache into a
+bytearray standing in for alarm.sleep_memory, and a file in a temporary
+folder standing in for the CIRCUITPY drive, then checks:
+
+    round trip     load() gives back every match's kickoff, id, status,
+                   teams, goals and last_changed_at; fresh_matches()
+                   the same matches as dicts
+    version        a slot written by another VERSION reads as nothing,
+                   and so does the file
+    checksum       one flipped payload byte and the slot reads as
+                   nothing
+    fallback       with the slot corrupt, load() takes the file's copy
+    no rewrite     saving the same matches again with a later
+                   fetched_at leaves the file alone; a changed score
+                   rewrites it
+
+    python3 host/sim_cache.py
+'''
+
+import json
+import os
+import sys
+import tempfile
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, '..'))
+import wc_cache  # noqa: E402
+import wc_sleepmem  # noqa: E402
+from wc_time import DAY, iso_to_epoch  # noqa: E402
+
+SAMPLE = os.path.join(HOST, '..', 'wc_test_data.json')
+SLEEP_MEMORY_SIZE = 4096  # alarm.sleep_memory on the ESP32-S2
+
+
+def fields(match):
+    home, away = match['home_team'], match['away_team']
+    return((iso_to_epoch(match['datetime']), match['id'], match['status'],
+            home['country'], away['country'], home['goals'], away['goals'],
+            match.get('last_changed_at') and iso_to_epoch(match['last_changed_at'])))
+
+
+def main():
+    with open(SAMPLE) as fp:
+        matches = json.load(fp)
+    day = iso_to_epoch(matches[0]['datetime']) // DAY
+    fetched_at = day * DAY
+    expected = [fields(m) for m in matches]
+
+    with tempfile.TemporaryDirectory(prefix='circuitpy-') as drive:
+        wc_cache.CACHE_FILE = os.path.join(drive, 'wc_schedule.bin')
+        mem = bytearray(SLEEP_MEMORY_SIZE)
+        offset = wc_sleepmem.SLOTS['schedule'][0]
+
+        # Round trip
+        wc_cache.save(mem, day, fetched_at, matches)
+        cached = wc_cache.load(mem, day)
+        assert cached is not None and cached[:3] == (day, 1, fetched_at), cached
+        assert [fields(wc_cache.to_match(r)) for r in cached[3]] == expected
+        fresh = wc_cache.fresh_matches(mem, day, fetched_at + 60)
+        assert fresh is not None and [fields(m) for m in fresh] == expected
+        print('round trip: {} matches, {} B in sleep memory'.format(
+            len(matches), len(wc_cache.encode(day, fetched_at, matches)) + wc_sleepmem.HEADER_SIZE))
+
+        # Version mismatch, in the slot and in the file
+        slot = bytes(mem)
+        mem[offset + 1] = wc_cache.VERSION + 1
+        assert wc_sleepmem.read(mem, 'schedule', wc_cache.VERSION) is None
+        with open(wc_cache.CACHE_FILE, 'rb') as fp:
+            good_file = fp.read()
+        with open(wc_cache.CACHE_FILE, 'wb') as fp:
+            fp.write(good_file[:1] + bytes([wc_cache.VERSION + 1]) + good_file[2:])
+        assert wc_cache.load(mem, day) is None
+        print('version: another version reads as nothing, slot and file')
+
+        # Checksum mismatch
+        mem[:] = slot
+        mem[offset + wc_sleepmem.HEADER_SIZE + 5] ^= 0xFF
+        assert wc_sleepmem.read(mem, 'schedule', wc_cache.VERSION) is None
+        print('checksum: a flipped byte reads as nothing')
+
+        # Fallback to the file while the slot is corrupt
+        with open(wc_cache.CACHE_FILE, 'wb') as fp:
+            fp.write(good_file)
+        cached = wc_cache.load(mem, day)
+        assert cached is not None and [fields(wc_cache.to_match(r)) for r in cached[3]] == expected
+        print('fallback: the file stands in for a corrupt slot')
+
+        # The file is written only when the matches changed.
+        mtime = os.stat(wc_cache.CACHE_FILE).st_mtime_ns
+        os.utime(wc_cache.CACHE_FILE, ns=(mtime - 10 ** 9, mtime - 10 ** 9))
+        wc_cache.save(mem, day, fetched_at + 600, matches)
+        assert os.stat(wc_cache.CACHE_FILE).st_mtime_ns == mtime - 10 ** 9, 'rewritten'
+        assert wc_cache.load(mem, day)[2] == fetched_at + 600  # the slot is
+        changed = json.loads(json.dumps(matches))
+        changed[0]['home_team']['goals'] = (changed[0]['home_team']['goals'] or 0) + 1
+        wc_cache.save(mem, day, fetched_at + 1200, changed)
+        mem[offset + wc_sleepmem.HEADER_SIZE + 5] ^= 0xFF
+        assert [fields(wc_cache.to_match(r)) for r in wc_cache.load(mem, day)[3]] == [
+            fields(m) for m in changed]
+        print('no rewrite: same matches leave the file alone, a new score rewrites it')
+
+
+if __name__ == '__main__':
+    main()
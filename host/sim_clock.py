@@ -0,0 +1,102 @@
+# Host-side clock drift simulator
+'''
+Runs the wake planner over several tournament days on an RTC that drifts,
+and compares fetching the time on every wake (what code.py did) with
+wc_clock, which syncs only when the clock may be off by more than its
+bounds. Reports syncs per day and how far the clock was off at each wake,
+overall and at the wakes just before a kickoff.
+
+    python3 host/sim_clock.py [wc_test_data.json] [--days 7] [--drift 500]
+
+The day's kickoffs in the file repeat every day. Each sync reads the
+true time to the whole second, as the AIO time feed does.
+'''
+
+import argparse
+import calendar
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import vclock  # noqa: E402
+import wc_clock  # noqa: E402
+import wc_wake  # noqa: E402
+from sim_wakes import GAME_OFF_REFRESH, match_statuses  # noqa: E402
+from wc_time import DAY, iso_to_epoch  # noqa: E402
+
+AWAKE_SECONDS = 20  # time.time() is read this long into the wake
+
+
+class RTC:
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    @property
+    def datetime(self):
+        return(self.clock.localtime())
+
+    @datetime.setter
+    def datetime(self, value):
+        self.clock.set_time(calendar.timegm(tuple(value)[0:6] + (0, 0, 0)))
+
+
+# Returns (syncs, errors, kickoff errors); errors are seconds off at each wake.
+def simulate(always, kickoffs, start, days, drift):
+    mem = bytearray(2048)
+    syncs = 0
+    errors = []
+    kickoff_errors = []
+    with vclock.VirtualClock(start, drift) as clock:
+        rtc = RTC(clock)
+        while clock.now < days * DAY:
+            device = wc_clock.Clock(mem, rtc)
+            plan = wc_wake.load_plan(mem)
+            planned = [kickoff for kickoff, status in plan[2]] if plan else []
+            clock.advance(AWAKE_SECONDS)
+            if always or device.needs_sync(planned):
+                device.sync(int(clock.true_time()))
+                syncs += 1
+            error = abs(device.now() - clock.true_time())
+            errors.append(error)
+            if plan and plan[1] == 'kickoff':
+                kickoff_errors.append(error)
+
+            now = device.now()
+            # The device only ever holds about a day's schedule.
+            matches = match_statuses([k for k in kickoffs if abs(k - now) < DAY], now)
+            wake_at, reason = wc_wake.plan_wake(now, matches, GAME_OFF_REFRESH)
+            wc_wake.save_plan(mem, wake_at, reason, matches)
+            clock.sleep((wake_at - now) / (1 + drift))
+    return(syncs, errors, kickoff_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', nargs='?', default=os.path.join(
+        os.path.dirname(__file__), '..', 'wc_test_data.json'))
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--drift', type=float, default=500, help='RTC drift in ppm, + runs fast')
+    args = parser.parse_args()
+
+    with open(args.file) as fp:
+        schedule = json.load(fp)
+    day = sorted(iso_to_epoch(m['datetime']) for m in schedule)
+    start = day[0] // DAY * DAY
+    kickoffs = [k + n * DAY for n in range(args.days) for k in day]
+
+    print('{} days, {} kickoffs, RTC drift {:+0.0f} ppm'.format(
+        args.days, len(kickoffs), args.drift))
+    print('{:<10} {:>6} {:>10} {:>14} {:>16}'.format(
+        'policy', 'wakes', 'syncs/day', 'max error (s)', 'at kickoff (s)'))
+    for name, always in (('always', True), ('wc_clock', False)):
+        syncs, errors, kickoff_errors = simulate(
+            always, kickoffs, start, args.days, args.drift / 1000000)
+        print('{:<10} {:>6} {:>10.1f} {:>14.0f} {:>16.0f}'.format(
+            name, len(errors), syncs / args.days, max(errors), max(kickoff_errors or [0])))
+
+
+if __name__ == '__main__':
+    main()
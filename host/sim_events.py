@@ -0,0 +1,140 @@
+# Host-side check: the event feed against a replayed event timeline
+'''
+Replays two matches (the recorded ARG-MEX timeline plus a penalty, a red
+card and an own goal in stoppage time, and a second match with its own
+goals), polls /matches/current every GAME_ON_REFRESH seconds through the
+same key paths as code.py and feeds every poll to wc_events.EventFeed.
+
+Checks that every goal, booking and substitution of the timeline comes
+out exactly once, in id order, on the first poll that shows it; that a
+poll where a score moves carries that match's goal event; that a feed
+started in the middle of the match hands out none of the earlier events;
+and that substitutions decode their players. Then reports the list items
+the feed looked at against rescanning every list on every poll.
+
+    python3 host/sim_events.py [--refresh 12]
+'''
+
+import argparse
+import io
+import json
+import os
+import sys
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, '..'))
+import wc_events  # noqa: E402
+import wc_match  # noqa: E402
+import wc_stream  # noqa: E402
+from replay import SECOND_HALF_END, SHOOTOUT, Replay  # noqa: E402
+from wc_time import iso_to_epoch  # noqa: E402
+
+GAME_ON_REFRESH = 12
+KICKOFF = '2022-11-26T19:00:00Z'
+LIVE_PATHS = wc_stream.CURRENT_MATCH_PATHS + wc_events.EVENT_PATHS
+SPEC = {'start': KICKOFF, 'matches': [
+    {'file': 'wc_current_match.json', 'index': 0, 'kickoff': KICKOFF,
+     'events': {
+         'home': [{'id': 1404, 'type_of_event': 'goal-penalty', 'player': 'Lionel Messi', 'time': "90'+1'"}],
+         'away': [{'id': 1405, 'type_of_event': 'red-card', 'player': 'Hector Herrera', 'time': "90'+2'"},
+                  {'id': 1406, 'type_of_event': 'goal-own', 'player': 'Cesar Montes', 'time': "90'+4'"}],
+         }},
+    {'file': 'wc_test_data.json', 'index': 1, 'kickoff': KICKOFF,
+     'events': {
+         'home': [{'type_of_event': 'goal', 'player': 'Home Scorer', 'time': "12'"},
+                  {'type_of_event': 'substitution', 'player': 'Home Sub', 'time': "60'",
+                   'extra_info': '{"player_off":"Home Off","player_on":"Home Sub"}'}],
+         'away': [{'type_of_event': 'yellow-card', 'player': 'Away Player', 'time': "70'"},
+                  {'type_of_event': 'goal', 'player': 'Away Scorer', 'time': "80'"}],
+         }},
+    ]}
+
+
+def poll(replay, now):
+    payload = json.dumps(replay.current(now)).encode()
+    return(wc_stream.select(io.BytesIO(payload), LIVE_PATHS))
+
+
+def timeline(replay):
+    expected = {}
+    for match in replay.matches:
+        match_id = match.base['id']
+        for side in ('home', 'away'):
+            for event in match.events[side]:
+                if event['type_of_event'] in wc_events._KINDS:
+                    expected[(match_id, event['id'])] = event
+    return(expected)
+
+
+def run(refresh, start_minute=0):
+    replay = Replay(SPEC)
+    start = iso_to_epoch(KICKOFF)
+    end = start + (SECOND_HALF_END + SHOOTOUT) * 60
+    feed = wc_events.EventFeed()
+    seen = {}  # (match id, event id) -> poll it was handed out
+    listed = {}  # (match id, event id) -> first poll listing it
+    scores = {}
+    polls = rescan = 0
+    now = start + start_minute * 60
+    initial = set()  # listed at the first poll, taken as read
+    while now < end:
+        current = poll(replay, now)
+        for m in current:
+            for key in ('home_team_events', 'away_team_events'):
+                for e in m.get(key) or ():
+                    if e['type_of_event'] in wc_events._KINDS:
+                        listed.setdefault((m['id'], e['id']), polls)
+        if not polls:
+            initial = set(listed)
+        events = feed.update(current)
+        for match in current:
+            ids = [e.id for e in events if e.match_id == match['id']]
+            assert ids == sorted(ids), ids
+        for event in events:
+            key = (event.match_id, event.id)
+            assert key not in seen, 'twice: {}'.format(event)
+            assert listed[key] == polls, 'late: {}'.format(event)
+            seen[key] = polls
+            if event.kind == wc_events.SUBSTITUTION:
+                assert event.players()[0] and event.players()[1], event
+        for match in current:
+            state = wc_match.from_json(match)
+            score = wc_match.score(state)
+            if state.match_id in scores and score != scores[state.match_id]:
+                assert any(e.kind == wc_events.GOAL and e.match_id == state.match_id
+                           for e in events), 'score moved without a goal event'
+            scores[state.match_id] = score
+            rescan += len(match.get('home_team_events') or ()) + len(match.get('away_team_events') or ())
+        polls += 1
+        now += refresh
+    return(feed, seen, initial, polls, rescan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--refresh', type=float, default=GAME_ON_REFRESH)
+    args = parser.parse_args()
+
+    expected = timeline(Replay(SPEC))
+    feed, seen, initial, polls, rescan = run(args.refresh)
+    assert not initial and set(seen) == set(expected), sorted(set(expected) ^ set(seen))
+    kinds = {}
+    for key in seen:
+        kind = wc_events._KINDS[expected[key]['type_of_event']]
+        kinds[kind] = kinds.get(kind, 0) + 1
+    print('{} polls, {} events, each once: {}'.format(
+        polls, len(seen), ', '.join('{} {}'.format(n, k) for k, n in sorted(kinds.items()))))
+
+    _, late_seen, initial, _, _ = run(args.refresh, start_minute=70)
+    assert initial and set(late_seen) == set(expected) - initial, sorted(set(late_seen) & initial)
+    print('started 70 minutes in: {} events taken as read, the other {} handed out'.format(
+        len(initial), len(late_seen)))
+
+    print('\n{:<8} {:>14} {:>10}'.format('', 'items looked', 'per poll'))
+    print('{:<8} {:>14} {:>10.1f}'.format('feed', feed.inspected, feed.inspected / polls))
+    print('{:<8} {:>14} {:>10.1f}'.format('rescan', rescan, rescan / polls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Host-side benchmark: an idle day, today's schedule vs the next-match panel
+'''
+Runs host/magtag.py through a day with no match, the MagTag upright,
+three ways:
+
+    schedule         no fixture index, NEXT_MATCH_PANEL = False: what
+                     the live side did before, today's schedule page
+    schedule+index   the same with the fixture index on the drive
+    panel+index      the next-match panel with its countdown
+
+The fixture index is built from the replay's matches plus one more
+kicking off --next hours after the day starts (the replay has none
+later). Tabulates the wakes, refreshes, requests and radio-on seconds
+of the day (the power-on boot included), and the mAh they cost at
+wc_ledger's currents, counting BOOT_SECONDS awake for a wake that never
+turns the radio on.
+
+    python3 host/sim_nextmatch.py --lib /tmp/simlibs [--day 2022-11-27] [--next 32]
+'''
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HOST)
+sys.path.insert(0, os.path.join(HOST, '..'))
+import wc_fixtures  # noqa: E402
+import wc_ledger  # noqa: E402
+from replay import Replay  # noqa: E402
+from wc_time import epoch_to_iso, iso_to_epoch  # noqa: E402
+
+TIME_ZONE_OFFSET = -8  # code.py's
+BOOT_SECONDS = 1.5
+
+
+def build_index(replay_file, kickoff, folder):
+    replay = Replay.load(replay_file)
+    matches = replay.schedule(replay.start - 3600)
+    extra = json.loads(json.dumps(matches[0]))
+    extra.update({'id': 99, 'datetime': epoch_to_iso(kickoff)})
+    extra['home_team'].update({'country': 'BRA', 'name': 'Brazil'})
+    extra['away_team'].update({'country': 'SUI', 'name': 'Switzerland'})
+    with open(os.path.join(folder, 'wc_fixtures.bin'), 'wb') as fp:
+        fp.write(wc_fixtures.encode(matches + [extra]))
+
+
+def run(args, start, drive, settings):
+    command = [sys.executable, os.path.join(HOST, 'magtag.py'), 'code.py', '--quiet',
+               '--start', epoch_to_iso(start), '--hours', '24', '--drive', drive]
+    for lib in args.lib:
+        command += ['--lib', lib]
+    for setting in settings:
+        command += ['--set', setting]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    boots, refreshes, requests = re.search(r'^(\d+) boots, (\d+) refreshes, (\d+) requests',
+                                           output, re.M).groups()
+    radio = float(re.search(r'radio on (\d+)s', output).group(1))
+    radio_boots = len(re.findall(r'^\s+\d+ \S+\s+[\d.]+\s+(?!0\.0 )[\d.]+ ', output, re.M))
+    boots, refreshes = int(boots), int(refreshes)
+    mas = (radio * (wc_ledger.AWAKE_MA + wc_ledger.RADIO_MA)
+           + (boots - radio_boots) * BOOT_SECONDS * wc_ledger.AWAKE_MA
+           + refreshes * wc_ledger.REFRESH_SECONDS * wc_ledger.REFRESH_MA
+           + 24 * 3600 * wc_ledger.SLEEP_MA)
+    return(boots, refreshes, int(requests), radio, mas / 3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--replay', default=os.path.join(HOST, 'replays', 'two_matches.json'))
+    parser.add_argument('--day', default='2022-11-27', help='the idle day, local date')
+    parser.add_argument('--next', type=float, default=32,
+                        help='hours from the start of the day to the next kickoff')
+    parser.add_argument('--lib', action='append', default=[], help='extra library folder')
+    args = parser.parse_args()
+
+    start = iso_to_epoch(args.day + 'T00:00:00Z') - TIME_ZONE_OFFSET * 3600
+    print('Idle day {}, next kickoff {} ({} hours in)'.format(
+        args.day, epoch_to_iso(int(start + args.next * 3600)), args.next))
+    print('{:<16} {:>6} {:>10} {:>9} {:>8} {:>10}'.format(
+        'live side', 'wakes', 'refreshes', 'requests', 'radio s', 'est. mAh'))
+    for name, index, settings in (('schedule', False, ['NEXT_MATCH_PANEL=False']),
+                                  ('schedule+index', True, ['NEXT_MATCH_PANEL=False']),
+                                  ('panel+index', True, [])):
+        with tempfile.TemporaryDirectory(prefix='circuitpy-') as drive:
+            if index:
+                build_index(args.replay, int(start + args.next * 3600), drive)
+            boots, refreshes, requests, radio, mah = run(args, start, drive, settings)
+        print('{:<16} {:>6} {:>10} {:>9} {:>8.1f} {:>10.2f}'.format(
+            name, boots, refreshes, requests, radio, mah))
+
+
+if __name__ == '__main__':
+    main()
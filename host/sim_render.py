@@ -0,0 +1,128 @@
+# Host-side check: dirty regions of the live view, clock tick against goal
+'''
+Draws LiveMatchView on the displayio shim's panel at the MagTag's
+upright rotation and feeds three polls of the recorded match through
+wc_match, view.update() and Renderer.invalidate(), as code.py's live
+loop does:
+
+    clock     the match clock moves and nothing else
+    goal      the home score moves, with the 'Gol' mark
+    no goal   the next poll, the mark comes off
+
+After each, the regions the renderer was handed are checked against the
+labels' boxes: a clock-only tick dirties only the game_info strip at the
+bottom, a goal in the same minute only the score row, and the next poll
+both. Each frame is rendered into the panel's in-memory framebuffer
+before and after, and every pixel that changed must lie inside a dirty
+region.
+
+    python3 host/sim_render.py --lib /tmp/simlibs
+'''
+
+import argparse
+import os
+import sys
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HOST, '..')
+sys.path.insert(0, os.path.join(HOST, 'shims'))
+sys.path.insert(0, ROOT)
+
+SPARTAN_LIGHT = 'LeagueSpartan-Light'  # code.py's fonts
+SPARTAN_BOLD_16 = 'LeagueSpartan-Bold-16'
+HELVETICA_BOLD_16 = 'Helvetica-Bold-16'
+
+
+def inside(x, y, rect):
+    return(rect[0] <= x < rect[0] + rect[2] and rect[1] <= y < rect[1] + rect[3])
+
+
+# Pixels of the panel that differ between two frames, as (x, y).
+def changed_pixels(before, after, width):
+    return([(i % width, i // width) for i in range(len(after)) if before[i] != after[i]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lib', action='append', default=[], help='extra library folder')
+    args = parser.parse_args()
+    for lib in args.lib:
+        sys.path.append(os.path.abspath(lib))
+    os.chdir(ROOT)  # wc_fonts reads fonts/ from the drive's root
+
+    import displayio
+    import terminalio
+    import wc_fonts
+    import wc_match
+    from wc_render import Renderer, label_box, overlaps
+    from wc_stream import select_file, CURRENT_MATCH_PATHS
+    from wc_view import LiveMatchView
+
+    # Upright, as code.py shows the live view; the panel is never busy.
+    display = displayio.EPaperDisplay(rotation=270, seconds_per_frame=0)
+    regions = []
+    renderer = Renderer(display, partial_refresh=regions.extend)
+    group = displayio.Group()
+    view = LiveMatchView(group, (
+        wc_fonts.font(SPARTAN_BOLD_16), wc_fonts.font(HELVETICA_BOLD_16),
+        wc_fonts.font(SPARTAN_LIGHT), terminalio.FONT))
+    display.show(group)
+
+    match = select_file('wc_current_match.json', CURRENT_MATCH_PATHS)[0]
+    match['time'] = "9'"  # to 10': the shim draws every terminal glyph alike
+    old_state = wc_match.from_json(match)
+    view.update(*wc_match.texts(old_state), '4.1v')
+    renderer.invalidate_all()
+    renderer.refresh()
+    display.render()
+
+    def poll(minute, goals=0):
+        nonlocal old_state
+        match['time'] = "{}'".format(minute)
+        match['home_team']['goals'] = old_state.home_goals + goals
+        state = wc_match.from_json(match)
+        gol = wc_match.score(state) != wc_match.score(old_state)
+        before = bytes(display.frame)
+        del regions[:]
+        renderer.invalidate(view.update(*wc_match.texts(state, gol), '4.1v'))
+        renderer.refresh()
+        display.render()
+        pixels = changed_pixels(before, display.frame, display.width)
+        for x, y in pixels:
+            assert any(inside(x, y, rect) for rect in regions), \
+                'pixel {} changed outside {}'.format((x, y), regions)
+        old_state = state
+        return(list(regions), len(pixels))
+
+    def hits(rects, item):
+        box = label_box(item)
+        return(box is not None and any(overlaps(rect, box) for rect in rects))
+
+    rows = []
+    clock, pixels = poll(10)
+    assert clock and hits(clock, view.game_info), clock
+    for item in view.labels:
+        if item is not view.game_info:
+            assert not hits(clock, item), 'clock tick dirtied {!r}'.format(item.text)
+    strip = label_box(view.game_info)
+    assert all(rect[1] >= strip[1] - 1 for rect in clock), (clock, strip)
+    rows.append(('clock', clock, pixels))
+
+    goal, pixels = poll(10, goals=1)
+    assert hits(goal, view.game_score) and not hits(goal, view.game_info), goal
+    rows.append(('goal', goal, pixels))
+
+    ticked, pixels = poll(11)
+    assert hits(ticked, view.game_score) and hits(ticked, view.game_info), ticked
+    rows.append(('no goal', ticked, pixels))
+
+    area = display.width * display.height
+    print('{:<8} {:>7} {:>8} {:>10}  {}'.format('poll', 'regions', 'area %', 'pixels', 'rectangles'))
+    for name, rects, pixels in rows:
+        print('{:<8} {:>7} {:>7.1f}% {:>10}  {}'.format(
+            name, len(rects), 100 * sum(r[2] * r[3] for r in rects) / area, pixels, rects))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Host-side check: the favorite team's group position from the digest
+'''
+Plays a four-team group (AAA, the favorite, with BBB, CCC and DDD) over
+three days through wc_team.TeamDigest.update(), one day's /matches
+response at a time as the schedule views fetch them. AAA and CCC finish
+on 6 points; CCC's goal difference puts it first, AAA second.
+
+    every day, index       the table is complete: '2nd of 4'
+    every day, no index    CCC's first two matches came before the digest
+                           knew CCC: 'Position unknown', not '1st'
+    day 1 missed, index    two matches were never seen: 'Position unknown'
+    mid-group, index       after day 2 the table is complete again
+
+The fixture index is wc_fixtures.encode() of the six fixtures, in a
+temporary file.
+
+    python3 host/sim_team.py
+'''
+
+import os
+import sys
+import tempfile
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, '..'))
+import wc_fixtures  # noqa: E402
+import wc_team  # noqa: E402
+from wc_time import DAY, epoch_to_iso, iso_to_epoch  # noqa: E402
+
+START = iso_to_epoch('2022-11-20T00:00:00Z')
+
+# (day, hour, home, away, home goals, away goals)
+GROUP = (
+    (0, 13, 'AAA', 'BBB', 1, 0),
+    (0, 16, 'CCC', 'DDD', 5, 0),
+    (1, 13, 'AAA', 'DDD', 1, 0),
+    (1, 16, 'BBB', 'CCC', 2, 0),
+    (2, 15, 'AAA', 'CCC', 0, 1),
+    (2, 15, 'BBB', 'DDD', 0, 0),
+    )
+
+
+def matches():
+    days = [[] for i in range(3)]
+    for n, (day, hour, home, away, home_goals, away_goals) in enumerate(GROUP):
+        days[day].append({
+            'id': n + 1,
+            'datetime': epoch_to_iso(START + day * DAY + hour * 3600),
+            'status': 'completed',
+            'stage_name': wc_team.GROUP_STAGE,
+            'venue': 'Stadium',
+            'home_team': {'country': home, 'goals': home_goals},
+            'away_team': {'country': away, 'goals': away_goals},
+            })
+    return(days)
+
+
+# The group line of the digest after the days given (None is a day not
+# fetched), checked at the end of each.
+def group_line(days, index=None):
+    digest = wc_team.TeamDigest('AAA')
+    for day, response in enumerate(days):
+        digest.update(response or [], START + (day + 1) * DAY, index)
+    digest = wc_team.TeamDigest.decode(digest.encode())  # through sleep memory
+    return(digest.texts()[1].split('\n')[0])
+
+
+def main():
+    days = matches()
+    with tempfile.TemporaryDirectory() as folder:
+        file_name = os.path.join(folder, 'wc_fixtures.bin')
+        with open(file_name, 'wb') as fp:
+            fp.write(wc_fixtures.encode([m for day in days for m in day]))
+        with wc_fixtures.FixtureIndex(file_name) as index:
+            cases = (
+                ('every day, index', group_line(days, index), 'Group: 2nd of 4'),
+                ('every day, no index', group_line(days), 'Position unknown'),
+                ('day 1 missed, index', group_line([None] + days[1:], index),
+                 'Position unknown'),
+                ('mid-group, index', group_line(days[:2], index), 'Group: 1st of 4'),
+                )
+    for name, line, expected in cases:
+        assert line == expected, (name, line, expected)
+        print('{:<22} {}'.format(name, line))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Host-side check: the live view stays the same size over a long match
+'''
+Builds LiveMatchView in a group with the displayio shim and the fonts
+code.py uses, then runs --polls simulated polls of the recorded match
+through wc_match and view.update() as code.py's live loop does: the
+clock moves every poll, the home score moves every 40th (0 to 5 and
+round again), the 'Gol' mark comes off on the next.
+
+Checks that the group holds the same layers after every poll and that
+the traced heap after the warm-up polls stays within --slack bytes of
+where it was, and that the second half of the polls adds next to
+nothing to it; then reports the labels touched per poll.
+
+    python3 host/sim_view.py --lib /tmp/simlibs [--polls 500] [--slack 8192]
+'''
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HOST, '..')
+sys.path.insert(0, os.path.join(HOST, 'shims'))
+sys.path.insert(0, ROOT)
+
+WARM_UP = 50  # polls before the heap is measured: font glyphs, caches
+GOAL_EVERY = 40
+MAX_GOALS = 6  # the home score runs 0..5 and round again
+
+SPARTAN_LIGHT = 'LeagueSpartan-Light'  # code.py's fonts
+SPARTAN_BOLD_16 = 'LeagueSpartan-Bold-16'
+HELVETICA_BOLD_16 = 'Helvetica-Bold-16'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--polls', type=int, default=500)
+    parser.add_argument('--slack', type=int, default=8192,
+                        help='bytes the heap may grow after the warm-up')
+    parser.add_argument('--lib', action='append', default=[], help='extra library folder')
+    args = parser.parse_args()
+    for lib in args.lib:
+        sys.path.append(os.path.abspath(lib))
+    os.chdir(ROOT)  # wc_fonts reads fonts/ from the drive's root
+
+    import displayio
+    import terminalio
+    import wc_fonts
+    import wc_match
+    from wc_stream import select_file, CURRENT_MATCH_PATHS
+    from wc_view import LiveMatchView
+
+    match = select_file('wc_current_match.json', CURRENT_MATCH_PATHS)[0]
+    group = displayio.Group()
+    view = LiveMatchView(group, (
+        wc_fonts.font(SPARTAN_BOLD_16), wc_fonts.font(HELVETICA_BOLD_16),
+        wc_fonts.font(SPARTAN_LIGHT), terminalio.FONT))
+    layers = list(group)
+
+    tracemalloc.start()
+    old_state = None
+    touched = 0
+    baseline = peak_growth = halfway = None
+    for poll in range(args.polls):
+        match['time'] = "{}'".format(poll % 120)
+        if poll and poll % GOAL_EVERY == 0:
+            match['home_team']['goals'] = poll // GOAL_EVERY % MAX_GOALS
+        state = wc_match.from_json(match)
+        gol = old_state is not None and wc_match.score(state) != wc_match.score(old_state)
+        touched += len(view.update(*wc_match.texts(state, gol), '4.1v'))
+        old_state = state
+
+        assert len(group) == len(layers) and all(a is b for a, b in zip(group, layers)), \
+            'poll {}: group changed, {} layers'.format(poll, len(group))
+        if poll + 1 == WARM_UP:
+            gc.collect()
+            baseline = tracemalloc.get_traced_memory()[0]
+        elif baseline is not None:
+            gc.collect()
+            growth = tracemalloc.get_traced_memory()[0] - baseline
+            peak_growth = growth if peak_growth is None else max(peak_growth, growth)
+            assert growth <= args.slack, 'poll {}: heap grew {} B'.format(poll, growth)
+            if poll + 1 == args.polls // 2:
+                halfway = growth
+    tracemalloc.stop()
+    # Once every score width has been drawn, nothing more is kept.
+    assert growth - halfway <= args.slack // 8, 'second half grew {} B'.format(growth - halfway)
+
+    print('{} polls: group held {} layers throughout, heap within {} B of poll {}, '
+          '{:+d} B over the second half'.format(
+              args.polls, len(layers), peak_growth, WARM_UP, growth - halfway))
+    print('{:0.2f} labels touched per poll'.format(touched / args.polls))
+
+
+if __name__ == '__main__':
+    main()
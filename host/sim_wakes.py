@@ -0,0 +1,103 @@
+# Host-side wake simulator
+'''
+Replays one tournament day and counts how often the MagTag wakes, and how
+long its radio is on, under the fixed GAME_OFF_REFRESH policy versus the
+wc_wake planner.
+
+    python3 host/sim_wakes.py [wc_test_data.json] [--tz -8]
+
+Matches go from future_scheduled to in_progress at kickoff and to
+completed MATCH_MINUTES later. Every wake is charged WAKE_RADIO_SECONDS,
+the radio-on time of today's wake path (scan, connect, fixed 10 s sleep,
+AIO time fetch, schedule download).
+'''
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import wc_wake  # noqa: E402
+from wc_time import DAY, iso_to_epoch  # noqa: E402
+
+GAME_OFF_REFRESH = 10 * 60
+MATCH_MINUTES = 115
+
+# Radio-on seconds per wake: scan, connect, sleep(10), time fetch, schedule
+WAKE_RADIO_SECONDS = 3.0 + 3.0 + 10.0 + 1.5 + 2.0
+
+
+def match_statuses(kickoffs, now):
+    matches = []
+    for kickoff in kickoffs:
+        if now < kickoff:
+            status = 'future_scheduled'
+        elif now < kickoff + MATCH_MINUTES * 60:
+            status = 'in_progress'
+        else:
+            status = 'completed'
+        matches.append((kickoff, status))
+    return(matches)
+
+
+def fixed_policy(now, matches):
+    return(now + GAME_OFF_REFRESH, 'fixed')
+
+
+def planner_policy(now, matches):
+    return(wc_wake.plan_wake(now, matches, GAME_OFF_REFRESH))
+
+
+# Run one policy from start to end. Returns a list of (time, reason).
+def simulate(policy, kickoffs, start, end):
+    wakes = []
+    mem = bytearray(256)
+    now = start
+    while now < end:
+        matches = match_statuses(kickoffs, now)
+        wake_at, reason = policy(now, matches)
+        wc_wake.save_plan(mem, wake_at, 'midnight' if reason == 'fixed' else reason, matches)
+        assert wc_wake.load_plan(mem)[0] == wake_at
+        wakes.append((now, reason))
+        now = wake_at
+    return(wakes)
+
+
+# Seconds after a kickoff before the first wake that saw it in progress.
+def kickoff_lag(wakes, kickoffs):
+    lags = []
+    for kickoff in kickoffs:
+        after = [t for t, r in wakes if t >= kickoff]
+        if after:
+            lags.append(after[0] - kickoff)
+    return(max(lags) if lags else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', nargs='?', default=os.path.join(
+        os.path.dirname(__file__), '..', 'wc_test_data.json'))
+    parser.add_argument('--tz', type=int, default=-8, help='TIME_ZONE_OFFSET')
+    args = parser.parse_args()
+
+    with open(args.file) as fp:
+        schedule = json.load(fp)
+    kickoffs = sorted(iso_to_epoch(m['datetime']) + args.tz * 3600 for m in schedule)
+    start = kickoffs[0] // DAY * DAY
+    end = start + DAY
+
+    print('{} matches, local day starting {}'.format(len(kickoffs), start))
+    print('{:<10} {:>6} {:>10} {:>14}'.format('policy', 'wakes', 'radio (s)', 'kickoff lag (s)'))
+    for name, policy in (('fixed', fixed_policy), ('planner', planner_policy)):
+        wakes = simulate(policy, kickoffs, start, end)
+        if policy is planner_policy:
+            # Live polling starts at the kickoff, not a lead after it.
+            assert kickoff_lag(wakes, kickoffs) < wc_wake.MIN_SLEEP, kickoff_lag(wakes, kickoffs)
+        print('{:<10} {:>6} {:>10.0f} {:>14}'.format(
+            name, len(wakes), len(wakes) * WAKE_RADIO_SECONDS, kickoff_lag(wakes, kickoffs)))
+
+
+if __name__ == '__main__':
+    main()
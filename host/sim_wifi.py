@@ -0,0 +1,128 @@
+# Host-side WiFi connect simulator
+'''
+Compares the old wifi_connect() (scan, connect, fixed 10 s sleep) with
+wc_wifi.connect() over a run of wakes, on the fake radio in host/shims.
+
+    python3 host/sim_wifi.py [--wakes 20] [--fail-every 7]
+
+Times are simulated (host/vclock.py), so this runs instantly.
+
+Then checks that the reused IP configuration goes back to DHCP: after
+REUSE_WAKES wakes ten minutes apart, after LEASE_SECONDS of wakes three
+hours apart, and on the attempt after a failed connect that used it.
+'''
+
+import argparse
+import os
+import sys
+
+HOST = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HOST, 'shims'))
+sys.path.insert(0, os.path.join(HOST, '..'))
+sys.path.insert(0, HOST)
+
+import time  # noqa: E402
+
+import wifi  # noqa: E402  (host/shims/wifi.py)
+import wc_wifi  # noqa: E402
+from vclock import VirtualClock  # noqa: E402
+
+SSID = 'ssid_1'
+
+
+def old_connect(radio):
+    for network in radio.start_scanning_networks():
+        pass
+    radio.stop_scanning_networks()
+    while not radio.ipv4_address:
+        try:
+            radio.connect(SSID)
+        except ConnectionError:
+            pass
+    time.sleep(10)
+
+
+def new_connect(radio, mem):
+    wc_wifi.connect(radio, SSID, mem=mem)
+
+
+def run(name, connect, wakes, fail_every, gap=0, dhcp=None):
+    radio = wifi.Radio()
+    times = []
+    with VirtualClock() as clock:
+        for i in range(wakes):
+            clock.advance(gap)
+            radio.enabled = True
+            radio._reset_link()
+            radio.start_dhcp()  # each wake boots with DHCP on
+            if fail_every and i % fail_every == fail_every - 1:
+                radio.fail_next = 2  # AP hiccup: next two associations fail
+            start = clock.now
+            before = radio.stats['dhcp']
+            connect(radio)
+            times.append(clock.now - start)
+            if dhcp is not None and radio.stats['dhcp'] > before:
+                dhcp.append(i)
+    return(name, times, radio.stats)
+
+
+# Wakes (from 0) that ran DHCP, with wakes gap seconds apart.
+def dhcp_wakes(wakes, gap, fail_every=0):
+    dhcp = []
+    mem = bytearray(1024)
+    run('wc_wifi', lambda radio: new_connect(radio, mem), wakes, fail_every, gap, dhcp)
+    return(dhcp)
+
+
+def check_leases():
+    every = wc_wifi.REUSE_WAKES + 1
+    dhcp = dhcp_wakes(3 * every, 600)
+    assert dhcp == [0, every, 2 * every], dhcp
+    gap = 3 * 60 * 60
+    dhcp = dhcp_wakes(12, gap)
+    every = wc_wifi.LEASE_SECONDS // gap
+    assert dhcp == list(range(0, 12, every)), dhcp
+    # A failed connect on the reused address: the retry runs DHCP.
+    dhcp = dhcp_wakes(10, 600, fail_every=4)
+    assert dhcp == [0, 3, 7], dhcp
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wakes', type=int, default=20)
+    parser.add_argument('--fail-every', type=int, default=7)
+    args = parser.parse_args()
+
+    mem = bytearray(1024)
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')  # wc_wifi prints every connect
+    try:
+        results = [
+            run('old', old_connect, args.wakes, args.fail_every),
+            run('wc_wifi', lambda radio: new_connect(radio, mem), args.wakes, args.fail_every),
+            ]
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print('{} wakes, AP fails twice every {} wakes'.format(args.wakes, args.fail_every))
+    print('{:<8} {:>8} {:>8} {:>8} {:>6} {:>6}'.format(
+        'policy', 'mean s', 'max s', 'total s', 'scans', 'dhcp'))
+    for name, times, stats in results:
+        print('{:<8} {:>8.1f} {:>8.1f} {:>8.1f} {:>6} {:>6}'.format(
+            name, sum(times) / len(times), max(times), sum(times),
+            stats['scans'], stats['dhcp']))
+
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        check_leases()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print('DHCP again every {} wakes, every {} h, and after a failed reuse'.format(
+        wc_wifi.REUSE_WAKES + 1, wc_wifi.LEASE_SECONDS // 3600))
+
+
+if __name__ == '__main__':
+    main()
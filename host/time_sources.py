@@ -0,0 +1,66 @@
+# Host-side time source comparison
+'''
+Fetches the time from each wc_timesource source several times, through
+the same classes code.py uses, and reports each one's latency, bytes and
+offset from the host clock.
+
+    python3 host/wc_server.py --ntp-port 1123 --latency 0.2 --quiet
+    python3 host/time_sources.py --ntp 127.0.0.1:1123 \\
+        --url http://127.0.0.1:8000/api/v2/time/seconds
+
+    python3 host/time_sources.py  # pool.ntp.org and io.adafruit.com
+
+Needs adafruit_requests on the host (pip install adafruit-circuitpython-requests);
+CPython's socket module stands in for the socket pool.
+'''
+
+import argparse
+import os
+import socket
+import ssl
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import adafruit_requests  # noqa: E402
+import wc_timesource  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ntp', default='pool.ntp.org:123', help='host:port')
+    parser.add_argument('--url', default='https://io.adafruit.com/api/v2/time/seconds')
+    parser.add_argument('--count', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=wc_timesource.NTP_TIMEOUT)
+    args = parser.parse_args()
+
+    host, port = args.ntp.rsplit(':', 1)
+    session = adafruit_requests.Session(socket, ssl.create_default_context())
+    sources = [wc_timesource.SNTPSource(socket, host, int(port), args.timeout),
+               wc_timesource.HTTPTimeSource(session, args.url)]
+
+    print('{:<6} {:>8} {:>8} {:>8} {:>8} {:>10}'.format(
+        'source', 'answers', 'p50 s', 'max s', 'bytes', 'offset s'))
+    for source in sources:
+        latencies = []
+        offsets = []
+        for n in range(args.count):
+            try:
+                utc = source.fetch()
+            except (OSError, RuntimeError, ValueError) as error:
+                print('{}: {}'.format(source.name, error))
+                continue
+            latencies.append(source.latency)
+            offsets.append(utc - time.time())
+        if not latencies:
+            print('{:<6} {:>8}'.format(source.name, 0))
+            continue
+        latencies.sort()
+        print('{:<6} {:>8} {:>8.3f} {:>8.3f} {:>8} {:>10.1f}'.format(
+            source.name, len(latencies), latencies[len(latencies) // 2], latencies[-1],
+            source.bytes, max(offsets, key=abs)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Virtual clock for the host tools
+'''
+Replaces time.sleep(), time.monotonic(), time.monotonic_ns(), time.time()
+and time.localtime() with a virtual clock, so simulated sleeps return at
+once and timing measured by the MagTag code is simulated time. As on the
+device, localtime() is the RTC time with no time zone applied, and
+set_time() (what rtc.RTC().datetime does) moves time.time() only.
+
+With drift, time.time() runs that fraction fast (negative: slow), as the
+MagTag's RTC does in deep sleep; true_time() is what it should read.
+
+While installed, asyncio event loops run on the same clock: a loop with
+nothing ready jumps the clock to its next timer instead of waiting, so
+asyncio.sleep() returns at once too and tasks interleave as they would
+on the device.
+
+    with VirtualClock(start=1669507200) as clock:
+        ...
+        clock.now  # seconds since the clock started
+
+listeners are called with the seconds of every step before the clock
+takes it, for models that integrate over time (the simulated battery).
+'''
+
+import asyncio
+import selectors
+import time
+
+current = None  # the installed clock
+
+
+# Polls the loop's own sockets without waiting; a wait for a timer moves
+# the virtual clock to it instead.
+class VirtualSelector(selectors.DefaultSelector):
+
+    def select(self, timeout=None):
+        ready = super().select(0)
+        if ready or timeout is None:
+            return(ready or super().select(None))
+        if current is not None:
+            current.advance(timeout)
+        return([])
+
+
+class VirtualLoopPolicy(asyncio.DefaultEventLoopPolicy):
+
+    def new_event_loop(self):
+        return(asyncio.SelectorEventLoop(VirtualSelector()))
+
+
+class VirtualClock:
+
+    def __init__(self, start=0, drift=0.0):
+        self.start = start
+        self.epoch = start  # what time.time() returns at t = 0
+        self.drift = drift
+        self.now = 0.0
+        self.listeners = []
+        self._saved = None
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            for listener in self.listeners:
+                listener(seconds)
+            self.now += seconds
+
+    def advance(self, seconds):
+        self.sleep(seconds)
+
+    def monotonic(self):
+        return(self.now)
+
+    def monotonic_ns(self):
+        return(int(self.now * 1000000000))
+
+    def time(self):
+        return(int(self.epoch + self.now * (1 + self.drift)))
+
+    def true_time(self):
+        return(self.start + self.now)
+
+    def localtime(self, secs=None):
+        return(self._gmtime(self.time() if secs is None else secs))
+
+    def set_time(self, epoch):
+        self.epoch = epoch - self.now * (1 + self.drift)
+
+    def install(self):
+        global current
+        self._gmtime = time.gmtime
+        self._saved = (time.sleep, time.monotonic, time.monotonic_ns, time.time, time.localtime)
+        time.sleep = self.sleep
+        time.monotonic = self.monotonic
+        time.monotonic_ns = self.monotonic_ns
+        time.time = self.time
+        time.localtime = self.localtime
+        self._saved_policy = asyncio.get_event_loop_policy()
+        asyncio.set_event_loop_policy(VirtualLoopPolicy())
+        current = self
+        return(self)
+
+    def uninstall(self):
+        global current
+        if self._saved:
+            time.sleep, time.monotonic, time.monotonic_ns, time.time, time.localtime = self._saved
+            asyncio.set_event_loop_policy(self._saved_policy)
+            self._saved = None
+            current = None
+
+    def __enter__(self):
+        return(self.install())
+
+    def __exit__(self, *exc):
+        self.uninstall()
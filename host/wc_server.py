@@ -0,0 +1,239 @@
+# Local worldcupjson stand-in
+'''
+Serves the sample JSON files the way worldcupjson.net would, with ETag and
+Last-Modified validators, so conditional polling can be tested on a LAN.
+
+    python3 host/wc_server.py [--port 8000]
+    python3 host/wc_server.py --replay host/replays/two_matches.json --speed 10
+
+Then set WORLD_CUP = 'http://<laptop ip>:8000/' and
+AIO_TIME = 'http://<laptop ip>:8000/api/v2/time/seconds' in code.py.
+
+    /matches/current        -> wc_current_match.json
+    /matches?...            -> wc_test_data.json
+    /api/v2/time/seconds    -> the server clock, as the AIO time feed
+
+With --replay the matches come from a recorded timeline (see replay.py)
+played from its start time at --speed times real time, and the time feed
+follows the replay clock, so the device sees kickoffs, goals and full-time
+as they happened.
+
+--ntp-port also answers SNTP on that UDP port from the same clock (see
+ntp_server.py), for NTP_SERVER in code.py.
+
+--rate-limit answers 429 to a client polling /matches more often than
+worldcupjson's 10 seconds. --latency and --jitter delay every response.
+
+Requests carrying a matching If-None-Match or If-Modified-Since get a 304.
+Every response is logged with its status and body size.
+'''
+
+import argparse
+import email.utils
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, ROOT)
+import ntp_server  # noqa: E402
+from replay import Replay  # noqa: E402
+from wc_time import iso_to_epoch  # noqa: E402
+
+ROUTES = {
+    '/matches/current': 'wc_current_match.json',
+    '/matches': 'wc_test_data.json',
+    }
+TIME_PATH = '/api/v2/time/seconds'
+RATE_LIMIT = 10  # worldcupjson asks for no more than one request per 10 s
+
+
+class Resource:
+    # A response body with its validators.
+
+    def __init__(self, body, modified=None):
+        self.body = body
+        self.etag = '"{}"'.format(hashlib.sha1(body).hexdigest()[:16])
+        self.modified = int(modified if modified is not None else time.time())
+
+    @property
+    def last_modified(self):
+        return(email.utils.formatdate(self.modified, usegmt=True))
+
+
+def load_file(file_name):
+    path = os.path.join(ROOT, file_name)
+    with open(path, 'rb') as fp:
+        return(Resource(fp.read(), os.path.getmtime(path)))
+
+
+# A replay payload, modified when its newest last_changed_at is.
+def replay_resource(matches, now):
+    stamps = [iso_to_epoch(m['last_changed_at']) for m in matches]
+    body = json.dumps(matches).encode()
+    return(Resource(body, max(stamps) if stamps else now))
+
+
+class ReplayClock:
+    # Replay time runs from start at speed times real time.
+
+    def __init__(self, start, speed=1.0):
+        self.start = start
+        self.speed = speed
+        self.began = time.monotonic()
+
+    def now(self):
+        return(self.start + (time.monotonic() - self.began) * self.speed)
+
+
+class WorldCupHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Override in a subclass to serve other data.
+    def resource(self, path, query):
+        replay = self.server.replay
+        if replay is None:
+            file_name = ROUTES.get(path)
+            if file_name is None:
+                return(None)
+            return(load_file(file_name))
+
+        now = self.server.clock.now()
+        if path == '/matches/current':
+            return(replay_resource(replay.current(now), now))
+        if path == '/matches':
+            query = parse_qs(query)
+            return(replay_resource(replay.schedule(
+                now, query.get('start_date', [None])[0], query.get('end_date', [None])[0]), now))
+        return(None)
+
+    # True when this client polled /matches too soon.
+    def rate_limited(self, path):
+        limit = self.server.rate_limit
+        if not limit or not path.startswith('/matches'):
+            return(False)
+        now = time.monotonic()
+        with self.server.lock:
+            last = self.server.last_seen.get(self.client_address[0])
+            if last is not None and now - last < limit:
+                return(True)
+            self.server.last_seen[self.client_address[0]] = now
+        return(False)
+
+    def do_GET(self):
+        delay = self.server.latency + random.uniform(0, self.server.jitter)
+        if delay:
+            time.sleep(delay)
+        path, _, query = self.path.partition('?')
+        path = path.rstrip('/')
+        if self.rate_limited(path):
+            self.send_body(429, b'{"error":"rate limited"}',
+                           headers={'Retry-After': str(self.server.rate_limit)})
+            return
+        if path == TIME_PATH:
+            now = self.server.clock.now()
+            self.send_body(200, str(int(now)).encode(), content_type='text/plain')
+            return
+        resource = self.resource(path, query)
+        if resource is None:
+            self.send_body(404, b'{"error":"not found"}')
+            return
+        if self.not_modified(resource):
+            self.send_response(304)
+            self.send_header('ETag', resource.etag)
+            self.send_header('Last-Modified', resource.last_modified)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            self.server.stats['304'] += 1
+            self.server.stats['bytes_saved'] += len(resource.body)
+            return
+        self.send_body(200, resource.body, resource)
+
+    def not_modified(self, resource):
+        etag = self.headers.get('If-None-Match')
+        if etag is not None:
+            return(etag == resource.etag)
+        since = self.headers.get('If-Modified-Since')
+        if since:
+            try:
+                since = email.utils.parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return(False)
+            return(resource.modified <= since)
+        return(False)
+
+    def send_body(self, status, body, resource=None, content_type='application/json',
+                  headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if resource is not None:
+            self.send_header('ETag', resource.etag)
+            self.send_header('Last-Modified', resource.last_modified)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats[str(status)] = self.server.stats.get(str(status), 0) + 1
+        self.server.stats['bytes_sent'] += len(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(port=8000, handler=WorldCupHandler, quiet=False, replay=None, speed=1.0,
+                rate_limit=0, latency=0, jitter=0):
+    server = ThreadingHTTPServer(('', port), handler)
+    server.quiet = quiet
+    server.stats = {'304': 0, 'bytes_sent': 0, 'bytes_saved': 0}
+    server.replay = replay
+    server.clock = ReplayClock(replay.start if replay else time.time(), speed)
+    server.rate_limit = rate_limit
+    server.latency = latency
+    server.jitter = jitter
+    server.last_seen = {}  # client address -> time of its last /matches request
+    server.lock = threading.Lock()
+    return(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--replay', help='recorded timeline to play back')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed, times real time')
+    parser.add_argument('--rate-limit', type=float, default=0, const=RATE_LIMIT, nargs='?',
+                        help='answer 429 to polls closer than this many seconds ({})'.format(RATE_LIMIT))
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0, help='up to this many seconds more')
+    parser.add_argument('--ntp-port', type=int, help='also serve SNTP on this UDP port')
+    parser.add_argument('--quiet', action='store_true', help='do not log every request')
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay) if args.replay else None
+    server = make_server(args.port, quiet=args.quiet, replay=replay, speed=args.speed, rate_limit=args.rate_limit,
+                         latency=args.latency, jitter=args.jitter)
+    print('Serving worldcupjson stand-in on port {}'.format(args.port))
+    if replay:
+        print('Replaying {} from {} at {}x'.format(args.replay, replay.start, args.speed))
+    if args.ntp_port:
+        ntp = ntp_server.make_server(args.ntp_port, server.clock, args.latency, args.quiet)
+        threading.Thread(target=ntp.serve_forever, daemon=True).start()
+        print('Serving SNTP on UDP port {}'.format(args.ntp_port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(server.stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,7 @@ when a game is on.
 # built-in modules
 import gc
 import time as atime
+import asyncio
 import alarm
 import random
 import rtc
@@ -29,11 +30,9 @@ import ssl
 import wifi
 import socketpool
 import ipaddress
-import simpleio
 
 # External Modules
 # Time
-from adafruit_bitmap_font import bitmap_font
 from adafruit_display_text import bitmap_label as label
 from adafruit_display_shapes.rect import Rect
 # import adafruit_ntp
@@ -46,6 +45,14 @@ from adafruit_io.adafruit_io import IO_HTTP
 # Hardware
 import adafruit_lis3dh
 import neopixel
+import pwmio
+# Local modules
+import wc_stream
+from wc_tracker import MatchTracker
+import wc_tracker
+import wc_match
+import wc_alert
+import wc_fonts
 
 
 # User Settings -----------
@@ -66,10 +73,15 @@ TIME_ZONE_OFFSET = -8
 # Refresh times
 GAME_ON_REFRESH = 12  # in seconds (10 sec minimum. API rate limiting)
 GAME_OFF_REFRESH = (10 * 60)  # in seconds
+TURN_CHECK = 1  # seconds between orientation checks while a game is on
 
 # For future, change to timezone of cup host
 HOST_TIME = 3
 
+# Data sources. Point at host/wc_server.py to test against a local stand-in.
+WORLD_CUP = 'https://worldcupjson.net/'
+AIO_TIME = 'https://io.adafruit.com/api/v2/time/seconds'  # POSIX/Unix timestamp
+
 
 # Configurations ------
 
@@ -88,26 +100,14 @@ SPEAKER_POWER.switch_to_output(False)  # Flase = OFF, True = ON
 lis = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
 voltage_pin = AnalogIn(board.VOLTAGE_MONITOR)
 pixels = neopixel.NeoPixel(board.NEOPIXEL, 4, brightness=1, auto_write=True)
+speaker = pwmio.PWMOut(board.SPEAKER, duty_cycle=0, frequency=440, variable_frequency=True)
+
+# Goal alerts play as an asyncio task while the loop waits for the next poll.
+alerts = wc_alert.AlertEngine(pixels, speaker, SPEAKER_POWER)
 
 
 
 # Useful functions ---------
-# a function to facilitate audio signals
-def sound_signal(frequency = 440, duration = .5, time_off=1) -> None:
-    if frequency < 0:
-        raise ValueError("Negative frequencies are not allowed.")
-    SPEAKER_POWER.switch_to_output(True)  # Flase = ON, True = OFF
-    attempt = 0
-    # Try up to 3 times to play the sound
-    while attempt < 3:
-        try:
-            simpleio.tone(board.SPEAKER, frequency, duration)
-            # simpleio.tone(board.SPEAKER, frequency, duration=1, length=100)
-            break
-        except NameError:
-            pass
-        attempt += 1
-    SPEAKER_POWER.switch_to_output(False)  # Flase = ON, True = OFF
 
 # flashing LEDs routine
 def np_signal(color=0x220000, flashes=3, interval=.15, time_off=1):
@@ -118,17 +118,10 @@ def np_signal(color=0x220000, flashes=3, interval=.15, time_off=1):
         atime.sleep(interval)
         pixels.fill(0)
 
+# Queue the goal call and blinks; they play in wait_for_poll().
 def update_alert():
-    #TODO trigger an audo alert on goal change.
-    # sound_signal()
-    # Blink LEDs to signal a change in goals.
-    colors = [0x110900, 0x001111, 0x110011]
-    flashes = 1
-    interval = 0.5
-    time_off = 0.1
-    for i in range(len(colors)):
-        np_signal(color=colors[i], flashes=flashes,
-                  interval=interval, time_off=time_off)
+    NP_POWER.switch_to_output(False)  # Flase = ON, True = OFF
+    alerts.goal()
         
         
 def goal_simulator():  #  A simple function to simulate a new goal when testing.
@@ -272,7 +265,6 @@ def world_cup(hours = 0):
         
     else:
         GET_DATE = ((local_time(hours=hours))['date'])
-        WORLD_CUP = 'https://worldcupjson.net/'
         API_PARAMETERS = 'start_date={0}&end_date={0}'.format(GET_DATE)
         
         # Fetching World Cup Today
@@ -334,102 +326,48 @@ def wc_schedule(match_schedule, adjust_hours = 0):
 
 
 
-# Function GETs current game stats.
-def wc_current(old_score, game_n):
+# Function GETs the stats of every current game at once.
+# One download and one parse per poll feeds the tracker's table, and
+# every view is drawn from the table. Returns the tracker's changes.
+def wc_current():
     
     if wifi.radio.ipv4_gateway is None:
         import os
         try:
-            with open("wc_current_match.json", "r") as fp:
-                # wc_two_matches.json / wc_current_match
-                x = fp.read()
-                # parse x:
-                current_match = json.loads(x)              
+            # wc_two_matches.json / wc_current_match
+            # Only the fields the tracker reads are kept.
+            current_match = wc_stream.select_file(
+                "wc_current_match.json", wc_tracker.TRACKER_PATHS)
         except OSError as e:
             raise Exception("Could not read text file.")
     
-        game_stats = match_stats(current_match, old_score, game_n)
+        if current_match:
+            current_match[0]['home_team']['goals'] += goal_simulator()
 
         print('Using test data.\n')
 
     else:
-        WORLD_CUP = 'https://worldcupjson.net/'
-        
         # Fetch World Cup Today
         json_header = {"Accept": "application/json"}
         print("{}matches/current\n".format(WORLD_CUP))
-        current_match = requests.get("{}matches/current".format(WORLD_CUP), headers = json_header)
-        
-        game_stats = match_stats(current_match.json(), old_score, game_n)
+        response = requests.get("{}matches/current".format(WORLD_CUP), headers = json_header, stream = True)
+        # Parse straight from the socket, keeping only what the tracker reads.
+        # The socket is closed even when the parse fails partway.
+        try:
+            current_match = wc_stream.select(response, wc_tracker.TRACKER_PATHS)
+        finally:
+            response.close()
         
-    return(game_stats)
-
+    changes = tracker.update(current_match)
+    for match_id, change in changes:
+        print('match {}: {}'.format(match_id, change))
+    return(changes)
 
-# This function parses information on the current match.
-def match_stats(current_match, old_score, game_n):
 
-    try:
-        # Parse current_match
-        match_details = {
-            # Match Title
-            "away_team" : current_match[game_n]['home_team']['name'], 
-            "home_team" : current_match[game_n]['away_team']['name'],      
-            "away_team_goals" : current_match[game_n]['home_team']['goals'],
-            "home_team_goals" : current_match[game_n]['away_team']['goals'],
-            # General Info
-            "match_time" : current_match[game_n]['time'],
-            "location" : current_match[game_n]['location'],
-            "stage_name" : current_match[game_n]['stage_name'],
-            # Team Info
-            "away_tactics" : current_match[game_n]['home_team_lineup']['tactics'],
-            "away_penalties" : current_match[game_n]['home_team']['penalties'],
-            "home_tactics" : current_match[game_n]['away_team_lineup']['tactics'],
-            "home_penalties" : current_match[game_n]['away_team']['penalties']
-            }
-            
-            
-        if wifi.radio.ipv4_gateway is None:
-            add_goal = goal_simulator()
-            match_details['away_team_goals'] = (match_details['away_team_goals'] + add_goal)
-                
-        new_score = (match_details['away_team_goals'], match_details['home_team_goals'])
-        
-        if new_score == old_score:
-            new_goal = False
-        else:
-            new_goal = True
-        
-        # Host Time
-        local_time_offset = (-1 * TIME_ZONE_OFFSET + HOST_TIME)
-        host_hours = (local_time(hours = local_time_offset))
-        host_hours = str(host_hours['time'])[0:5]
-        location = ('{!s}'.format(
-            match_details['location'], host_hours))
-              
-        # Create texts
-        game_info = ('{:>7}{:^29}{:<12}'.format(
-            match_details['match_time'], match_details['stage_name'], location))
-        
-        match_title = ('{1:>12}{0:^6}{2:<12}'.format(
-            '', match_details['away_team'], match_details['home_team']))
-        
-        if new_goal:
-            game_score = ('{1:^7d}{0:^15}{2:^7d}'.format(
-                'Gol', match_details['away_team_goals'], match_details['home_team_goals']))
-        if not new_goal:
-            game_score = ('{1:^7d}{0:^15}{2:^7d}'.format(
-                '---', match_details['away_team_goals'], match_details['home_team_goals']))
-            
-        game_tactics = ('{:>2}{:^21}{:<2}'.format(
-            match_details['away_tactics'], 'Tac', match_details['home_tactics']))
-        
-        game_penalties = ('{:^7d}{:^21}{:^7d}'.format(
-            match_details['away_penalties'], 'Pen', match_details['home_penalties']))
-        
-        old_score = new_score
+# This function builds the texts for one match from the tracker's table.
+def match_stats(match):
 
-    
-    except:
+    if match is None:
         #TODO Determine next match and display basic stats.
         # - GET list of upcoming matches
         # - Convert times to timestamp for easy comparisons
@@ -437,16 +375,24 @@ def match_stats(current_match, old_score, game_n):
         # - Eliminate times before local-time
         # - Select game with lowest of remaining time
         # - Parse match data to display: Home & Away teams, time of match and time till match.
-        
-        game_info = False
-        match_title = ''
-        game_score = ''
-        game_tactics = ''
-        game_penalties = ''
-        
+        return((False, '', '', '', ''))
     
-    game_stats =  (game_info, match_title, game_score, game_tactics, game_penalties, old_score)    
-    return(game_stats)
+    # Texts are cached by the match's fingerprint.
+    return(wc_match.texts(match, tracker.goal(match.match_id)))
+
+
+# Sleep until the next poll, or until the MagTag is turned over.
+# Queued alerts play meanwhile; one cut short is played again next wait.
+async def wait_for_poll(seconds, upright):
+    alert_task = asyncio.create_task(alerts.run())
+    until = atime.monotonic() + seconds
+    while atime.monotonic() < until:
+        await asyncio.sleep(min(TURN_CHECK, until - atime.monotonic()))
+        if (lis.acceleration[1] > 0) != upright:
+            print('turned over')
+            break
+    alert_task.cancel()
+    await asyncio.sleep(0)  # let it switch the pixels off
 
 
 
@@ -463,10 +409,11 @@ display.show(main_group)
 
 
 # Font definitions
-SPARTAN_LIGHT = bitmap_font.load_font("fonts/LeagueSpartan-Light.bdf")
-SPARTAN_BOLD_16 = bitmap_font.load_font("fonts/LeagueSpartan-Bold-16.bdf")
-HELVETICA_BOLD_16 = bitmap_font.load_font("fonts/Helvetica-Bold-16.bdf")
-JUNCTION_24 = bitmap_font.load_font("fonts/Junction-regular-24.bdf")
+# Loaded by wc_fonts from fonts/, the packed .pbf when there is one, and
+# terminalio.FONT for a font that is missing, as in code.py.
+SPARTAN_LIGHT = wc_fonts.font('LeagueSpartan-Light')
+SPARTAN_BOLD_16 = wc_fonts.font('LeagueSpartan-Bold-16')
+HELVETICA_BOLD_16 = wc_fonts.font('Helvetica-Bold-16')
 TERMINAL_FONT = terminalio.FONT 
 
 
@@ -576,7 +523,6 @@ else:  # use live data
     # AIO Time
     # Get time from Adafruit public time server. Time can fetched as a regular GET
     # request. This eliminates need for dedicated NTP library.
-    AIO_TIME = 'https://io.adafruit.com/api/v2/time/seconds'  # POSIX/Unix timestamp
     text_header = {"Accept": "application/text"}
     print("Fetching time from Adafruit IO...\n")
     
@@ -601,7 +547,8 @@ def game_check():
     return
 
 old_game_stats = ('FIRST RUN', '','')
-old_score = (0, 0)
+tracker = MatchTracker()
+next_poll = 0
 
 while True:
     x, y, z, battery = update_data()
@@ -619,6 +566,9 @@ while True:
         
     display.rotation = DISPLAY_ROTATION
     rect = Rect(0, 0, WIDTH, HEIGHT, fill=0xFFFFFF, outline=0xFFFFFF)
+    # Each pass appends a new page; drop the last one's layers first.
+    while len(main_group):
+        main_group.pop()
     
     
     '''
@@ -628,9 +578,14 @@ while True:
     display.rotation = DISPLAY_ROTATION
     ''' 
  
-    # Get the current game stats
-    game_stats = wc_current(old_score, game_n)
-    # game_stats = (game_info, match_title, game_score, game_tactics, game_penalties, old_goals)
+    # Poll for every game's stats; turning the MagTag over between polls
+    # only switches which game is shown.
+    changes = []
+    if atime.monotonic() >= next_poll:
+        changes = wc_current()
+        next_poll = atime.monotonic() + GAME_ON_REFRESH
+    game_stats = match_stats(tracker.match(game_n))
+    # game_stats = (game_info, match_title, game_score, game_tactics, game_penalties)
 
     # check if there is a game running        
     if game_stats[0] == False:
@@ -654,14 +609,11 @@ while True:
         else: 
             print_to_screen = True
             
-            if (
-                game_stats[2] != old_game_stats[2]  # game_score
-                or game_stats[3] != old_game_stats[3]  # game_tactics
-                or game_stats[4] != old_game_stats[4]  # game_penalties
-                ):  
-                gol = True
-            else:
-                gol = False
+            # A goal or penalty in any game sounds the alert.
+            gol = False
+            for match_id, change in changes:
+                if change in ('goal', 'penalties'):
+                    gol = True
             
             print('is gol: {}\n'.format(gol))
             
@@ -822,11 +774,6 @@ while True:
         display.show(main_group)
 
         # refresh display
-        if gol:
-            SPEAKER_POWER.switch_to_output(True)  # Flase = OFF, True = ON
-            simpleio.tone(board.SPEAKER, 610, .2)
-            simpleio.tone(board.SPEAKER, 1220, .15)
-            SPEAKER_POWER.switch_to_output(False)  # Flase = OFF, True = ON
         try_refresh()
         # gol = False
         if gol:
@@ -840,8 +787,8 @@ while True:
         return
         
     if game_is_on:
-        print('\nnext update in {}s\n'.format(refresh_time))
-        atime.sleep(refresh_time)
+        print('\nnext update in {:0.0f}s\n'.format(next_poll - atime.monotonic()))
+        asyncio.run(wait_for_poll(next_poll - atime.monotonic(), not inverted))
         
     if not game_is_on:
         print('\nscreen refreshed\ngoing to sleep for {:0.0f} minutes.'.format(refresh_time/60))
@@ -0,0 +1,151 @@
+# Alert engine
+'''
+Plays NeoPixel and speaker patterns as an asyncio task, so a goal alert
+no longer holds up the poll / parse / refresh loop for the two seconds
+np_signal() slept through. goal() and card() only queue a pattern and
+return; run() plays the queue while the loop awaits its next poll.
+
+A pattern is a tuple of steps (color, frequency, seconds): the pixels
+are filled with color, the speaker plays frequency (0 is silence) and
+the step lasts seconds. A burst of goals queues up to QUEUE_SIZE
+patterns; more than that are dropped and counted. cancel() stops the
+one playing and empties the queue.
+
+    alerts = AlertEngine(pixels, speaker, speaker_enable)
+    task = asyncio.create_task(alerts.run())
+    alerts.goal()        # returns at once
+    ...
+    await alerts.idle()  # before deep sleep
+
+Network calls still block, so a step that falls due during one starts
+late; the pattern stretches, the polls do not.
+'''
+
+import asyncio
+import time
+
+QUEUE_SIZE = 4
+TONE_DUTY = 0x8000  # half duty: a square wave
+
+# update_alert()'s three blinks, the first with the two-tone goal call.
+GOAL = (
+    (0, 0, 0.05),
+    (0x110900, 610, 0.2),
+    (0x110900, 1220, 0.15),
+    (0x110900, 0, 0.15),
+    (0, 0, 0.05),
+    (0x001111, 0, 0.5),
+    (0, 0, 0.05),
+    (0x110011, 0, 0.5),
+    (0, 0, 0),
+    )
+
+YELLOW_CARD = (
+    (0, 0, 0.15),
+    (0x110900, 0, 0.3),
+    (0, 0, 0.15),
+    (0x110900, 0, 0.3),
+    (0, 0, 0),
+    )
+
+RED_CARD = (
+    (0, 0, 0.15),
+    (0x110000, 440, 0.3),
+    (0, 0, 0.15),
+    (0x110000, 0, 0.3),
+    (0, 0, 0),
+    )
+
+
+class AlertEngine:
+
+    # speaker is a pwmio.PWMOut with variable_frequency=True and
+    # speaker_enable the SPEAKER_ENABLE DigitalInOut; both may be None.
+    def __init__(self, pixels, speaker=None, speaker_enable=None, queue_size=QUEUE_SIZE):
+        self._pixels = pixels
+        self._speaker = speaker
+        self._speaker_enable = speaker_enable
+        self.queue_size = queue_size
+        self.queue = []
+        self.playing = None
+        self._ready = None  # made by run(), in the running event loop
+
+        # Counters
+        self.played = 0
+        self.dropped = 0
+        self.late = 0.0  # the most a step started after it was due, seconds
+
+    def play(self, pattern):
+        if len(self.queue) >= self.queue_size:
+            self.dropped += 1
+            return
+        self.queue.append(pattern)
+        if self._ready is not None:
+            self._ready.set()
+
+    def goal(self):
+        self.play(GOAL)
+
+    def card(self, red=False):
+        self.play(RED_CARD if red else YELLOW_CARD)
+
+    # Stop the pattern playing and drop the queued ones.
+    def cancel(self):
+        self.queue = []
+        self.playing = None
+        self._off()
+
+    def _tone(self, frequency):
+        if self._speaker is None:
+            return
+        if frequency:
+            if self._speaker_enable is not None:
+                self._speaker_enable.value = True
+            self._speaker.frequency = frequency
+            self._speaker.duty_cycle = TONE_DUTY
+        else:
+            self._speaker.duty_cycle = 0
+
+    def _off(self):
+        self._pixels.fill(0)
+        self._tone(0)
+        if self._speaker_enable is not None:
+            self._speaker_enable.value = False
+
+    async def _play(self, pattern):
+        due = time.monotonic()
+        for color, frequency, seconds in pattern:
+            if self.playing is not pattern:  # cancelled
+                return
+            self.late = max(self.late, time.monotonic() - due)
+            self._pixels.fill(color)
+            self._tone(frequency)
+            due += seconds
+            await asyncio.sleep(max(0, due - time.monotonic()))
+
+    # Plays the queue for as long as the task runs. A pattern cut short by
+    # cancelling the task is played again from the start by the next run().
+    async def run(self):
+        ready = self._ready = asyncio.Event()
+        try:
+            while True:
+                while not self.queue:
+                    ready.clear()
+                    await ready.wait()
+                self.playing = self.queue[0]
+                await self._play(self.playing)
+                if self.playing is not None:
+                    self.queue.pop(0)
+                    self.played += 1
+                self.playing = None
+                self._off()
+        finally:
+            if self._ready is ready:
+                self._ready = None
+            self.playing = None
+            self._off()
+
+    # Wait until the queue has played out.
+    async def idle(self):
+        while self.queue:
+            await asyncio.sleep(0.05)
@@ -0,0 +1,156 @@
+# Schedule cache
+'''
+Keeps the parsed schedule of one or more days (wc_fetch caches today and
+tomorrow from one request) in alarm.sleep_memory, with a copy on the
+CIRCUITPY drive as fallback when boot.py gave code the drive, so a wake
+can render the schedule without touching the radio.
+
+Each match is a fixed-size record:
+
+    kickoff (epoch, UTC)   uint32
+    match id               uint16
+    status                 uint8   (index into wc_wake.STATUSES)
+    home / away code       3 + 3 bytes
+    home / away goals      int8 each, -1 when not played
+    last_changed_at        uint32 (epoch, UTC)
+
+The records follow a small header with the first day they cover, how
+many days, and when they were fetched. The whole thing is framed by
+wc_sleepmem, which adds the checksum.
+'''
+
+import struct
+
+import wc_sleepmem
+import wc_wake
+from wc_teams import team_name
+from wc_time import DAY, epoch_to_iso, iso_to_epoch
+
+VERSION = 2
+CACHE_FILE = '/wc_schedule.bin'
+MAX_AGE = 6 * 60 * 60  # refetch anyway after this long
+VALID_AFTER = 1640995200  # 2022-01-01, the RTC was never set before this
+
+_HEADER = '<HBIB'  # first day, days, fetched_at, match count
+_RECORD = '<IHB3s3sbbI'
+RECORD_SIZE = struct.calcsize(_RECORD)
+MAX_MATCHES = (wc_sleepmem.SLOTS['schedule'][1] - wc_sleepmem.HEADER_SIZE
+               - struct.calcsize(_HEADER)) // RECORD_SIZE
+
+
+# One match dict from the worldcupjson /matches output -> record tuple.
+def to_record(match):
+    status = match.get('status')
+    home = match['home_team']
+    away = match['away_team']
+    changed = match.get('last_changed_at')
+    return((
+        iso_to_epoch(match['datetime']),
+        match.get('id') or 0,
+        wc_wake.STATUSES.index(status) if status in wc_wake.STATUSES else 255,
+        (home.get('country') or '---').encode(),
+        (away.get('country') or '---').encode(),
+        -1 if home.get('goals') is None else home['goals'],
+        -1 if away.get('goals') is None else away['goals'],
+        iso_to_epoch(changed) if changed else 0,
+        ))
+
+
+# Record tuple -> a match dict with the fields wc_schedule() reads.
+def to_match(record):
+    kickoff, match_id, status, home, away, home_goals, away_goals, changed = record
+    home = home.decode()
+    away = away.decode()
+    return({
+        'id': match_id,
+        'datetime': epoch_to_iso(kickoff),
+        'status': wc_wake.STATUSES[status] if status < len(wc_wake.STATUSES) else 'unknown',
+        'home_team': {'country': home, 'name': team_name(home),
+                      'goals': None if home_goals < 0 else home_goals},
+        'away_team': {'country': away, 'name': team_name(away),
+                      'goals': None if away_goals < 0 else away_goals},
+        'last_changed_at': epoch_to_iso(changed) if changed else None,
+        })
+
+
+def encode(day, fetched_at, matches, days=1):
+    matches = matches[:MAX_MATCHES]
+    payload = bytearray(struct.pack(_HEADER, day, days, int(fetched_at), len(matches)))
+    for match in matches:
+        payload.extend(struct.pack(_RECORD, *to_record(match)))
+    return(payload)
+
+
+# Returns (day, days, fetched_at, records) or None.
+def decode(payload):
+    if payload is None:
+        return(None)
+    day, days, fetched_at, count = struct.unpack_from(_HEADER, payload)
+    offset = struct.calcsize(_HEADER)
+    if len(payload) < offset + count * RECORD_SIZE:
+        return(None)
+    records = []
+    for i in range(count):
+        records.append(struct.unpack_from(_RECORD, payload, offset))
+        offset += RECORD_SIZE
+    return(day, days, fetched_at, records)
+
+
+# The copy on the drive is rewritten only when the matches changed, not
+# for a later fetched_at alone: after a power cycle the clock has to be
+# set before any cache is fresh, and an older copy only means a fetch.
+def save(mem, day, fetched_at, matches, days=1):
+    payload = encode(day, fetched_at, matches, days)
+    wc_sleepmem.write(mem, 'schedule', payload, VERSION)
+    stored = decode(wc_sleepmem.read_file(CACHE_FILE, VERSION))
+    if stored is None or stored[:2] != (day, days) or stored[3] != decode(payload)[3]:
+        wc_sleepmem.write_file(CACHE_FILE, payload, VERSION)
+
+
+def _covers(cached, day):
+    return(cached is not None and cached[0] <= day < cached[0] + cached[1])
+
+
+# The cache covering day, or None.
+def load(mem, day):
+    cached = decode(wc_sleepmem.read(mem, 'schedule', VERSION))
+    if not _covers(cached, day):
+        cached = decode(wc_sleepmem.read_file(CACHE_FILE, VERSION))
+    if not _covers(cached, day):
+        return(None)
+    return(cached)
+
+
+# The records whose kickoff falls on day, device time.
+def day_records(records, day, tz_seconds=0):
+    return([r for r in records if (r[0] + tz_seconds) // DAY == day])
+
+
+# A cache is fresh when it is recent and no match in records can be
+# changing. now is device time, tz_seconds converts kickoffs to it.
+def is_fresh(cached, now, tz_seconds=0, records=None):
+    fetched_at = cached[2]
+    if now < VALID_AFTER or now - fetched_at > MAX_AGE or now < fetched_at:
+        return(False)
+    for record in cached[3] if records is None else records:
+        kickoff = record[0] + tz_seconds
+        status = record[2]
+        if status == wc_wake.STATUSES.index('completed'):
+            continue
+        if now >= kickoff - wc_wake.KICKOFF_LEAD:
+            return(False)
+    return(True)
+
+
+# Fresh cached matches for a day (days since epoch, device time), or None.
+# Only that day's matches need to be settled for them to be fresh.
+def fresh_matches(mem, day, now, tz_seconds=0):
+    cached = load(mem, day)
+    if cached is None:
+        return(None)
+    records = cached[3]
+    if cached[1] > 1:
+        records = day_records(records, day, tz_seconds)
+    if not is_fresh(cached, now, tz_seconds, records):
+        return(None)
+    return([to_match(record) for record in records])
@@ -0,0 +1,111 @@
+# Clock keeping
+'''
+Keeps the RTC close to true time without fetching the time on every wake.
+
+Every sync records when it happened and, from the second sync on, how far
+the RTC had wandered since the one before: the drift, as a fraction of
+the time elapsed. Both are kept in alarm.sleep_memory. On wakes in
+between, now() is the RTC time corrected for the drift built up since the
+sync, and needs_sync() only asks for a fresh time when the error that is
+left might have grown past MAX_ERROR, or past KICKOFF_ERROR when a kickoff
+is close, so the wake that catches the start of a match has an accurate
+clock.
+
+    clock = wc_clock.Clock(alarm.sleep_memory, rtc.RTC())
+    if clock.needs_sync(kickoffs):
+        clock.sync(time_from_server)
+    clock.now()
+
+The correction is added on read rather than stepped into the RTC: setting
+the RTC drops the fraction of a second it had counted, which adds up over
+a day of wakes.
+
+Times are in the device clock (local time, like time.time() after the RTC
+is set). A power cycle clears sleep memory, and the next wake syncs.
+'''
+
+import struct
+import time
+
+import wc_sleepmem
+from wc_cache import VALID_AFTER
+
+VERSION = 1
+_STATE = '<IfIH'  # synced_at, drift, span, syncs
+
+MAX_ERROR = 60  # seconds the clock may be off before a sync
+KICKOFF_ERROR = 5  # tighter bound while a kickoff is near
+KICKOFF_WINDOW = 15 * 60  # a kickoff this far ahead is near
+SYNC_ERROR = 1  # whole-second time source plus request latency
+UNKNOWN_DRIFT = 5000e-6  # assumed before the drift is measured
+DRIFT_WANDER = 20e-6  # the drift itself moves this much, with temperature
+MIN_DRIFT_SPAN = 2 * 60 * 60  # shortest gap between syncs to measure drift over
+
+
+class Clock:
+
+    def __init__(self, mem, rtc):
+        self.mem = mem
+        self.rtc = rtc
+        self.synced_at = None
+        self.drift = 0.0
+        self.span = 0  # seconds the drift was last measured over, 0 if never
+        self.syncs = 0
+        payload = wc_sleepmem.read(mem, 'clock', VERSION)
+        if payload is not None and len(payload) == struct.calcsize(_STATE):
+            self.synced_at, self.drift, self.span, self.syncs = struct.unpack(_STATE, payload)
+
+    # Seconds the RTC has counted since the last sync.
+    def elapsed(self):
+        if self.synced_at is None:
+            return(None)
+        return(time.time() - self.synced_at)
+
+    # The RTC time corrected for drift, in whole seconds.
+    def now(self):
+        elapsed = self.elapsed()
+        if elapsed is None or elapsed < 0 or not self.span:
+            return(time.time())
+        return(time.time() + round(elapsed * self.drift))
+
+    # The most the clock is expected to be off by now, or None when it has
+    # never been synced (or the RTC was reset since). A drift measured from
+    # two syncs is good to their error over the time between them.
+    def error(self):
+        elapsed = self.elapsed()
+        if elapsed is None or elapsed < 0 or time.time() < VALID_AFTER:
+            return(None)
+        if self.span:
+            uncertainty = DRIFT_WANDER + 2 * SYNC_ERROR / self.span
+        else:
+            uncertainty = UNKNOWN_DRIFT
+        return(SYNC_ERROR + elapsed * uncertainty)
+
+    def needs_sync(self, kickoffs=(), max_error=MAX_ERROR):
+        error = self.error()
+        if error is None or error > max_error:
+            return(True)
+        now = self.now()
+        for kickoff in kickoffs:
+            if 0 <= kickoff - now <= KICKOFF_WINDOW and error > KICKOFF_ERROR:
+                return(True)
+        return(False)
+
+    # Set the RTC to now, the true time, and refine the drift from how far
+    # the corrected clock was off. Returns that offset in seconds.
+    def sync(self, now):
+        offset = now - self.now()
+        elapsed = self.elapsed()
+        if elapsed is not None and elapsed >= MIN_DRIFT_SPAN and time.time() >= VALID_AFTER:
+            self.drift += offset / elapsed
+            self.span = elapsed
+        self.rtc.datetime = time.localtime(int(now))
+        self.synced_at = now
+        self.syncs = min(self.syncs + 1, 0xFFFF)
+        self._save()
+        return(offset)
+
+    def _save(self):
+        wc_sleepmem.write(self.mem, 'clock', struct.pack(
+            _STATE, int(self.synced_at), self.drift, self.span, self.syncs),
+            VERSION)
@@ -0,0 +1,131 @@
+# Match event feed
+'''
+Turns home_team_events / away_team_events of /matches/current into typed
+events, each one exactly once. The feed remembers the highest event id it
+has seen per match; the API appends events with rising ids, so each list
+is read from the end back to the first id already seen and a poll costs
+O(new events), not a rescan of the whole match.
+
+    goal          goal, goal-penalty, goal-own
+    booking       booking, yellow-card, red-card, yellow-red-card
+    substitution  substitution; players() decodes its extra_info JSON
+                  the first time it is asked for
+
+Events already listed when a match is first seen (a wake in the middle
+of a match) are taken as read and not returned, so they do not set off
+alerts.
+
+    feed = EventFeed()
+    current = poller.get(url, wc_stream.CURRENT_MATCH_PATHS + wc_events.EVENT_PATHS)
+    for event in feed.update(current):
+        if event.kind == wc_events.GOAL:
+            ...
+'''
+
+import json
+
+GOAL = 'goal'
+BOOKING = 'booking'
+SUBSTITUTION = 'substitution'
+
+_KINDS = {
+    'goal': GOAL,
+    'goal-penalty': GOAL,
+    'goal-own': GOAL,
+    'booking': BOOKING,
+    'yellow-card': BOOKING,
+    'red-card': BOOKING,
+    'yellow-red-card': BOOKING,
+    'substitution': SUBSTITUTION,
+    }
+_MARKS = {'goal-penalty': ' (p)', 'goal-own': ' (og)', 'red-card': 'RC ', 'yellow-red-card': 'RC '}
+_SIDES = (('home', 'home_team_events'), ('away', 'away_team_events'))
+
+# Key paths update() reads on /matches/current.
+EVENT_PATHS = (
+    ('*', 'id'),
+    ('*', 'home_team_events', '*', 'id'),
+    ('*', 'home_team_events', '*', 'type_of_event'),
+    ('*', 'home_team_events', '*', 'player'),
+    ('*', 'home_team_events', '*', 'time'),
+    ('*', 'home_team_events', '*', 'extra_info'),
+    ('*', 'away_team_events', '*', 'id'),
+    ('*', 'away_team_events', '*', 'type_of_event'),
+    ('*', 'away_team_events', '*', 'player'),
+    ('*', 'away_team_events', '*', 'time'),
+    ('*', 'away_team_events', '*', 'extra_info'),
+    )
+
+
+def _surname(player):
+    return((player or '').split(' ')[-1])
+
+
+class MatchEvent:
+
+    def __init__(self, match_id, side, item):
+        self.match_id = match_id
+        self.side = side  # the list it came from; an own goal counts for the other side
+        self.id = item['id']
+        self.detail = item.get('type_of_event') or ''
+        self.kind = _KINDS.get(self.detail)
+        self.player = item.get('player') or ''
+        self.time = item.get('time') or ''
+        self._extra = item.get('extra_info')
+        self._players = None
+
+    # (player_off, player_on) of a substitution, decoded on first use.
+    def players(self):
+        if self._players is None:
+            try:
+                extra = json.loads(self._extra) if self._extra else {}
+            except ValueError:
+                extra = {}
+            self._players = (extra.get('player_off') or '', extra.get('player_on') or self.player)
+        return(self._players)
+
+    def red(self):
+        return(self.detail in ('red-card', 'yellow-red-card'))
+
+    # Short text for the display, e.g. "Messi 64'", "RC Alvarado 89'".
+    def text(self):
+        if self.kind == GOAL:
+            return('{}{} {}'.format(_surname(self.player), _MARKS.get(self.detail, ''), self.time))
+        if self.kind == BOOKING:
+            return('{}{} {}'.format(_MARKS.get(self.detail, 'YC '), _surname(self.player), self.time))
+        if self.kind == SUBSTITUTION:
+            return('{} on {}'.format(_surname(self.players()[1]), self.time))
+        return('{} {}'.format(self.detail, self.time))
+
+    def __repr__(self):
+        return('<{} {} {} {}>'.format(self.kind, self.id, self.side, self.text()))
+
+
+class EventFeed:
+
+    def __init__(self):
+        self.last_ids = {}  # match id -> highest event id seen
+        self.inspected = 0  # list items looked at, for the host benchmark
+
+    # New typed events of every match in current_match, oldest first.
+    def update(self, current_match):
+        events = []
+        for match in current_match or ():
+            match_id = match.get('id')
+            first = match_id not in self.last_ids
+            last = self.last_ids.get(match_id, 0)
+            new = []
+            for side, key in _SIDES:
+                items = match.get(key) or ()
+                for i in range(len(items) - 1, -1, -1):
+                    self.inspected += 1
+                    event_id = items[i].get('id') or 0
+                    if event_id <= last:
+                        break
+                    self.last_ids[match_id] = max(event_id, self.last_ids.get(match_id, 0))
+                    if items[i].get('type_of_event') in _KINDS:
+                        new.append(MatchEvent(match_id, side, items[i]))
+            self.last_ids.setdefault(match_id, last)
+            if not first:
+                events.extend(sorted(new, key=lambda e: e.id))
+        return(events)
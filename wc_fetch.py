@@ -0,0 +1,118 @@
+# Fetch planner
+'''
+Gets a wake's data from worldcupjson in as few requests as possible.
+
+One /matches?start_date=...&end_date=... request covering today and
+tomorrow carries every match of both days with its status and score,
+which is all the schedule views need: today's (upright, no match on)
+and tomorrow's (inverted). It goes into the schedule cache (wc_cache)
+and is kept in memory for the rest of the wake, so every view derived
+from it is free. /matches/current, with tactics and penalties, is only
+worth a request when a match is actually in progress and the live view
+is showing, which is what needs_detail() says.
+
+With a fixture index (wc_fixtures), a day none of whose matches can have
+started is taken from it without a request, and a fetch writes the
+knockout pairings it brings into the index. With a favorite team's
+digest (wc_team), a fetch brings it up to date too, so the favorite-team
+view never needs a request of its own.
+
+The API filters by UTC date, so the request spans the UTC dates the two
+local days touch, and the answer is split by local kickoff day.
+
+Days are days since 1970-01-01 in device time (local time), as in
+wc_cache; tz_seconds is TIME_ZONE_OFFSET in seconds.
+'''
+
+import wc_cache
+import wc_fixtures
+import wc_team
+from wc_time import DAY, civil_from_days, iso_to_epoch
+
+DAYS = 2  # today and tomorrow
+
+
+def _date(day):
+    return('{:04d}-{:02d}-{:02d}'.format(*civil_from_days(day)))
+
+
+# The /matches query for days local days from day.
+def range_query(day, tz_seconds=0, days=DAYS):
+    first = (day * DAY - tz_seconds) // DAY
+    last = ((day + days) * DAY - 1 - tz_seconds) // DAY
+    return('start_date={}&end_date={}'.format(_date(first), _date(last)))
+
+
+def local_day(match, tz_seconds=0):
+    return((iso_to_epoch(match['datetime']) + tz_seconds) // DAY)
+
+
+# True when the live view needs /matches/current: kickoffs are the
+# (kickoff, status) pairs of today's matches.
+def needs_detail(kickoffs, live_view=True):
+    if not live_view:
+        return(False)
+    for kickoff, status in kickoffs:
+        if status == 'in_progress':
+            return(True)
+    return(False)
+
+
+class FetchPlanner:
+
+    def __init__(self, session, base_url, mem, tz_seconds=0, headers=None, index=None,
+                 digest=None):
+        self._session = session
+        self.base_url = base_url
+        self._mem = mem
+        self.tz_seconds = tz_seconds
+        self.headers = headers or {"Accept": "application/json"}
+        self._first_day = None
+        self._matches = None  # every match of the fetched days
+        self.index = index  # a wc_fixtures.FixtureIndex, or None
+        self.digest = digest  # a wc_team.TeamDigest, or None
+        self.requests = 0
+
+    # The matches of day, from this wake's fetch, the cache, the fixture
+    # index or one request covering day and the next. fresh=True skips
+    # all but the request, for when a match has just ended and the
+    # statuses moved on.
+    def matches(self, day, now, fresh=False):
+        if not fresh:
+            if self._matches is not None and self._first_day <= day < self._first_day + DAYS:
+                return([m for m in self._matches if local_day(m, self.tz_seconds) == day])
+            cached = wc_cache.fresh_matches(self._mem, day, now, self.tz_seconds)
+            if cached is not None:
+                print('Using cached schedule.\n')
+                return(cached)
+            indexed = wc_fixtures.future_matches(self.index, day, now, self.tz_seconds)
+            if indexed is not None:
+                print('Using the fixture index.\n')
+                return(indexed)
+
+        # Today and tomorrow, whichever of them day is.
+        first = now // DAY
+        if not first <= day < first + DAYS:
+            first = day
+        url = '{}matches?{}'.format(self.base_url, range_query(first, self.tz_seconds))
+        print('GETting schedule from:\n{}'.format(url))
+        self.requests += 1
+        response = self._session.get(url, headers=self.headers)
+        try:
+            if response.status_code != 200:
+                raise OSError('HTTP {} from {}'.format(response.status_code, url))
+            fetched = response.json()
+        finally:
+            response.close()
+
+        self._matches = [m for m in fetched
+                         if first <= local_day(m, self.tz_seconds) < first + DAYS]
+        self._first_day = first
+        wc_cache.save(self._mem, first, now, self._matches, DAYS)
+        if self.index is not None and self.index.update(fetched):
+            print('Fixture index: new pairings written.\n')
+        if self.digest is not None and self.digest.update(
+                fetched, now - self.tz_seconds, self.index):
+            wc_team.save(self._mem, self.digest)
+            print('Team digest updated.\n')
+        return([m for m in self._matches if local_day(m, self.tz_seconds) == day])
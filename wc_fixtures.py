@@ -0,0 +1,235 @@
+# Fixture index
+'''
+The tournament's fixture list as a fixed-width binary index on the
+CIRCUITPY drive, made by host/build_fixtures.py from the worldcupjson
+/matches output. A World Cup's 64 fixtures are known in advance apart
+from the knockout pairings, so a day whose matches have not started can
+be shown without a request, and the next match found without the radio.
+
+The index is never loaded whole: the header is read when it is opened,
+and each record is read with seek() and readinto() into one small
+buffer, as wc_fonts.PackedFont reads glyphs. Records are sorted by
+kickoff, so next_match() and day() find their first record by binary
+search on the file; team() reads the records one by one.
+
+Layout (little-endian):
+
+    header  '<4sHBB'      magic b'WCX1', match count, venue count,
+                          stage count
+    records '<IH3s3sBB'   per match, sorted by kickoff: kickoff (epoch,
+                          UTC), match id, home / away code ('---' until
+                          a knockout pairing is known), venue index,
+                          stage index
+    names   NAME_SIZE     the venues, then the stages, NUL padded
+
+update() writes pairings that have become known into the index from the
+matches a fetch brought, so it fills in as the knockouts are drawn. It
+writes only the records that changed, and only when boot.py gave code
+the drive.
+
+    fixtures = wc_fixtures.open_index()
+    if fixtures:
+        kickoff, match_id, home, away, venue, stage = fixtures.next_match(utc)
+'''
+
+import struct
+
+import wc_cache
+import wc_wake
+from wc_time import DAY, iso_to_epoch
+
+INDEX_FILE = '/wc_fixtures.bin'
+MAGIC = b'WCX1'
+HEADER = '<4sHBB'
+RECORD = '<IH3s3sBB'
+HEADER_SIZE = struct.calcsize(HEADER)
+RECORD_SIZE = struct.calcsize(RECORD)
+NAME_SIZE = 32
+UNKNOWN = (b'---', b'TBD')  # a knockout pairing not known yet
+
+_FUTURE = wc_wake.STATUSES.index('future_scheduled')
+
+
+def _code(team):
+    return((team.get('country') or '---').encode())
+
+
+# One match dict from the worldcupjson /matches output -> record tuple.
+# venues and stages are the name lists, extended with new names.
+def to_record(match, venues, stages):
+    indexes = []
+    for names, name in ((venues, match.get('venue') or ''), (stages, match.get('stage_name') or '')):
+        if name not in names:
+            names.append(name)
+        indexes.append(names.index(name))
+    return((iso_to_epoch(match['datetime']), match.get('id') or 0,
+            _code(match['home_team']), _code(match['away_team']), indexes[0], indexes[1]))
+
+
+# The index file for the matches, in any order.
+def encode(matches):
+    venues = []
+    stages = []
+    records = sorted(to_record(match, venues, stages) for match in matches)
+    data = bytearray(struct.pack(HEADER, MAGIC, len(records), len(venues), len(stages)))
+    for record in records:
+        data.extend(struct.pack(RECORD, *record))
+    for name in venues + stages:
+        data.extend(name.encode()[:NAME_SIZE].ljust(NAME_SIZE, b'\0'))
+    return(data)
+
+
+# Record tuple -> a match dict with the fields wc_schedule() reads, not
+# yet played.
+def to_match(record):
+    kickoff, match_id, home, away, venue, stage = record
+    return(wc_cache.to_match((kickoff, match_id, _FUTURE, home, away, -1, -1, 0)))
+
+
+class FixtureIndex:
+
+    def __init__(self, file_name=INDEX_FILE):
+        self.file_name = file_name
+        self._file = open(file_name, 'rb')
+        magic, self.count, self._venues, self._stages = struct.unpack(
+            HEADER, self._file.read(HEADER_SIZE))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError('{} is not a fixture index'.format(file_name))
+        self._record = bytearray(RECORD_SIZE)
+        self._name = bytearray(NAME_SIZE)
+        self.reads = 0
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _read(self, offset, buffer):
+        self._file.seek(offset)
+        self._file.readinto(buffer)
+        self.reads += 1
+
+    # Record i as (kickoff, match id, home, away, venue, stage).
+    def record(self, i):
+        self._read(HEADER_SIZE + i * RECORD_SIZE, self._record)
+        return(struct.unpack(RECORD, self._record))
+
+    def _kickoff(self, i):
+        self._read(HEADER_SIZE + i * RECORD_SIZE, self._record)
+        return(struct.unpack_from('<I', self._record)[0])
+
+    # Index of the first record kicking off at or after epoch (UTC).
+    def bisect(self, epoch):
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._kickoff(middle) < epoch:
+                low = middle + 1
+            else:
+                high = middle
+        return(low)
+
+    # The first match kicking off at or after epoch (UTC), or None.
+    def next_match(self, epoch):
+        i = self.bisect(epoch)
+        return(self.record(i) if i < self.count else None)
+
+    # The matches kicking off from start up to end (UTC).
+    def between(self, start, end):
+        records = []
+        for i in range(self.bisect(start), self.count):
+            record = self.record(i)
+            if record[0] >= end:
+                break
+            records.append(record)
+        return(records)
+
+    # The matches of day (days since epoch, device time).
+    def day(self, day, tz_seconds=0):
+        return(self.between(day * DAY - tz_seconds, (day + 1) * DAY - tz_seconds))
+
+    # The matches of a team (FIFA code), in kickoff order.
+    def team(self, code):
+        code = code.encode()
+        records = []
+        for i in range(self.count):
+            record = self.record(i)
+            if code in (record[2], record[3]):
+                records.append(record)
+        return(records)
+
+    def first_kickoff(self):
+        return(self._kickoff(0) if self.count else None)
+
+    def last_kickoff(self):
+        return(self._kickoff(self.count - 1) if self.count else None)
+
+    def _name_at(self, n):
+        self._read(HEADER_SIZE + self.count * RECORD_SIZE + n * NAME_SIZE, self._name)
+        return(bytes(self._name).rstrip(b'\0').decode())
+
+    def venue(self, n):
+        return(self._name_at(n) if n < self._venues else '')
+
+    def stage(self, n):
+        return(self._name_at(self._venues + n) if n < self._stages else '')
+
+    # Write the pairings the matches (from a fetch) know and the index
+    # does not. Returns how many records changed.
+    def update(self, matches):
+        changes = []
+        for match in matches:
+            home, away = _code(match['home_team']), _code(match['away_team'])
+            if home in UNKNOWN or away in UNKNOWN:
+                continue
+            kickoff = iso_to_epoch(match['datetime'])
+            for i in range(self.bisect(kickoff), self.count):
+                record = self.record(i)
+                if record[0] != kickoff:
+                    break
+                if record[1] == match.get('id') and (record[2], record[3]) != (home, away):
+                    changes.append((i, home + away))
+        if not changes:
+            return(0)
+        try:
+            with open(self.file_name, 'r+b') as fp:
+                for i, teams in changes:
+                    fp.seek(HEADER_SIZE + i * RECORD_SIZE + 6)
+                    fp.write(teams)
+        except OSError as e:  # the drive is the computer's, see boot.py
+            print('Fixture index not updated: {}'.format(e))
+            return(0)
+        return(len(changes))
+
+
+# The index on the drive, or None when there is none.
+def open_index(file_name=INDEX_FILE):
+    try:
+        return(FixtureIndex(file_name))
+    except (OSError, ValueError):
+        return(None)
+
+
+# The matches of day (device time) as match dicts, when the index has the
+# whole day and none of them can have started; else None, and the day
+# has to be fetched. now is device time, tz_seconds converts kickoffs to
+# it.
+def future_matches(index, day, now, tz_seconds=0):
+    if index is None or now < wc_cache.VALID_AFTER or not index.count:
+        return(None)
+    start = day * DAY - tz_seconds
+    if not index.first_kickoff() - DAY < start <= index.last_kickoff():
+        return(None)  # outside the tournament
+    records = index.day(day, tz_seconds)
+    for record in records:
+        if now >= record[0] + tz_seconds - wc_wake.KICKOFF_LEAD:
+            return(None)
+        if record[2] in UNKNOWN or record[3] in UNKNOWN:
+            return(None)
+    return([to_match(record) for record in records])
@@ -0,0 +1,132 @@
+# Fonts
+'''
+Loads fonts only when a screen needs them, and only the glyphs it is about
+to draw.
+
+Fonts are looked up by name in fonts/. A packed font (.pbf, made from the
+BDF by host/build_fonts.py) is preferred. It opens with a single header
+read and finds each glyph by binary search on the file, so nothing but
+the glyphs actually used is ever parsed. The .bdf is used when there is
+no .pbf, and terminalio.FONT when neither exists.
+
+    SPARTAN_BOLD_16 = wc_fonts.font('LeagueSpartan-Bold-16')
+    wc_fonts.prepare(SPARTAN_BOLD_16, match_title)
+
+Packed font layout (little-endian):
+
+    header  '<4sBBbbBBH'  magic b'PBF1', ascent, descent,
+                          bounding box x, y, width, height, glyph count
+    index   '<HBBbbbxI'   per glyph, sorted by code point: code point,
+                          width, height, dx, dy, shift_x, bitmap offset
+    bitmaps               rows of ceil(width / 8) bytes, MSB first
+'''
+
+import struct
+
+import displayio
+import terminalio
+from fontio import Glyph
+
+FONT_DIR = 'fonts/'
+MAGIC = b'PBF1'
+HEADER = '<4sBBbbBBH'
+INDEX = '<HBBbbbxI'
+HEADER_SIZE = struct.calcsize(HEADER)
+INDEX_SIZE = struct.calcsize(INDEX)
+
+_fonts = {}
+
+
+class PackedFont:
+
+    def __init__(self, file_name):
+        self._file = open(file_name, 'rb')
+        magic, self.ascent, self.descent, x, y, w, h, self._count = struct.unpack(
+            HEADER, self._file.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError('{} is not a packed font'.format(file_name))
+        self._bounding_box = (w, h, x, y)
+        self._entry = bytearray(INDEX_SIZE)
+        self._glyphs = {}
+
+    def get_bounding_box(self):
+        return(self._bounding_box)
+
+    # Index entry for code_point, by binary search on the file.
+    def _find(self, code_point):
+        low = 0
+        high = self._count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            self._file.seek(HEADER_SIZE + middle * INDEX_SIZE)
+            self._file.readinto(self._entry)
+            entry = struct.unpack(INDEX, self._entry)
+            if entry[0] == code_point:
+                return(entry)
+            if entry[0] < code_point:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return(None)
+
+    def _load_glyph(self, code_point):
+        entry = self._find(code_point)
+        if entry is None:
+            self._glyphs[code_point] = None
+            return
+        code_point, width, height, dx, dy, shift_x, offset = entry
+        row_bytes = (width + 7) // 8
+        self._file.seek(offset)
+        rows = self._file.read(row_bytes * height)
+        bitmap = displayio.Bitmap(width, height, 2)
+        for y in range(height):
+            for x in range(width):
+                if rows[y * row_bytes + x // 8] & (0x80 >> (x % 8)):
+                    bitmap[x, y] = 1
+        self._glyphs[code_point] = Glyph(bitmap, 0, width, height, dx, dy, shift_x, 0)
+
+    # code_points: a string or an iterable of ints, like bitmap_font.
+    def load_glyphs(self, code_points):
+        if isinstance(code_points, str):
+            code_points = [ord(c) for c in code_points]
+        elif isinstance(code_points, int):
+            code_points = [code_points]
+        for code_point in code_points:
+            if code_point not in self._glyphs:
+                self._load_glyph(code_point)
+
+    def get_glyph(self, code_point):
+        if code_point not in self._glyphs:
+            self._load_glyph(code_point)
+        return(self._glyphs[code_point])
+
+
+def _exists(file_name):
+    try:
+        open(file_name, 'rb').close()
+        return(True)
+    except OSError:
+        return(False)
+
+
+# Load a font by name the first time it is asked for.
+def font(name):
+    if name in _fonts:
+        return(_fonts[name])
+    if _exists(FONT_DIR + name + '.pbf'):
+        loaded = PackedFont(FONT_DIR + name + '.pbf')
+    elif _exists(FONT_DIR + name + '.bdf'):
+        from adafruit_bitmap_font import bitmap_font
+        loaded = bitmap_font.load_font(FONT_DIR + name + '.bdf')
+    else:
+        print('Font {} not found, using terminalio.FONT'.format(name))
+        loaded = terminalio.FONT
+    _fonts[name] = loaded
+    return(loaded)
+
+
+# Load the glyphs of the strings about to be rendered.
+def prepare(loaded, *texts):
+    if loaded is terminalio.FONT:
+        return
+    loaded.load_glyphs(''.join(texts))
@@ -0,0 +1,38 @@
+# Schedule text
+'''
+Builds the schedule page text in one pass.
+
+Kickoff times are read straight from the ISO string as epoch seconds, so
+no datetime or timedelta objects are made. Rows go into a list that is
+joined once at the end.
+'''
+
+from wc_time import DAY, iso_to_epoch
+
+ROW = '{:02d}:{:02d} {:>11} ({}) v ({}) {:<0}\n'
+
+
+def _blank(value):
+    return('' if value is None else value)
+
+
+# Returns (text, kickoffs). kickoffs are (kickoff, status) in device time.
+def schedule_text(match_schedule, tz_offset=0, name_width=11):
+    row = ROW if name_width == 11 else ROW.replace('11', str(name_width))
+    tz_seconds = tz_offset * 3600
+    rows = [None] * len(match_schedule)
+    kickoffs = [None] * len(match_schedule)
+    for n, match in enumerate(match_schedule):
+        kickoff = iso_to_epoch(match['datetime']) + tz_seconds
+        kickoffs[n] = (kickoff, match.get('status'))
+        seconds = kickoff % DAY
+        away = match['away_team']
+        home = match['home_team']
+        rows[n] = row.format(
+            seconds // 3600, seconds // 60 % 60,
+            _blank(away['name']),
+            _blank(away['goals']),
+            _blank(home['goals']),
+            _blank(home['name']),
+            )
+    return(''.join(rows), kickoffs)
@@ -0,0 +1,163 @@
+# Wake ledger
+'''
+Times each phase of a wake with time.monotonic_ns() and keeps one compact
+record per wake in a ring buffer in alarm.sleep_memory, so it is known
+where a wake's time (and battery) went.
+
+Phases run one after another; phase(name) closes the running phase and
+starts the next, and time spent in a phase that comes round again (the
+live loop) adds up. The radio-on time and refresh count are recorded too.
+
+Dump the ring as CSV from the REPL, or by typing 'ledger' on the serial
+console while code.py starts:
+
+    import alarm, wc_ledger
+    wc_ledger.dump(alarm.sleep_memory)
+
+estimate() turns the records into mAh per day with the currents below.
+They are typical MagTag figures; measure your own board to tune them.
+'''
+
+import struct
+import time
+
+import wc_sleepmem
+from wc_time import epoch_to_iso
+from wc_wake import REASONS
+
+VERSION = 1
+PHASES = ('boot', 'wifi', 'time', 'current', 'stats', 'labels', 'refresh', 'wait',
+          'schedule', 'sleep')
+RING_SIZE = 16
+
+_RING = '<BB'  # next slot, count
+_RECORD = '<IBBII' + 'I' * len(PHASES)  # finished_at, reason, refreshes, awake, radio, phases (ms)
+_RECORD_SIZE = struct.calcsize(_RECORD)
+
+# Currents in mA
+AWAKE_MA = 25  # CPU running, radio off
+RADIO_MA = 60  # added while the radio is on
+REFRESH_MA = 10  # added while the panel refreshes
+REFRESH_SECONDS = 2.5  # panel busy per refresh
+SLEEP_MA = 0.3  # deep sleep
+BATTERY_MAH = 420
+
+
+class Ledger:
+
+    def __init__(self):
+        now = time.monotonic_ns()
+        self.started = now
+        self.phase_name = 'boot'
+        self.phase_started = now
+        self.totals = [0] * len(PHASES)  # ns
+        self.radio_started = None
+        self.radio_ns = 0
+        self.reason = None
+
+    # Close the running phase and start name.
+    def phase(self, name):
+        now = time.monotonic_ns()
+        self.totals[PHASES.index(self.phase_name)] += now - self.phase_started
+        self.phase_name = name
+        self.phase_started = now
+
+    def radio(self, on):
+        now = time.monotonic_ns()
+        if on and self.radio_started is None:
+            self.radio_started = now
+        elif not on and self.radio_started is not None:
+            self.radio_ns += now - self.radio_started
+            self.radio_started = None
+
+    # Close the wake and append its record to the ring in mem.
+    def save(self, mem, refreshes=0):
+        self.phase(self.phase_name)
+        self.radio(False)
+        awake = time.monotonic_ns() - self.started
+        reason = REASONS.index(self.reason) if self.reason in REASONS else 255
+        record = struct.pack(_RECORD, int(time.time()), reason, min(refreshes, 255),
+                             awake // 1000000, self.radio_ns // 1000000,
+                             *[t // 1000000 for t in self.totals])
+        ring = _load(mem)
+        if ring is None:
+            ring = bytearray(struct.calcsize(_RING) + RING_SIZE * _RECORD_SIZE)
+        slot, count = struct.unpack_from(_RING, ring)
+        offset = struct.calcsize(_RING) + slot * _RECORD_SIZE
+        ring[offset:offset + _RECORD_SIZE] = record
+        struct.pack_into(_RING, ring, 0, (slot + 1) % RING_SIZE, min(count + 1, RING_SIZE))
+        wc_sleepmem.write(mem, 'ledger', ring, VERSION)
+
+
+def _load(mem):
+    payload = wc_sleepmem.read(mem, 'ledger', VERSION)
+    if payload is None or len(payload) != struct.calcsize(_RING) + RING_SIZE * _RECORD_SIZE:
+        return(None)
+    return(bytearray(payload))
+
+
+# The records in mem, oldest first. Each is a dict of the fields, times in ms.
+def read(mem):
+    ring = _load(mem)
+    if ring is None:
+        return([])
+    slot, count = struct.unpack_from(_RING, ring)
+    records = []
+    for n in range(count):
+        i = (slot - count + n) % RING_SIZE
+        fields = struct.unpack_from(_RECORD, ring, struct.calcsize(_RING) + i * _RECORD_SIZE)
+        record = {
+            'finished_at': fields[0],
+            'reason': REASONS[fields[1]] if fields[1] < len(REASONS) else '',
+            'refreshes': fields[2],
+            'awake': fields[3],
+            'radio': fields[4],
+            }
+        for name, ms in zip(PHASES, fields[5:]):
+            record[name] = ms
+        records.append(record)
+    return(records)
+
+
+def csv_lines(records):
+    yield(','.join(('woke', 'reason', 'awake_ms', 'radio_ms', 'refreshes') + PHASES))
+    for r in records:
+        woke = epoch_to_iso(r['finished_at'] - r['awake'] // 1000)
+        yield(','.join([woke, r['reason'], str(r['awake']), str(r['radio']), str(r['refreshes'])]
+                       + [str(r[name]) for name in PHASES]))
+
+
+# Average mA and mAh per day over the records, or None with fewer than two.
+def estimate(records):
+    if len(records) < 2:
+        return(None)
+    # Charge of every wake but the first, over the time since the first ended.
+    span = records[-1]['finished_at'] - records[0]['finished_at']
+    if span <= 0:
+        return(None)
+    awake = radio = refreshes = 0
+    for r in records[1:]:
+        awake += r['awake'] / 1000
+        radio += r['radio'] / 1000
+        refreshes += r['refreshes']
+    asleep = max(0, span - awake)
+    charge = (awake * AWAKE_MA + radio * RADIO_MA
+              + refreshes * REFRESH_SECONDS * REFRESH_MA + asleep * SLEEP_MA)  # mAs
+    average = charge / span
+    return({
+        'hours': span / 3600,
+        'average_ma': average,
+        'mah_per_day': average * 24,
+        'days': BATTERY_MAH / (average * 24),
+        })
+
+
+def dump(mem):
+    records = read(mem)
+    for line in csv_lines(records):
+        print(line)
+    result = estimate(records)
+    if result:
+        print('# {:0.1f} h: {:0.2f} mA average, {:0.0f} mAh/day, {:0.1f} days on {} mAh'.format(
+            result['hours'], result['average_ma'], result['mah_per_day'], result['days'],
+            BATTERY_MAH))
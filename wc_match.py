@@ -0,0 +1,111 @@
+# Match state
+'''
+One live match as a fixed-layout record: a namedtuple, so it is stored
+as a plain tuple (no per-instance dict), compares field by field with ==
+and hashes like a tuple. Goals and penalties are integers and team codes
+and names are interned, so the same strings are shared by every poll's
+record instead of each parse making new ones.
+
+Formatting is a separate step. texts() builds the five live view texts
+and caches them keyed on the shown fields, looked up by their hash (the
+state's fingerprint), so a poll that moved nothing on screen reuses the
+last texts and a poll that only added a booking does not reformat.
+
+    state = wc_match.from_json(current_match[0])
+    if state != old_state:
+        game_info, match_title, game_score, game_tactics, game_penalties = \\
+            wc_match.texts(state, goal=wc_match.score(state) != wc_match.score(old_state))
+'''
+
+from collections import namedtuple
+
+# The shown fields first, so fingerprint() can hash a slice of them.
+MatchState = namedtuple('MatchState', (
+    'home', 'away',
+    'home_goals', 'away_goals',
+    'home_penalties', 'away_penalties',
+    'home_tactics', 'away_tactics',
+    'time', 'location', 'stage_name',
+    'home_code', 'away_code',
+    'match_id', 'last_event',
+    ))
+_SHOWN = 11  # home .. stage_name
+
+CACHE_SIZE = 4  # two matches, with and without the goal mark
+
+_interned = {}
+_cache = {}
+_cache_order = []
+
+
+# The one copy of text kept for every record that uses it.
+def intern(text):
+    if not text:
+        return('')
+    return(_interned.setdefault(text, text))
+
+
+def _last_event(match):
+    last = 0
+    for key in ('home_team_events', 'away_team_events'):
+        for event in match.get(key) or ():
+            if event.get('id') and event['id'] > last:
+                last = event['id']
+    return(last)
+
+
+# One /matches/current item -> MatchState. Missing lineups (the API leaves
+# them out for a while after kickoff) read as blank tactics and missing
+# goals as 0.
+def from_json(match):
+    home = match.get('home_team') or {}
+    away = match.get('away_team') or {}
+    home_lineup = match.get('home_team_lineup') or {}
+    away_lineup = match.get('away_team_lineup') or {}
+    return(MatchState(
+        intern(home.get('name')), intern(away.get('name')),
+        home.get('goals') or 0, away.get('goals') or 0,
+        home.get('penalties') or 0, away.get('penalties') or 0,
+        intern(home_lineup.get('tactics')), intern(away_lineup.get('tactics')),
+        match.get('time') or '',
+        intern(match.get('location')), intern(match.get('stage_name')),
+        intern(home.get('country')), intern(away.get('country')),
+        match.get('id'), _last_event(match),
+        ))
+
+
+def score(state):
+    if state is None:
+        return(None)
+    return((state.home_goals, state.away_goals))
+
+
+# A hash of what the live view shows. Equal states have equal fingerprints.
+def fingerprint(state):
+    return(hash(state[:_SHOWN]))
+
+
+# (game_info, match_title, game_score, game_tactics, game_penalties) for
+# the live view. goal=True puts 'Gol' between the scores, and a string
+# (the scorer, from wc_events) goes there instead.
+def texts(state, goal=False):
+    key = (state[:_SHOWN], goal)
+    cached = _cache.get(key)
+    if cached is not None:
+        return(cached)
+
+    result = (
+        '{:>7}{:^29}{:<12}'.format(state.time, state.stage_name, state.location),
+        '{1:>12}{0:^6}{2:<12}'.format('', state.home, state.away),
+        '{1:^7d}{0:^15.15}{2:^7d}'.format(
+            goal if isinstance(goal, str) else 'Gol' if goal else '---',
+            state.home_goals, state.away_goals),
+        '{:>2}{:^21}{:<2}'.format(state.home_tactics, 'Tac', state.away_tactics),
+        '{:^7d}{:^21}{:^7d}'.format(state.home_penalties, 'Pen', state.away_penalties),
+        )
+
+    _cache[key] = result
+    _cache_order.append(key)
+    if len(_cache_order) > CACHE_SIZE:
+        _cache.pop(_cache_order.pop(0), None)
+    return(result)
@@ -0,0 +1,116 @@
+# Accelerometer wake
+'''
+Sets the MagTag's LIS3DH up to wake the board from deep sleep when it is
+turned over or tapped, so the other view comes up at once instead of at
+the next timer wake or a press of reset.
+
+arm(), just before deep sleep, puts the LIS3DH in low-power mode at the
+lowest data rate that still does the job, routes a change between
+upright and upside down (6D movement on the Y axis), with sideways also
+a turn onto either side (the X axis), and, when taps are wanted, single
+taps to INT1, clears any latched interrupt and returns
+the PinAlarm for ACCELEROMETER_INTERRUPT:
+
+    alarms = (time_alarm, wc_motion.arm(lis, board.ACCELEROMETER_INTERRUPT,
+                                        alarm.sleep_memory, taps=True))
+
+LIS3DH supply current in low-power mode, from the datasheet:
+
+    1 Hz 2 uA   10 Hz 3 uA   25 Hz 4 uA   50 Hz 6 uA   100 Hz 10 uA
+
+The driver leaves it at 400 Hz in high-resolution mode, 73 uA, for the
+whole deep sleep. Turning over is caught at 10 Hz; a tap is over in a
+few tens of milliseconds, so taps need 100 Hz.
+
+After a wake, woke_by() tells a turn from a tap by comparing the way the
+MagTag faces with the way it faced when it went to sleep, which arm()
+keeps in sleep memory.
+'''
+
+import struct
+
+import alarm
+import adafruit_lis3dh
+
+import wc_sleepmem
+
+# LIS3DH registers
+_CTRL_REG1 = 0x20
+_CTRL_REG2 = 0x21
+_CTRL_REG3 = 0x22
+_CTRL_REG4 = 0x23
+_CTRL_REG5 = 0x24
+_INT1_CFG = 0x30
+_INT1_SRC = 0x31
+_INT1_THS = 0x32
+_INT1_DURATION = 0x33
+_CLICK_SRC = 0x39
+
+_LOW_POWER = 0x08  # CTRL_REG1 LPen
+_XYZ = 0x07  # CTRL_REG1 all axes on
+_BDU = 0x80  # CTRL_REG4, +-2 g, high resolution off (must be in low-power mode)
+_I1_CLICK = 0x80  # CTRL_REG3
+_I1_IA1 = 0x40  # CTRL_REG3
+_LIR_INT1 = 0x08  # CTRL_REG5: INT1 stays high until INT1_SRC is read
+_6D_Y = 0x4C  # INT1_CFG: 6D movement, Y high and Y low
+_6D_X = 0x03  # INT1_CFG: X high and X low
+
+ORIENTATION_RATE = adafruit_lis3dh.DATARATE_10_HZ
+TAP_RATE = adafruit_lis3dh.DATARATE_100_HZ
+_HZ = {adafruit_lis3dh.DATARATE_10_HZ: 10, adafruit_lis3dh.DATARATE_100_HZ: 100}
+
+ORIENTATION_THRESHOLD = 0x20  # x 16 mg at +-2 g: half a g
+ORIENTATION_HOLD = 0.3  # seconds the new position must last
+TAP_THRESHOLD = 80  # x 16 mg at +-2 g
+TAP_TIME_LIMIT = 10  # samples: 100 ms at 100 Hz
+
+UPRIGHT = 1
+UPSIDE_DOWN = -1
+SIDEWAYS = 2
+
+
+# UPRIGHT, UPSIDE_DOWN, SIDEWAYS on either side, or 0 lying flat.
+def facing(lis):
+    x, y, z = lis.acceleration
+    if y > adafruit_lis3dh.STANDARD_GRAVITY / 2:
+        return(UPRIGHT)
+    if y < -adafruit_lis3dh.STANDARD_GRAVITY / 2:
+        return(UPSIDE_DOWN)
+    if abs(x) > adafruit_lis3dh.STANDARD_GRAVITY / 2:
+        return(SIDEWAYS)
+    return(0)
+
+
+# Configure the LIS3DH for deep sleep and return the PinAlarm to sleep on.
+# sideways=True also wakes the board when it is turned onto its side.
+def arm(lis, pin, mem, taps=True, sideways=False):
+    rate = TAP_RATE if taps else ORIENTATION_RATE
+    lis._write_register_byte(_CTRL_REG1, (rate << 4) | _LOW_POWER | _XYZ)
+    lis._write_register_byte(_CTRL_REG2, 0)  # no high-pass filter
+    lis._write_register_byte(_CTRL_REG4, _BDU)
+    lis._write_register_byte(_CTRL_REG5, _LIR_INT1)
+    lis._write_register_byte(_INT1_THS, ORIENTATION_THRESHOLD)
+    lis._write_register_byte(_INT1_DURATION, max(1, int(ORIENTATION_HOLD * _HZ[rate])))
+    lis._write_register_byte(_INT1_CFG, _6D_Y | (_6D_X if sideways else 0))
+    if taps:
+        lis.set_tap(1, TAP_THRESHOLD, time_limit=TAP_TIME_LIMIT)
+    else:
+        lis.set_tap(0, 0)
+    lis._write_register_byte(_CTRL_REG3, _I1_IA1 | (_I1_CLICK if taps else 0))
+
+    # Reading the sources releases a latched INT1; left high it would
+    # wake the board the moment it went to sleep.
+    lis._read_register_byte(_INT1_SRC)
+    lis._read_register_byte(_CLICK_SRC)
+
+    wc_sleepmem.write(mem, 'motion', struct.pack('<b', facing(lis)))
+    return(alarm.pin.PinAlarm(pin=pin, value=True, pull=False))
+
+
+# 'turn' or 'tap' when wake_alarm was the accelerometer, else None.
+def woke_by(lis, mem, wake_alarm):
+    if not isinstance(wake_alarm, alarm.pin.PinAlarm):
+        return(None)
+    payload = wc_sleepmem.read(mem, 'motion')
+    before = struct.unpack('<b', payload)[0] if payload else 0
+    return('turn' if facing(lis) != before else 'tap')
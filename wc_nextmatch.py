@@ -0,0 +1,93 @@
+# Next match
+'''
+What the live side shows when no match is on: the next match, its
+kickoff in local time and a countdown to it, worked out on the device
+from the fixtures it already has (wc_fixtures) or, without an index,
+the cached schedule of today and tomorrow (wc_cache). No request.
+
+The countdown is in days more than a day out, in hours more than two
+hours out, and in steps of STEP below that, always rounded up; changes_at
+is when the text would next read differently, so the board can sleep
+until then:
+
+    match = wc_nextmatch.find(fixtures, cached, utc)
+    title, teams, kickoff, countdown, changes_at = wc_nextmatch.texts(
+        match, clock.now(), TIME_ZONE_OFFSET * 3600)
+
+Times are epochs; kickoffs in the records are UTC, now and changes_at
+device time, as in wc_wake.
+'''
+
+import wc_wake
+from wc_teams import team_name
+from wc_time import DAY, civil_from_days
+
+STEP = 15 * 60  # the countdown's finest step, seconds
+HOUR = 60 * 60
+
+DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+_FUTURE = wc_wake.STATUSES.index('future_scheduled')
+
+
+# The next match kicking off after utc as (kickoff, home, away), from the
+# fixture index, else the records of a wc_cache.load(); or None.
+def find(index, cached, utc):
+    if index is not None:
+        record = index.next_match(utc + 1)
+        if record is not None:
+            return(record[0], record[2].decode(), record[3].decode())
+    if cached is None:
+        return(None)
+    upcoming = [r for r in cached[3] if r[2] == _FUTURE and r[0] > utc]
+    if not upcoming:
+        return(None)
+    kickoff, match_id, status, home, away = min(upcoming)[:5]
+    return(kickoff, home.decode(), away.decode())
+
+
+# (text, seconds until it changes, or None once it no longer will). The
+# count is rounded up, so it never reads less time than is left.
+def countdown(seconds, step=STEP):
+    if seconds <= 0:
+        return('Kicking off', None)
+    if seconds > DAY:
+        unit = DAY
+    elif seconds > 2 * HOUR:
+        unit = HOUR
+    else:
+        unit = step
+    n = -(-seconds // unit)
+    if unit == DAY:
+        text = 'in {} days'.format(n)
+    elif unit == HOUR:
+        text = 'in {} hours'.format(n)
+    elif n * unit >= HOUR:
+        text = 'in {} h {:02d} min'.format(n * unit // HOUR, n * unit // 60 % 60)
+    else:
+        text = 'in {} min'.format(n * unit // 60)
+    return(text, seconds - (n - 1) * unit)
+
+
+# 'Sat 26 Nov 11:00' for a device-time epoch.
+def kickoff_text(epoch):
+    year, month, day = civil_from_days(epoch // DAY)
+    seconds = epoch % DAY
+    return('{} {} {} {:02d}:{:02d}'.format(DAYS[(epoch // DAY + 3) % 7], day, MONTHS[month - 1],
+                                            seconds // 3600, seconds // 60 % 60))
+
+
+# The panel's texts (title, teams, kickoff, countdown) and changes_at, the
+# device time the countdown next changes, or None. A change due sooner
+# than the board can sleep is shown already.
+def texts(match, now, tz_seconds=0, step=STEP):
+    kickoff, home, away = match
+    kickoff += tz_seconds
+    text, seconds = countdown(kickoff - now, step)
+    if seconds is not None and seconds < wc_wake.MIN_SLEEP:
+        text, later = countdown(kickoff - now - seconds, step)
+        seconds = None if later is None else seconds + later
+    teams = '{} v {}'.format(team_name(home), team_name(away))
+    return('Next match', teams, kickoff_text(kickoff), text,
+           None if seconds is None else now + seconds)
@@ -0,0 +1,88 @@
+# Conditional GET polling
+'''
+Wraps an adafruit_requests.Session for polling worldcupjson.
+
+Remembers the ETag / Last-Modified validators and the last_changed_at
+stamps of every URL it fetched. The next request is sent with
+If-None-Match / If-Modified-Since, so a 304 costs no body and no parse.
+A 200 whose last_changed_at stamps did not move is reported as unchanged
+too, so the caller can skip building the match state and the display refresh.
+A 429 (polling faster than the API's rate limit) is also reported as no
+change rather than raised, so the next poll simply tries again.
+'''
+
+import wc_stream
+
+# Added to the caller's paths so the stamps can be compared.
+CHANGED_PATH = ('*', 'last_changed_at')
+
+
+class PollingClient:
+
+    def __init__(self, session):
+        self._session = session
+        # url -> [etag, last_modified, last_changed_at stamps, body bytes]
+        self._validators = {}
+
+        # Counters
+        self.requests = 0
+        self.not_modified = 0  # 304 responses
+        self.rate_limited = 0  # 429 responses
+        self.unchanged = 0  # 200 with the same last_changed_at
+        self.parses_skipped = 0
+        self.bytes_saved = 0
+
+    # GET url and select paths from the JSON body.
+    # Returns None when nothing changed since the last call.
+    def get(self, url, paths, headers=None):
+        cached = self._validators.get(url)
+        send_headers = dict(headers) if headers else {}
+        if cached:
+            if cached[0]:
+                send_headers['If-None-Match'] = cached[0]
+            if cached[1]:
+                send_headers['If-Modified-Since'] = cached[1]
+
+        self.requests += 1
+        response = self._session.get(url, headers=send_headers, stream=True)
+        try:
+            if response.status_code == 304 and cached:
+                self.not_modified += 1
+                self.parses_skipped += 1
+                self.bytes_saved += cached[3]
+                return(None)
+
+            if response.status_code == 429:
+                self.rate_limited += 1
+                return(None)
+
+            if response.status_code != 200:
+                raise OSError('HTTP {} from {}'.format(response.status_code, url))
+
+            result = wc_stream.select(response, tuple(paths) + (CHANGED_PATH,))
+            response_headers = response.headers
+        finally:
+            response.close()
+
+        stamps = tuple(item.get('last_changed_at') for item in result)
+        length = int(response_headers.get('content-length', 0) or 0)
+        self._validators[url] = [
+            response_headers.get('etag'),
+            response_headers.get('last-modified'),
+            stamps,
+            length or (cached[3] if cached else 0),
+            ]
+
+        if cached and stamps and stamps == cached[2]:
+            self.unchanged += 1
+            return(None)
+        return(result)
+
+    # Forget the validators of url, so the next get() is a full fetch.
+    def reset(self, url):
+        self._validators.pop(url, None)
+
+    def stats(self):
+        return('requests: {} 304: {} 429: {} unchanged: {} parses skipped: {} bytes saved: {}'.format(
+            self.requests, self.not_modified, self.rate_limited, self.unchanged,
+            self.parses_skipped, self.bytes_saved))
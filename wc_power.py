@@ -0,0 +1,185 @@
+# Battery governor
+'''
+Decides how hard the MagTag may work for the rest of the day from what is
+left in the battery.
+
+measure() reads the battery through the MagTag's 1:2 divider SAMPLES
+times and averages the middle half; a single read of the ESP32-S2's ADC
+is tens of millivolts off. record() keeps one measurement per
+RECORD_INTERVAL in a ring in sleep memory. It is fed at wake, before the
+radio is on, so the load does not pull the readings down.
+
+soc() turns a voltage into the charge left (0..1) on a typical LiPo
+curve. Over the history, charge() is the least-squares line through the
+readings' charge at now, which filters out what noise the oversampling
+left, and runtime() the hours until that line reaches empty. Both need
+TREND_SPAN of history; until then charge() is the last reading's.
+
+plan() picks a level for the rest of the day:
+
+    NORMAL     the live loop, polling every GAME_ON_REFRESH
+    STRETCHED  no live loop: a deep-sleep wake every LIVE_WAKE[STRETCHED]
+               seconds polls once and shows the match
+    MINIMAL    the same every LIVE_WAKE[MINIMAL], score-only renders
+
+The first level whose projected use until the last of today's matches
+ends fits in the charge left, less RESERVE, wins. If runtime() says the
+battery will not last that long at the rate it has been falling, NORMAL
+is not taken even when the projection allows it. Use is projected with
+wc_ledger's currents, per wake from what the ledger measured.
+
+    battery = wc_power.measure(voltage_pin)
+    wc_power.record(alarm.sleep_memory, clock.now(), battery)
+    level = wc_power.plan(alarm.sleep_memory, clock.now(), kickoffs)
+'''
+
+import struct
+
+import wc_ledger
+import wc_sleepmem
+
+SAMPLES = 16
+RECORD_INTERVAL = 10 * 60
+HISTORY = 16
+TREND_SPAN = 3 * 60 * 60  # history needed before its slope is trusted
+
+NORMAL = 0
+STRETCHED = 1
+MINIMAL = 2
+LEVELS = ('normal', 'stretched', 'minimal')
+LIVE_WAKE = (None, 5 * 60, 15 * 60)  # seconds between live wakes per level
+
+RESERVE = 0.1  # of BATTERY_MAH, kept for tomorrow
+MATCH_LENGTH = 2 * 60 * 60  # what is left of a match is counted up to this
+WAKE_MAS = 3.5 * (wc_ledger.AWAKE_MA + wc_ledger.RADIO_MA)  # a wake with one fetch, until measured
+
+# Open-circuit voltage of a typical LiPo cell at each tenth of charge.
+_CURVE = (3.27, 3.69, 3.73, 3.77, 3.79, 3.82, 3.87, 3.92, 3.98, 4.06, 4.20)
+
+_ENTRY = '<IH'  # device time, millivolts
+_ENTRY_SIZE = struct.calcsize(_ENTRY)
+
+
+# Battery volts from the VOLTAGE_MONITOR AnalogIn, oversampled.
+def measure(pin, samples=SAMPLES):
+    values = sorted(pin.value for n in range(samples))
+    middle = values[samples // 4:samples - samples // 4]
+    return(sum(middle) / len(middle) / 65535 * 3.3 * 2)
+
+
+# Charge left, 0..1, for a resting voltage.
+def soc(volts):
+    if volts <= _CURVE[0]:
+        return(0.0)
+    for i in range(1, len(_CURVE)):
+        if volts < _CURVE[i]:
+            return((i - 1 + (volts - _CURVE[i - 1]) / (_CURVE[i] - _CURVE[i - 1])) / 10)
+    return(1.0)
+
+
+# The history, oldest first: [(device time, volts)].
+def history(mem):
+    payload = wc_sleepmem.read(mem, 'battery')
+    if payload is None:
+        return([])
+    entries = []
+    for offset in range(0, len(payload), _ENTRY_SIZE):
+        at, millivolts = struct.unpack_from(_ENTRY, payload, offset)
+        entries.append((at, millivolts / 1000))
+    return(entries)
+
+
+# Add a measurement; within RECORD_INTERVAL of the last it replaces it.
+def record(mem, now, volts):
+    entries = history(mem)
+    if entries and now - entries[-1][0] < RECORD_INTERVAL:
+        entries.pop()
+    entries.append((now, volts))
+    entries = entries[-HISTORY:]
+    payload = bytearray()
+    for at, v in entries:
+        payload.extend(struct.pack(_ENTRY, int(at), int(v * 1000)))
+    wc_sleepmem.write(mem, 'battery', payload)
+
+
+# (charge at now, change per hour) from the least-squares line through the
+# history's charge, or None while the history spans less than TREND_SPAN.
+def _trend(entries, now):
+    if len(entries) < 2 or entries[-1][0] - entries[0][0] < TREND_SPAN:
+        return(None)
+    n = len(entries)
+    mean_t = sum(at for at, v in entries) / n
+    mean_c = sum(soc(v) for at, v in entries) / n
+    spread = sum((at - mean_t) ** 2 for at, v in entries)
+    if not spread:
+        return(None)
+    slope = sum((at - mean_t) * (soc(v) - mean_c) for at, v in entries) / spread
+    return(mean_c + slope * (now - mean_t), slope * 3600)
+
+
+# Charge left at now, 0..1, or None without a history.
+def charge(mem, now):
+    entries = history(mem)
+    if not entries:
+        return(None)
+    trend = _trend(entries, now)
+    if trend is None:
+        return(soc(entries[-1][1]))
+    return(max(0.0, min(1.0, trend[0])))
+
+
+# Hours until empty at the rate the charge has been falling, or None when
+# it has not been falling (or on USB).
+def runtime(mem, now):
+    trend = _trend(history(mem), now)
+    if trend is None or trend[1] >= 0:
+        return(None)
+    return(max(0.0, trend[0]) / -trend[1])
+
+
+# Median charge of a short wake that fetched, in mAs, from the ledger.
+def _wake_mas(mem):
+    costs = sorted(r['awake'] / 1000 * wc_ledger.AWAKE_MA + r['radio'] / 1000 * wc_ledger.RADIO_MA
+                   + r['refreshes'] * wc_ledger.REFRESH_SECONDS * wc_ledger.REFRESH_MA
+                   for r in wc_ledger.read(mem) if r['radio'] and r['awake'] < 60000)
+    return(costs[len(costs) // 2] if costs else WAKE_MAS)
+
+
+# Seconds of today's matches still to be played, and when the last ends.
+def _match_left(now, kickoffs):
+    seconds = 0
+    end = now
+    for kickoff, status in kickoffs:
+        if status == 'completed' or kickoff + MATCH_LENGTH <= now:
+            continue
+        seconds += kickoff + MATCH_LENGTH - max(now, kickoff)
+        end = max(end, kickoff + MATCH_LENGTH)
+    return(seconds, end)
+
+
+# mAh a level is projected to use from now until the last match ends.
+def projected(level, now, kickoffs, wake_mas=WAKE_MAS):
+    live, end = _match_left(now, kickoffs)
+    if level == NORMAL:
+        mas = live * (wc_ledger.AWAKE_MA + wc_ledger.RADIO_MA)
+    else:
+        mas = live / LIVE_WAKE[level] * wake_mas
+    return((mas + (end - now) * wc_ledger.SLEEP_MA) / 3600)
+
+
+# The level for the rest of the day. spent_mah is what this wake used
+# since the history was last fed (the live loop re-plans as it goes).
+def plan(mem, now, kickoffs, spent_mah=0):
+    left = charge(mem, now)
+    if left is None:
+        return(NORMAL)
+    available = (left - RESERVE) * wc_ledger.BATTERY_MAH - spent_mah
+    hours = runtime(mem, now)
+    live, end = _match_left(now, kickoffs)
+    wake_mas = _wake_mas(mem)
+    for level in (NORMAL, STRETCHED):
+        if level == NORMAL and hours is not None and hours * 3600 < end - now:
+            continue
+        if projected(level, now, kickoffs, wake_mas) <= available:
+            return(level)
+    return(MINIMAL)
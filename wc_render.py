@@ -0,0 +1,162 @@
+# Screen refresh
+'''
+Tracks which parts of the screen changed between frames and refreshes the
+e-ink panel only when something did.
+
+Views report dirty rectangles (x, y, width, height) for the labels whose
+text changed. The MagTag's EPaperDisplay can only refresh the whole
+panel, so by default the regions decide *whether* to refresh and are
+logged. A display that can refresh areas is driven through the
+partial_refresh hook with the merged regions instead.
+
+The panel also has a minimum time between refreshes. refresh() does not
+wait for it: the regions stay pending and go out with the next call, so
+updates that arrive too close together are batched into one refresh.
+flush() waits for the panel and always refreshes, for the last frame
+before deep sleep; a panel that still refuses, too soon, is waited out
+and tried once more.
+
+run() is the same as an asyncio task: it sleeps until something is
+invalidated, then until the panel is ready, and refreshes once for
+everything invalidated in the meantime.
+'''
+
+import asyncio
+import time
+
+
+# Absolute (x, y, width, height) of a display_text label, or None. A
+# bitmap_label draws its whole bitmap, which runs to the font's descent
+# below the bounding box, so that is the area it covers.
+def label_box(item):
+    scale = item.scale
+    tilegrid = getattr(item, '_tilegrid', None)
+    if tilegrid is not None and item.text:
+        bitmap = tilegrid.bitmap
+        return((item.x + tilegrid.x * scale, item.y + tilegrid.y * scale,
+                bitmap.width * scale, bitmap.height * scale))
+    x, y, width, height = item.bounding_box
+    if not width or not height:
+        return(None)
+    return((item.x + x * scale, item.y + y * scale, width * scale, height * scale))
+
+
+def union(a, b):
+    if a is None:
+        return(b)
+    if b is None:
+        return(a)
+    x = min(a[0], b[0])
+    y = min(a[1], b[1])
+    return((x, y, max(a[0] + a[2], b[0] + b[2]) - x, max(a[1] + a[3], b[1] + b[3]) - y))
+
+
+def overlaps(a, b):
+    return(a[0] < b[0] + b[2] and b[0] < a[0] + a[2]
+           and a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+
+# Merge overlapping rectangles until none overlap.
+def merge(rects):
+    merged = []
+    for rect in rects:
+        if rect is None:
+            continue
+        i = 0
+        while i < len(merged):
+            if overlaps(rect, merged[i]):
+                rect = union(rect, merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return(merged)
+
+
+class Renderer:
+
+    def __init__(self, display, partial_refresh=None):
+        self.display = display
+        self.partial_refresh = partial_refresh
+        self.dirty = []
+        self.refreshes = 0
+        self.batched = 0  # calls that found the panel busy
+        self._changed = None  # made by run(), in the running event loop
+
+    def _wake(self):
+        if self._changed is not None and self.dirty:
+            self._changed.set()
+
+    def invalidate(self, rects):
+        self.dirty = merge(self.dirty + list(rects))
+        self._wake()
+
+    def invalidate_all(self):
+        self.dirty = [(0, 0, self.display.width, self.display.height)]
+        self._wake()
+
+    # Counted, and the regions cleared, only once the panel took it.
+    def _refresh(self):
+        regions = self.dirty
+        print('Refreshing regions: {}'.format(regions))
+        if self.partial_refresh is not None:
+            self.partial_refresh(regions)
+        else:
+            self.display.refresh()
+        self.dirty = []
+        self.refreshes += 1
+
+    def _wait(self, seconds):
+        if seconds > 0:
+            print('waiting {:0.1f}s before refresh()'.format(seconds))
+            time.sleep(seconds)
+
+    # Refresh if anything is dirty and the panel is ready.
+    # Returns True when the panel was refreshed.
+    def refresh(self):
+        if not self.dirty:
+            return(False)
+        if self.display.time_to_refresh > 0:
+            self.batched += 1
+            print('Panel busy for {:0.1f}s, update batched'.format(self.display.time_to_refresh))
+            return(False)
+        self._refresh()
+        return(True)
+
+    # Wait for the panel and refresh the whole screen.
+    def flush(self):
+        self._wait(self.display.time_to_refresh)
+        self.invalidate_all()
+        try:
+            self._refresh()
+        except RuntimeError as too_soon_error:
+            # The panel can still be busy once time_to_refresh is 0.
+            print(too_soon_error)
+            self.batched += 1
+            self._wait(self.display.time_to_refresh + 1)
+            self._refresh()
+
+    # Renderer task: refreshes whenever something is dirty, as soon as the
+    # panel's minimum refresh interval allows. Updates that arrive while
+    # it waits for the panel go out together in that one refresh.
+    async def run(self):
+        changed = self._changed = asyncio.Event()
+        try:
+            while True:
+                while not self.dirty:
+                    changed.clear()
+                    await changed.wait()
+                wait = self.display.time_to_refresh
+                if wait > 0:
+                    self.batched += 1
+                    await asyncio.sleep(wait)
+                    continue
+                self._refresh()
+        finally:
+            if self._changed is changed:
+                self._changed = None
+
+    # Wait until run() has refreshed everything invalidated.
+    async def idle(self):
+        while self.dirty:
+            await asyncio.sleep(0.05)
@@ -0,0 +1,112 @@
+# Sleep memory slots
+'''
+alarm.sleep_memory keeps its contents through deep sleep (not through a
+power cycle). This module splits it into fixed slots so each feature can
+keep a small record there without stepping on the others.
+
+Each slot starts with a 6-byte header: magic, version, payload length and
+a Fletcher-16 checksum. read() returns None when the slot was never
+written, was written by another version, or is corrupt.
+
+Any bytearray-like object works in place of alarm.sleep_memory, which is
+how the host tools exercise this module.
+
+A record that should outlive a power cycle as well is also kept in a
+file on the CIRCUITPY drive, framed the same way (read_file(),
+write_file()).
+'''
+
+import struct
+
+MAGIC = 0x57  # 'W'
+HEADER = '<BBHH'  # magic, version, length, checksum
+HEADER_SIZE = struct.calcsize(HEADER)
+
+# name: (offset, size). size includes the header.
+SLOTS = {
+    'wake': (0, 64),
+    'schedule': (64, 192),
+    'wifi': (256, 40),
+    'ledger': (296, 880),
+    'clock': (1176, 32),
+    'motion': (1208, 8),
+    'battery': (1216, 104),
+    'team': (1320, 160),
+    }
+
+
+def checksum(data):
+    a = 0
+    b = 0
+    for c in data:
+        a = (a + c) % 255
+        b = (b + a) % 255
+    return((b << 8) | a)
+
+
+# Frame a payload with the header. Also used for the file fallbacks.
+def pack(payload, version=1):
+    return(struct.pack(HEADER, MAGIC, version, len(payload), checksum(payload)) + bytes(payload))
+
+
+# Check the header and return the payload, or None.
+def unpack(data, version=1, max_length=0xFFFF):
+    if len(data) < HEADER_SIZE:
+        return(None)
+    magic, found_version, length, check = struct.unpack_from(HEADER, data)
+    if magic != MAGIC or found_version != version or length > max_length:
+        return(None)
+    payload = bytes(data[HEADER_SIZE:HEADER_SIZE + length])
+    if len(payload) != length or checksum(payload) != check:
+        return(None)
+    return(payload)
+
+
+def write(mem, name, payload, version=1):
+    offset, size = SLOTS[name]
+    if len(payload) > size - HEADER_SIZE:
+        raise ValueError('{} record too big: {} bytes'.format(name, len(payload)))
+    data = pack(payload, version)
+    mem[offset:offset + len(data)] = data
+
+
+def read(mem, name, version=1):
+    offset, size = SLOTS[name]
+    if len(mem) < offset + size:
+        return(None)
+    return(unpack(mem[offset:offset + size], version, size - HEADER_SIZE))
+
+
+def clear(mem, name):
+    offset, size = SLOTS[name]
+    mem[offset:offset + HEADER_SIZE] = bytes(HEADER_SIZE)
+
+
+# The payload of a file written by write_file(), or None.
+def read_file(file_name, version=1):
+    try:
+        with open(file_name, 'rb') as fp:
+            return(unpack(fp.read(), version))
+    except OSError:
+        return(None)
+
+
+# Write payload to file_name, framed as in a slot, unless the file holds
+# exactly that already: each write erases a block of flash. Code can
+# only write to the drive when boot.py gave it the drive. Returns True
+# when the file was written.
+def write_file(file_name, payload, version=1):
+    data = pack(payload, version)
+    try:
+        with open(file_name, 'rb') as fp:
+            if fp.read() == data:
+                return(False)
+    except OSError:
+        pass
+    try:
+        with open(file_name, 'wb') as fp:
+            fp.write(data)
+    except OSError as e:  # the drive is the computer's, see boot.py
+        print('{} not written: {}'.format(file_name, e))
+        return(False)
+    return(True)
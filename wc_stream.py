@@ -0,0 +1,263 @@
+# Selective JSON reader
+'''
+Reads a JSON document straight from a socket or file in small chunks and
+keeps only the values whose key path was asked for. Everything else is
+skipped byte by byte without being built, so the heap never holds the
+whole payload.
+
+The result has the same shape as json.loads() would give, pruned down to
+the selected paths, so code like wc_match.from_json() can index it as before:
+
+    current_match = wc_stream.select(response, CURRENT_MATCH_PATHS)
+    current_match[0]['home_team']['goals']
+
+Paths are tuples of keys. Use '*' to match every item of an array.
+'''
+
+# Key paths used by wc_match.from_json() on /matches/current
+CURRENT_MATCH_PATHS = (
+    ('*', 'home_team', 'country'),
+    ('*', 'home_team', 'name'),
+    ('*', 'home_team', 'goals'),
+    ('*', 'home_team', 'penalties'),
+    ('*', 'away_team', 'country'),
+    ('*', 'away_team', 'name'),
+    ('*', 'away_team', 'goals'),
+    ('*', 'away_team', 'penalties'),
+    ('*', 'time'),
+    ('*', 'location'),
+    ('*', 'stage_name'),
+    ('*', 'home_team_lineup', 'tactics'),
+    ('*', 'away_team_lineup', 'tactics'),
+    )
+
+CHUNK_SIZE = 256
+
+_WHITESPACE = b' \t\r\n'
+_QUOTE = 0x22  # "
+_BACKSLASH = 0x5C  # \
+_ESCAPES = {
+    0x22: 0x22, 0x5C: 0x5C, 0x2F: 0x2F,
+    0x62: 0x08, 0x66: 0x0C, 0x6E: 0x0A, 0x72: 0x0D, 0x74: 0x09,
+    }
+_NUMBER_END = b',]} \t\r\n'
+_REPLACEMENT = '\ufffd'.encode('utf-8')
+
+
+# Turn a list of key paths into a tree of dicts.
+# A leaf (True) means "keep this whole value".
+def path_tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        for key in path[:-1]:
+            child = node.get(key)
+            if child is None or child is True:
+                child = {}
+                node[key] = child
+            node = child
+        node[path[-1]] = True
+    return(tree)
+
+
+class _Reader:
+    # Pulls bytes from a chunked source one at a time.
+
+    def __init__(self, source, chunk_size):
+        self._buf = b''
+        self._pos = 0
+        self.bytes_read = 0
+        if hasattr(source, 'iter_content'):  # adafruit_requests.Response
+            self._chunks = source.iter_content(chunk_size)
+            self._source = None
+        else:  # file or socket
+            self._chunks = None
+            self._source = source
+            self._block = bytearray(chunk_size)
+
+    def _fill(self):
+        if self._chunks is not None:
+            for chunk in self._chunks:
+                if chunk:
+                    self._buf = chunk
+                    break
+            else:
+                self._buf = b''
+        else:
+            n = self._source.readinto(self._block)
+            self._buf = memoryview(self._block)[0:n] if n else b''
+        self._pos = 0
+        self.bytes_read += len(self._buf)
+        if not self._buf:
+            raise ValueError('Unexpected end of JSON')
+
+    def next(self):
+        if self._pos >= len(self._buf):
+            self._fill()
+        c = self._buf[self._pos]
+        self._pos += 1
+        return(c)
+
+    def next_token(self):
+        c = self.next()
+        while c in _WHITESPACE:
+            c = self.next()
+        return(c)
+
+    def peek_token(self):
+        c = self.next_token()
+        self._pos -= 1
+        return(c)
+
+
+# Skip the string whose opening quote was already read.
+def _skip_string(r):
+    c = r.next()
+    while c != _QUOTE:
+        if c == _BACKSLASH:
+            r.next()
+        c = r.next()
+
+
+# A \uD83D\uDE00 surrogate pair is one character; a surrogate without its
+# other half becomes U+FFFD, as it has no UTF-8 encoding.
+def _read_string(r):
+    out = bytearray()
+    high = None  # a high surrogate waiting for its low half
+    c = r.next()
+    while c != _QUOTE:
+        code = None
+        if c == _BACKSLASH:
+            c = r.next()
+            if c == 0x75:  # \uXXXX
+                code = int(bytes((r.next(), r.next(), r.next(), r.next())).decode(), 16)
+            else:
+                c = _ESCAPES.get(c, c)
+        if high is not None:
+            if code is not None and 0xDC00 <= code <= 0xDFFF:
+                code = 0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)
+            else:
+                out.extend(_REPLACEMENT)
+            high = None
+        if code is None:
+            out.append(c)
+        elif 0xD800 <= code <= 0xDBFF:
+            high = code
+        elif 0xDC00 <= code <= 0xDFFF:
+            out.extend(_REPLACEMENT)
+        else:
+            out.extend(chr(code).encode('utf-8'))
+        c = r.next()
+    if high is not None:
+        out.extend(_REPLACEMENT)
+    return(out.decode('utf-8'))
+
+
+# Read a bare literal (number, true, false, null) starting with c.
+def _read_literal(r, c):
+    out = bytearray((c,))
+    while True:
+        c = r.next()
+        if c in _NUMBER_END:
+            r._pos -= 1
+            break
+        out.append(c)
+    if out == b'true':
+        return(True)
+    if out == b'false':
+        return(False)
+    if out == b'null':
+        return(None)
+    out = out.decode('utf-8')
+    if '.' in out or 'e' in out or 'E' in out:
+        return(float(out))
+    return(int(out))
+
+
+def _skip_value(r):
+    c = r.next_token()
+    if c == _QUOTE:
+        _skip_string(r)
+    elif c == 0x7B or c == 0x5B:  # { or [
+        depth = 1
+        while depth:
+            c = r.next()
+            if c == _QUOTE:
+                _skip_string(r)
+            elif c == 0x7B or c == 0x5B:
+                depth += 1
+            elif c == 0x7D or c == 0x5D:
+                depth -= 1
+    else:
+        while r.next() not in _NUMBER_END:
+            pass
+        r._pos -= 1
+
+
+# Read the next value, keeping only what the tree node selects.
+def _select_value(r, node, max_items):
+    c = r.next_token()
+    if c == 0x7B:  # {
+        result = {}
+        if r.peek_token() == 0x7D:
+            r.next_token()
+            return(result)
+        while True:
+            if r.next_token() != _QUOTE:
+                raise ValueError('Expected object key')
+            key = _read_string(r)
+            if r.next_token() != 0x3A:  # :
+                raise ValueError('Expected colon')
+            child = True if node is True else node.get(key)
+            if child is None:
+                _skip_value(r)
+            else:
+                result[key] = _select_value(r, child, None)
+            c = r.next_token()
+            if c == 0x7D:
+                return(result)
+            if c != 0x2C:  # ,
+                raise ValueError('Expected comma')
+    if c == 0x5B:  # [
+        result = []
+        if r.peek_token() == 0x5D:
+            r.next_token()
+            return(result)
+        i = 0
+        while True:
+            if node is True:
+                child = True
+            else:
+                child = node.get('*', node.get(str(i)))
+            if child is None or (max_items is not None and i >= max_items):
+                _skip_value(r)
+            else:
+                result.append(_select_value(r, child, None))
+            i += 1
+            c = r.next_token()
+            if c == 0x5D:
+                return(result)
+            if c != 0x2C:
+                raise ValueError('Expected comma')
+    if node is not True:  # a scalar where a container was selected
+        r._pos -= 1
+        _skip_value(r)
+        return(None)
+    if c == _QUOTE:
+        return(_read_string(r))
+    return(_read_literal(r, c))
+
+
+# Parse a JSON stream, keeping only the given key paths.
+# source: adafruit_requests.Response, a socket or a file opened 'rb'.
+# max_items: keep at most this many items of a top-level array.
+def select(source, paths, chunk_size=CHUNK_SIZE, max_items=None):
+    r = _Reader(source, chunk_size)
+    tree = paths if isinstance(paths, dict) else path_tree(paths)
+    return(_select_value(r, tree, max_items))
+
+
+# Same as select(), for a JSON file on the CIRCUITPY drive.
+def select_file(file_name, paths, chunk_size=CHUNK_SIZE, max_items=None):
+    with open(file_name, 'rb') as fp:
+        return(select(fp, paths, chunk_size, max_items))
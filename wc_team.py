@@ -0,0 +1,250 @@
+# Favorite team digest
+'''
+Everything the favorite-team view shows, kept as one small record so a
+wake on its side reads it instead of fetching and scanning the
+tournament: the team's results, its group table (played, won, drawn,
+lost, goals for and against of each team in the group, so its position)
+and its next fixture.
+
+The digest is brought up to date incrementally by update() from the
+/matches responses the schedule views already fetch (wc_fetch), each
+finished match applied once by its id. The group is learned from the
+team's group-stage fixtures: from the fixture index at once (seed()),
+else as they turn up in the responses; without an index, a match
+between two other teams counts only once the digest knows both are in
+the group. The responses cover only the days fetched, so matches can be
+missed for good: the position is shown only while the index says every
+group match played by now has been applied, else 'Position unknown'.
+It is kept in a sleep memory slot, with a copy on the
+CIRCUITPY drive that outlives a power cycle (when boot.py gave code the
+drive), as wc_cache keeps the schedule.
+
+Record (little-endian), framed by wc_sleepmem:
+
+    header   '<3sI3sBBBB'  team, next kickoff (epoch, UTC, 0 when not
+                           known), next opponent, ranked (1 when the
+                           table is complete), table rows, results,
+                           applied ids
+    table    '<3sBBBBBB'   per team: code, played, won, drawn, lost,
+                           goals for, goals against
+    results  '<H3sBB'      per finished match of the team, oldest first:
+                           match id, opponent, goals for, goals against
+    applied  '<H'          ids of the finished matches applied
+'''
+
+import struct
+
+import wc_sleepmem
+from wc_nextmatch import kickoff_text
+from wc_teams import team_name
+from wc_time import iso_to_epoch
+
+VERSION = 2
+DIGEST_FILE = '/wc_team.bin'
+GROUP_STAGE = 'First stage'  # worldcupjson's stage_name for the groups
+MAX_TEAMS = 4
+MAX_RESULTS = 7  # a group's three and the four knockout rounds
+MAX_APPLIED = 16  # the group's six matches and the team's knockouts
+MATCH_LENGTH = 2 * 60 * 60  # a group match is over this long after kickoff
+
+_HEADER = '<3sI3sBBBB'
+_TEAM = '<3sBBBBBB'
+_RESULT = '<H3sBB'
+_ID = '<H'
+
+WIDTH = 21  # characters of terminalio.FONT across the MagTag on its side
+BLANK = ' '  # bitmap_label loses the height of an empty line
+
+
+def _ordinal(n):
+    return('{}{}'.format(n, {1: 'st', 2: 'nd', 3: 'rd'}.get(n, 'th')))
+
+
+class TeamDigest:
+
+    def __init__(self, team):
+        self.team = team
+        self.next_kickoff = 0
+        self.next_opponent = ''
+        self.ranked = False
+        self.table = []  # [code, played, won, drawn, lost, goals for, goals against]
+        self.results = []  # (match id, opponent, goals for, goals against)
+        self.applied = []
+
+    def encode(self):
+        payload = bytearray(struct.pack(
+            _HEADER, self.team.encode(), self.next_kickoff, self.next_opponent.encode(),
+            self.ranked, len(self.table), len(self.results), len(self.applied)))
+        for row in self.table:
+            payload.extend(struct.pack(_TEAM, row[0].encode(), *row[1:]))
+        for match_id, opponent, goals_for, goals_against in self.results:
+            payload.extend(struct.pack(_RESULT, match_id, opponent.encode(), goals_for, goals_against))
+        for match_id in self.applied:
+            payload.extend(struct.pack(_ID, match_id))
+        return(payload)
+
+    @classmethod
+    def decode(cls, payload):
+        team, next_kickoff, next_opponent, ranked, teams, results, applied = struct.unpack_from(
+            _HEADER, payload)
+        digest = cls(team.decode())
+        digest.next_kickoff = next_kickoff
+        digest.next_opponent = next_opponent.rstrip(b'\0').decode()
+        digest.ranked = bool(ranked)
+        offset = struct.calcsize(_HEADER)
+        for i in range(teams):
+            row = list(struct.unpack_from(_TEAM, payload, offset))
+            row[0] = row[0].decode()
+            digest.table.append(row)
+            offset += struct.calcsize(_TEAM)
+        for i in range(results):
+            match_id, opponent, goals_for, goals_against = struct.unpack_from(_RESULT, payload, offset)
+            digest.results.append((match_id, opponent.decode(), goals_for, goals_against))
+            offset += struct.calcsize(_RESULT)
+        for i in range(applied):
+            digest.applied.append(struct.unpack_from(_ID, payload, offset)[0])
+            offset += struct.calcsize(_ID)
+        return(digest)
+
+    # The group table row of code; with add, a new one while there is room.
+    def _row(self, code, add=False):
+        for row in self.table:
+            if row[0] == code:
+                return(row)
+        if add and len(self.table) < MAX_TEAMS and code not in ('---', 'TBD'):
+            row = [code, 0, 0, 0, 0, 0, 0]
+            self.table.append(row)
+            return(row)
+        return(None)
+
+    def _fixture(self, kickoff, home, away, group, now):
+        if self.team not in (home, away):
+            return
+        if group:
+            self._row(home, add=True)
+            self._row(away, add=True)
+        if kickoff > now and (self.next_kickoff <= now or kickoff < self.next_kickoff):
+            self.next_kickoff = kickoff
+            self.next_opponent = away if home == self.team else home
+
+    # Learn the group and the next fixture from a wc_fixtures index.
+    def seed(self, index, now):
+        for kickoff, match_id, home, away, venue, stage in index.team(self.team):
+            self._fixture(kickoff, home.decode(), away.decode(),
+                          index.stage(stage) == GROUP_STAGE, now)
+
+    # Whether every group match between the table's teams that is over by
+    # now (from the index) has been applied, so the table is the real one.
+    def _complete(self, index, now):
+        codes = [row[0].encode() for row in self.table]
+        if len(codes) < MAX_TEAMS:
+            return(False)
+        for i in range(index.count):
+            kickoff, match_id, home, away, venue, stage = index.record(i)
+            if kickoff + MATCH_LENGTH > now:
+                break  # records are in kickoff order
+            if (home in codes and away in codes and match_id not in self.applied
+                    and index.stage(stage) == GROUP_STAGE):
+                return(False)
+        return(True)
+
+    # Apply a /matches response (match dicts). now is UTC. With a fixture
+    # index, the group and the next fixture are looked up there while the
+    # digest lacks them, and the table is checked for missed matches;
+    # without one, the position is not known. Returns True when the
+    # digest changed.
+    def update(self, matches, now, index=None):
+        before = self.encode()
+        if self.next_kickoff and self.next_kickoff <= now:
+            self.next_kickoff = 0
+            self.next_opponent = ''
+        if index is not None and (not self.table or not self.next_kickoff):
+            self.seed(index, now)  # first, so the response's matches all count
+        for match in matches:
+            home = match['home_team'].get('country') or '---'
+            away = match['away_team'].get('country') or '---'
+            group = match.get('stage_name') == GROUP_STAGE
+            self._fixture(iso_to_epoch(match['datetime']), home, away, group, now)
+            match_id = match.get('id') or 0
+            if match.get('status') != 'completed' or match_id in self.applied:
+                continue
+            home_goals = match['home_team'].get('goals') or 0
+            away_goals = match['away_team'].get('goals') or 0
+            applied = False
+            if group and self._row(home) and self._row(away):
+                for row, scored, conceded in ((self._row(home), home_goals, away_goals),
+                                              (self._row(away), away_goals, home_goals)):
+                    row[1] += 1
+                    row[2 if scored > conceded else 3 if scored == conceded else 4] += 1
+                    row[5] += scored
+                    row[6] += conceded
+                applied = True
+            if self.team in (home, away):
+                if home == self.team:
+                    self.results.append((match_id, away, home_goals, away_goals))
+                else:
+                    self.results.append((match_id, home, away_goals, home_goals))
+                self.results = self.results[-MAX_RESULTS:]
+                applied = True
+            if applied:
+                self.applied = (self.applied + [match_id])[-MAX_APPLIED:]
+        self.ranked = index is not None and self._complete(index, now)
+        return(self.encode() != before)
+
+    # The table, leader first: points, goal difference, goals for.
+    def standings(self):
+        return(sorted(self.table, key=lambda r: (-(3 * r[2] + r[3]), r[6] - r[5], -r[5], r[0])))
+
+    # Position in the group, 1 first, or None before the group is known.
+    def position(self):
+        for n, row in enumerate(self.standings()):
+            if row[0] == self.team:
+                return(n + 1)
+        return(None)
+
+    # (title, body) for the view. tz_seconds converts kickoffs to local.
+    def texts(self, tz_seconds=0):
+        lines = []
+        position = self.position()
+        if position is not None and not self.ranked:
+            lines.append('Position unknown')
+            lines.append(BLANK)
+        elif position is not None:
+            lines.append('Group: {} of {}'.format(_ordinal(position), len(self.table)))
+            lines.append('    P W D L  GD Pts')
+            for code, played, won, drawn, lost, scored, conceded in self.standings():
+                lines.append('{:<3} {} {} {} {} {:>+3} {:>3}'.format(
+                    code, played, won, drawn, lost, scored - conceded, 3 * won + drawn))
+            lines.append(BLANK)
+        lines.append('Results')
+        for match_id, opponent, scored, conceded in self.results[-4:]:
+            outcome = 'W' if scored > conceded else 'D' if scored == conceded else 'L'
+            lines.append('{} {}-{} {}'.format(outcome, scored, conceded, team_name(opponent)))
+        if not self.results:
+            lines.append('None yet')
+        lines.append(BLANK)
+        lines.append('Next')
+        if self.next_kickoff:
+            lines.append(kickoff_text(self.next_kickoff + tz_seconds))
+            lines.append('v {}'.format(team_name(self.next_opponent)))
+        else:
+            lines.append('Not known yet')
+        return(team_name(self.team), '\n'.join(line[:WIDTH] for line in lines))
+
+
+# The digest of team from sleep memory, else the drive, else a new one.
+def load(mem, team):
+    payload = wc_sleepmem.read(mem, 'team', VERSION)
+    if payload is None:
+        payload = wc_sleepmem.read_file(DIGEST_FILE, VERSION)
+    if payload is not None:
+        digest = TeamDigest.decode(payload)
+        if digest.team == team:
+            return(digest)
+    return(TeamDigest(team))
+
+
+def save(mem, digest):
+    payload = digest.encode()
+    wc_sleepmem.write(mem, 'team', payload, VERSION)
+    wc_sleepmem.write_file(DIGEST_FILE, payload, VERSION)
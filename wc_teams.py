@@ -0,0 +1,45 @@
+# Team names
+'''
+FIFA codes to the team names used on the schedule, for records that only
+keep the 3-letter code (schedule cache, fixture index). Unknown codes are
+shown as the code itself.
+'''
+
+TEAMS = {
+    'ARG': 'Argentina',
+    'AUS': 'Australia',
+    'BEL': 'Belgium',
+    'BRA': 'Brazil',
+    'CAN': 'Canada',
+    'CMR': 'Cameroon',
+    'CRC': 'Costa Rica',
+    'CRO': 'Croatia',
+    'DEN': 'Denmark',
+    'ECU': 'Ecuador',
+    'ENG': 'England',
+    'ESP': 'Spain',
+    'FRA': 'France',
+    'GER': 'Germany',
+    'GHA': 'Ghana',
+    'IRN': 'Iran',
+    'JPN': 'Japan',
+    'KOR': 'South Korea',
+    'KSA': 'Saudi Arabia',
+    'MAR': 'Morocco',
+    'MEX': 'Mexico',
+    'NED': 'Netherlands',
+    'POL': 'Poland',
+    'POR': 'Portugal',
+    'QAT': 'Qatar',
+    'SEN': 'Senegal',
+    'SRB': 'Serbia',
+    'SUI': 'Switzerland',
+    'TUN': 'Tunisia',
+    'URU': 'Uruguay',
+    'USA': 'United States',
+    'WAL': 'Wales',
+    }
+
+
+def team_name(code):
+    return(TEAMS.get(code, code))
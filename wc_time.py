@@ -0,0 +1,52 @@
+# Time helpers
+'''
+Small time helpers that avoid building adafruit_datetime objects.
+Epochs are seconds since 1970-01-01, like time.time().
+'''
+
+DAY = 24 * 60 * 60
+
+
+# Days since 1970-01-01 for a civil date (proleptic Gregorian).
+def days_from_civil(year, month, day):
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return(era * 146097 + doe - 719468)
+
+
+# '2022-11-27T19:00:00Z' -> epoch seconds (UTC).
+# Only the first 19 characters are read, like wc_schedule() does.
+def iso_to_epoch(iso):
+    days = days_from_civil(int(iso[0:4]), int(iso[5:7]), int(iso[8:10]))
+    return(days * DAY + int(iso[11:13]) * 3600 + int(iso[14:16]) * 60 + int(iso[17:19]))
+
+
+# Start of the next day after epoch.
+def next_midnight(epoch):
+    return((epoch // DAY + 1) * DAY)
+
+
+# Civil date (year, month, day) for days since 1970-01-01.
+def civil_from_days(days):
+    days += 719468
+    era = days // 146097
+    doe = days - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    year = yoe + era * 400 + (1 if month <= 2 else 0)
+    return(year, month, day)
+
+
+# Epoch seconds -> '2022-11-27T19:00:00Z'
+def epoch_to_iso(epoch):
+    year, month, day = civil_from_days(epoch // DAY)
+    seconds = epoch % DAY
+    return('{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}Z'.format(
+        year, month, day, seconds // 3600, seconds // 60 % 60, seconds % 60))
@@ -0,0 +1,131 @@
+# Time sources
+'''
+Where code.py gets the time from when wc_clock asks for a sync. Each
+source has fetch(), which returns the UTC epoch in whole seconds or
+raises, and keeps the latency and bytes of its last fetch:
+
+    SNTPSource      one UDP exchange with an NTP server: 48 bytes each
+                    way, no TLS session to set up. The round-trip delay is
+                    measured and half of it added, as SNTP does.
+    HTTPTimeSource  the AIO time feed over HTTPS, the fallback.
+
+fetch_time() tries them in order and returns the first answer.
+
+    sources = [SNTPSource(pool, 'pool.ntp.org'), HTTPTimeSource(requests, AIO_TIME)]
+    utc, source = fetch_time(sources)
+
+Epochs are kept as integers: CircuitPython floats cannot hold a whole
+epoch to the second.
+'''
+
+import struct
+import time
+
+NTP_EPOCH = 2208988800  # 1900-01-01 to 1970-01-01
+NTP_PORT = 123
+NTP_TIMEOUT = 1  # seconds; a LAN server answers in milliseconds
+_NTP_PACKET_SIZE = 48
+_UDP_OVERHEAD = 28  # IP and UDP headers per datagram
+
+
+class SNTPSource:
+    name = 'sntp'
+
+    def __init__(self, pool, server='pool.ntp.org', port=NTP_PORT, timeout=NTP_TIMEOUT):
+        self._pool = pool
+        self.server = server
+        self.port = port
+        self.timeout = timeout
+        self.latency = None  # seconds, request to reply
+        self.delay = None  # latency less the server's own time
+        self.bytes = 0
+
+    def fetch(self):
+        self.latency = self.delay = None
+        self.bytes = 0
+        packet = bytearray(_NTP_PACKET_SIZE)
+        packet[0] = 0x23  # no leap warning, version 4, client
+        # Our transmit time is echoed back as the originate time, which ties
+        # the reply to this request. Any value works; a monotonic one is unique.
+        cookie = time.monotonic_ns() & 0xFFFFFFFF
+        struct.pack_into('!I', packet, 44, cookie)
+
+        address = self._pool.getaddrinfo(self.server, self.port)[0][-1]
+        with self._pool.socket(self._pool.AF_INET, self._pool.SOCK_DGRAM) as sock:
+            sock.settimeout(self.timeout)
+            sent = time.monotonic_ns()
+            sock.sendto(packet, address)
+            self.bytes += _NTP_PACKET_SIZE + _UDP_OVERHEAD
+            size = sock.recv_into(packet)
+            received = time.monotonic_ns()
+        self.bytes += size + _UDP_OVERHEAD
+
+        if size < _NTP_PACKET_SIZE:
+            raise ValueError('Short NTP reply: {} bytes'.format(size))
+        mode = packet[0] & 0x07
+        stratum = packet[1]
+        if mode != 4 or not 1 <= stratum <= 15:
+            raise ValueError('NTP reply mode {} stratum {}'.format(mode, stratum))
+        if struct.unpack_from('!I', packet, 28)[0] != cookie:
+            raise ValueError('NTP reply to another request')
+
+        receive_seconds, receive_fraction, transmit_seconds, transmit_fraction = struct.unpack_from(
+            '!IIII', packet, 32)
+        if transmit_seconds == 0:
+            raise ValueError('NTP server sent no time')
+        # Time the server held the request, in seconds. Fractions are 1/2**32 s.
+        held = (transmit_seconds - receive_seconds) + (transmit_fraction - receive_fraction) / 0x100000000
+        self.latency = (received - sent) / 1000000000
+        self.delay = max(0, self.latency - held)
+        # The server's transmit time, plus the trip back, rounded to the
+        # nearest second: truncating would set the clock up to 1 s behind,
+        # and wc_clock would take that for drift.
+        return(transmit_seconds - NTP_EPOCH + int(transmit_fraction / 0x100000000 + self.delay / 2 + 0.5))
+
+
+class HTTPTimeSource:
+    name = 'https'
+
+    def __init__(self, session, url):
+        self._session = session
+        self.url = url
+        self.latency = None
+        self.bytes = 0
+
+    def fetch(self):
+        self.latency = None
+        self.bytes = 0
+        sent = time.monotonic_ns()
+        response = self._session.get(self.url, headers={"Accept": "application/text"})
+        try:
+            text = response.text
+            self.latency = (time.monotonic_ns() - sent) / 1000000000
+            # Body and response headers; the request and TLS records are extra.
+            self.bytes = len(text) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+            if response.status_code != 200:
+                raise OSError('HTTP {} from {}'.format(response.status_code, self.url))
+        finally:
+            response.close()
+        return(int(text))
+
+
+# The UTC epoch from the first source that answers, and that source.
+# Returns (None, None) when none does.
+def fetch_time(sources):
+    for source in sources:
+        try:
+            return(source.fetch(), source)
+        except (OSError, RuntimeError, ValueError) as error:
+            print('No time from {}: {}'.format(source.name, error))
+    return(None, None)
+
+
+# Print the latency and bytes of each source that was tried.
+def report(sources):
+    for source in sources:
+        if source.latency is None and not source.bytes:
+            continue
+        if source.latency is None:
+            print('{:<6} no answer, {} B'.format(source.name, source.bytes))
+        else:
+            print('{:<6} {:0.3f} s, {} B'.format(source.name, source.latency, source.bytes))
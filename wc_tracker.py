@@ -0,0 +1,91 @@
+# Multi-match tracker
+'''
+Keeps a state table for every match in /matches/current, keyed by match
+id, so one poll (one download, one parse) serves every view. update()
+takes the parsed array and returns the changes of all matches at once,
+as (match id, change) pairs:
+
+    new         the match appeared
+    goal        either score moved
+    penalties   a shoot-out kick went in
+    tactics     a formation changed
+    event       a new booking, substitution, ... (by event id)
+    time        the match clock moved
+    ended       the match left /matches/current
+
+The table holds wc_match.MatchState records. Views read a match from it
+(by id, or by its position in the API's list) without touching the
+network, and goal() says whether its score moved in the last update.
+
+    tracker = MatchTracker()
+    current = wc_stream.select(response, wc_tracker.TRACKER_PATHS)
+    for match_id, change in tracker.update(current):
+        ...
+    tracker.match(0).home_goals
+'''
+
+import wc_match
+import wc_stream
+
+# Key paths update() reads, on top of what wc_match.from_json() reads.
+TRACKER_PATHS = wc_stream.CURRENT_MATCH_PATHS + (
+    ('*', 'id'),
+    ('*', 'home_team_events', '*', 'id'),
+    ('*', 'away_team_events', '*', 'id'),
+    )
+
+
+class MatchTracker:
+
+    def __init__(self):
+        self.matches = {}  # id -> MatchState
+        self.order = []  # ids, in the API's order
+        self.scored = set()  # ids whose score moved in the last update
+        self.updates = 0
+
+    def update(self, current_match):
+        self.updates += 1
+        changes = []
+        order = []
+        self.scored = set()
+        for item in current_match or ():
+            state = wc_match.from_json(item)
+            match_id = state.match_id
+            order.append(match_id)
+            old = self.matches.get(match_id)
+            self.matches[match_id] = state
+            if old is None:
+                changes.append((match_id, 'new'))
+                continue
+            if state == old:
+                continue
+            if wc_match.score(state) != wc_match.score(old):
+                changes.append((match_id, 'goal'))
+                self.scored.add(match_id)
+            if (state.home_penalties, state.away_penalties) != (old.home_penalties, old.away_penalties):
+                changes.append((match_id, 'penalties'))
+            if state.home_tactics != old.home_tactics or state.away_tactics != old.away_tactics:
+                changes.append((match_id, 'tactics'))
+            if state.last_event > old.last_event:
+                changes.append((match_id, 'event'))
+            if state.time != old.time:
+                changes.append((match_id, 'time'))
+        for match_id in self.order:
+            if match_id not in order:
+                del self.matches[match_id]
+                changes.append((match_id, 'ended'))
+        self.order = order
+        return(changes)
+
+    # True when the match's score moved in the last update.
+    def goal(self, match_id):
+        return(match_id in self.scored)
+
+    # The nth match in the API's order, or None.
+    def match(self, n):
+        if n < len(self.order):
+            return(self.matches[self.order[n]])
+        return(None)
+
+    def __len__(self):
+        return(len(self.order))
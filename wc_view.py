@@ -0,0 +1,295 @@
+# Live Match and schedule screens
+'''
+Builds the Live Match background and labels once and keeps them in the
+display group. Later polls only change the text of labels whose string
+actually changed, so the group never grows during a match.
+
+ScheduleView is the schedule page (title, schedule rows, footer) built
+the same way, so the live loop can keep it in its own group and switch
+to it when the MagTag is turned over.
+
+NextMatchView is the live side when no match is on: the next match's
+teams, kickoff and a countdown (wc_nextmatch).
+
+TeamView is the favorite team's page, with the MagTag on its side: its
+name over the digest's text (wc_team), in portrait.
+'''
+
+from adafruit_display_text import bitmap_label as label
+from adafruit_display_shapes.rect import Rect
+
+import wc_fonts
+from wc_render import label_box, union
+
+WIDTH = 296
+HEIGHT = 128
+PORTRAIT_WIDTH = HEIGHT
+PORTRAIT_HEIGHT = WIDTH
+
+
+def _update(labels, texts):
+    dirty = []
+    for item, text in zip(labels, texts):
+        if item.text != text:
+            old_box = label_box(item)
+            wc_fonts.prepare(item.font, text)
+            item.text = text
+            box = union(old_box, label_box(item))
+            if box is not None:
+                dirty.append(box)
+    return(dirty)
+
+
+class LiveMatchView:
+
+    # fonts: (title_font, score_font, text_font, terminal_font)
+    def __init__(self, group, fonts):
+        title_font, score_font, text_font, terminal_font = fonts
+
+        # Make the background white
+        self.rect = Rect(0, 0, WIDTH, HEIGHT, fill=0xFFFFFF, outline=0xFFFFFF)
+
+        self.game_info = label.Label(
+            terminal_font,
+            scale = 1,
+            text='',
+            color=0x000000,
+            anchor_point = (0.5, 1),
+            anchored_position = (WIDTH * 0.5 - 0, HEIGHT - 2),
+            base_alignment=True,
+        )
+
+        self.match_title = label.Label(
+            title_font,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 - 46),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.game_score = label.Label(
+            score_font,
+            scale = 1,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 - 26),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.game_tactics = label.Label(
+            text_font,
+            scale = 1,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 - 8),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.game_penalties = label.Label(
+            text_font,
+            scale = 1,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 + 10),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.page_footer = label.Label(
+            terminal_font,
+            text='',
+            bg_color=0xFFFFFF,
+            color=0x000000,
+            anchor_point = (1, 0),
+            anchored_position = (WIDTH  - 3, 2),
+            base_alignment=True,
+        )
+
+        # Same stacking order as the original screen.
+        self.labels = (
+            self.game_info,
+            self.match_title,
+            self.game_score,
+            self.game_tactics,
+            self.game_penalties,
+            self.page_footer,
+            )
+
+        group.append(self.rect)
+        for item in self.labels:
+            group.append(item)
+
+    # Set the label texts. Only labels whose text changed are touched.
+    # Returns the dirty rectangles: old and new box of each changed label.
+    def update(self, game_info, match_title, game_score, game_tactics,
+               game_penalties, page_footer):
+        return(_update(self.labels, (game_info, match_title, game_score, game_tactics,
+                                     game_penalties, page_footer)))
+
+
+class ScheduleView:
+
+    # fonts: (title_font, terminal_font)
+    def __init__(self, group, fonts):
+        title_font, terminal_font = fonts
+
+        # Make the background white
+        self.rect = Rect(0, 0, WIDTH, HEIGHT, fill=0xFFFFFF, outline=0xFFFFFF)
+
+        self.page_title = label.Label(
+            title_font,
+            text='',
+            color=0x000000,
+            anchored_position = (10, 10),
+            anchor_point = (0, 0),
+            base_alignment=True,
+        )
+
+        self.page_body = label.Label(
+            terminal_font,
+            scale = 1,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 - 0, HEIGHT * 0.5 + 0),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.page_footer = label.Label(
+            terminal_font,
+            text='',
+            bg_color=0xFFFFFF,
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 + 56),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.labels = (self.page_title, self.page_body, self.page_footer)
+
+        group.append(self.rect)
+        for item in self.labels:
+            group.append(item)
+
+    # Same as LiveMatchView.update().
+    def update(self, page_title, the_schedule, page_footer):
+        return(_update(self.labels, (page_title, the_schedule, page_footer)))
+
+
+class NextMatchView:
+
+    # fonts: (title_font, countdown_font, terminal_font)
+    def __init__(self, group, fonts):
+        title_font, countdown_font, terminal_font = fonts
+
+        # Make the background white
+        self.rect = Rect(0, 0, WIDTH, HEIGHT, fill=0xFFFFFF, outline=0xFFFFFF)
+
+        self.page_title = label.Label(
+            terminal_font,
+            text='',
+            color=0x000000,
+            anchor_point = (0, 0),
+            anchored_position = (3, 2),
+            base_alignment=True,
+        )
+
+        self.teams = label.Label(
+            title_font,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 - 30),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.countdown = label.Label(
+            countdown_font,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 + 2),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.kickoff = label.Label(
+            terminal_font,
+            text='',
+            color=0x000000,
+            anchored_position = (WIDTH * 0.5 + 0, HEIGHT * 0.5 + 28),
+            anchor_point = (0.5, 0.5),
+            base_alignment=True,
+        )
+
+        self.page_footer = label.Label(
+            terminal_font,
+            text='',
+            bg_color=0xFFFFFF,
+            color=0x000000,
+            anchor_point = (1, 0),
+            anchored_position = (WIDTH  - 3, 2),
+            base_alignment=True,
+        )
+
+        self.labels = (self.page_title, self.teams, self.countdown, self.kickoff,
+                       self.page_footer)
+
+        group.append(self.rect)
+        for item in self.labels:
+            group.append(item)
+
+    # Same as LiveMatchView.update().
+    def update(self, page_title, teams, kickoff, countdown, page_footer):
+        return(_update(self.labels, (page_title, teams, countdown, kickoff, page_footer)))
+
+
+class TeamView:
+
+    # fonts: (title_font, terminal_font)
+    def __init__(self, group, fonts):
+        title_font, terminal_font = fonts
+
+        # Make the background white
+        self.rect = Rect(0, 0, PORTRAIT_WIDTH, PORTRAIT_HEIGHT, fill=0xFFFFFF, outline=0xFFFFFF)
+
+        self.page_title = label.Label(
+            title_font,
+            text='',
+            color=0x000000,
+            anchored_position = (PORTRAIT_WIDTH * 0.5, 6),
+            anchor_point = (0.5, 0),
+            base_alignment=True,
+        )
+
+        self.page_body = label.Label(
+            terminal_font,
+            scale = 1,
+            text='',
+            color=0x000000,
+            anchored_position = (1, 34),
+            anchor_point = (0, 0),
+            base_alignment=True,
+        )
+
+        self.page_footer = label.Label(
+            terminal_font,
+            text='',
+            bg_color=0xFFFFFF,
+            color=0x000000,
+            anchored_position = (PORTRAIT_WIDTH * 0.5, PORTRAIT_HEIGHT - 2),
+            anchor_point = (0.5, 1),
+            base_alignment=True,
+        )
+
+        self.labels = (self.page_title, self.page_body, self.page_footer)
+
+        group.append(self.rect)
+        for item in self.labels:
+            group.append(item)
+
+    # Same as LiveMatchView.update().
+    def update(self, page_title, page_body, page_footer):
+        return(_update(self.labels, (page_title, page_body, page_footer)))
@@ -0,0 +1,101 @@
+# Wake planner
+'''
+Works out when the MagTag next needs to be awake, instead of always
+sleeping GAME_OFF_REFRESH:
+
+    - a few minutes before the next kickoff,
+    - at the kickoff itself, after that early wake,
+    - every IN_GAME_REFRESH while a match is being played,
+    - at midnight, to pick up the new day's schedule,
+    - when the next-match countdown changes (countdown_at), if one is up.
+
+The earliest of these wins. The plan is kept in alarm.sleep_memory so the
+next wake knows why it woke and still has the day's kickoffs.
+
+Times are in the device clock (local time, like time.time() after the RTC
+is set), matches are (kickoff, status) tuples.
+'''
+
+import struct
+
+import wc_sleepmem
+from wc_time import next_midnight
+
+KICKOFF_LEAD = 5 * 60  # wake this long before kickoff
+IN_GAME_REFRESH = 10 * 60  # schedule scores refresh while a match is on
+MATCH_LENGTH = 3 * 60 * 60  # extra time and penalties included
+MIN_SLEEP = 60
+MAX_SLEEP = 6 * 60 * 60
+# With the accelerometer armed to wake the board (wc_motion), a timer wake
+# is no longer the only way to pick up a turn, so only midnight caps it.
+MOTION_MAX_SLEEP = 24 * 60 * 60
+
+# 'turn' and 'tap' are not planned: the accelerometer woke the board.
+REASONS = ('midnight', 'kickoff', 'in_game', 'max_sleep', 'turn', 'tap', 'countdown')
+STATUSES = ('future_scheduled', 'in_progress', 'completed')
+
+_PLAN = '<IBB'  # wake_at, reason, match count
+_MATCH = '<IB'  # kickoff, status
+MAX_MATCHES = 8
+
+
+# Returns (wake_at, reason).
+def plan_wake(now, matches, in_game_refresh=IN_GAME_REFRESH, max_sleep=MAX_SLEEP,
+              countdown_at=None):
+    wake_at = next_midnight(now)
+    reason = 'midnight'
+    if countdown_at is not None and countdown_at < wake_at:
+        wake_at = countdown_at
+        reason = 'countdown'
+
+    for kickoff, status in matches:
+        if status == 'completed':
+            continue
+        if status == 'in_progress' or kickoff - KICKOFF_LEAD <= now < kickoff + MATCH_LENGTH:
+            # Polling runs from the kickoff, not from the early wake.
+            candidate = now + in_game_refresh
+            if now < kickoff:
+                candidate = min(candidate, kickoff)
+            candidate_reason = 'in_game'
+        elif now < kickoff:
+            candidate = kickoff - KICKOFF_LEAD
+            candidate_reason = 'kickoff'
+        else:  # long over, the API just never said so
+            continue
+        if candidate < wake_at:
+            wake_at = candidate
+            reason = candidate_reason
+
+    if wake_at - now > max_sleep:
+        wake_at = now + max_sleep
+        reason = 'max_sleep'
+    if wake_at - now < MIN_SLEEP:
+        wake_at = now + MIN_SLEEP
+    return(wake_at, reason)
+
+
+def _status_code(status):
+    return(STATUSES.index(status) if status in STATUSES else 255)
+
+
+def save_plan(mem, wake_at, reason, matches):
+    matches = matches[:MAX_MATCHES]
+    payload = bytearray(struct.pack(_PLAN, int(wake_at), REASONS.index(reason), len(matches)))
+    for kickoff, status in matches:
+        payload.extend(struct.pack(_MATCH, int(kickoff), _status_code(status)))
+    wc_sleepmem.write(mem, 'wake', payload)
+
+
+# Returns (wake_at, reason, matches) or None.
+def load_plan(mem):
+    payload = wc_sleepmem.read(mem, 'wake')
+    if payload is None:
+        return(None)
+    wake_at, reason, count = struct.unpack_from(_PLAN, payload)
+    matches = []
+    offset = struct.calcsize(_PLAN)
+    for i in range(count):
+        kickoff, status = struct.unpack_from(_MATCH, payload, offset)
+        matches.append((kickoff, STATUSES[status] if status < len(STATUSES) else 'unknown'))
+        offset += struct.calcsize(_MATCH)
+    return(wake_at, REASONS[reason], matches)
@@ -0,0 +1,188 @@
+# Fast WiFi reconnect
+'''
+Remembers the access point (BSSID, channel) and IP configuration of the
+last good connection in alarm.sleep_memory. The next wake connects
+straight to that access point, skipping the network scan, and can reuse
+the IP configuration to skip DHCP.
+
+The reused configuration is the one DHCP handed out, kept with the time
+it was leased and the number of wakes that have reused it since. It is
+given up for DHCP once it is LEASE_SECONDS old (half a typical day's
+lease, when a DHCP client would renew), after REUSE_WAKES wakes, when
+the clock went backwards, and after the first failed connect that used
+it, so a lease the router has handed to someone else is not kept.
+
+A full scan only happens after SCAN_AFTER failed attempts in a row.
+Instead of sleeping a fixed 10 s after connecting, the radio is polled
+until it has an address and a gateway, with a timeout.
+
+Every connect logs how long it took; the last time is kept in the record.
+'''
+
+import struct
+import time
+
+import ipaddress
+
+import wc_sleepmem
+
+CONNECT_TIMEOUT = 10  # seconds for one association
+READY_TIMEOUT = 10  # seconds to wait for an address after connecting
+SCAN_AFTER = 3  # failed attempts before scanning
+MAX_ATTEMPTS = 6  # before giving up with ConnectionError
+LEASE_SECONDS = 12 * 60 * 60  # reuse the DHCP configuration this long
+REUSE_WAKES = 24  # and for at most this many wakes
+
+VERSION = 2
+# bssid, channel, failures, ip, netmask, gateway, dns, ms, leased at, reuses
+_RECORD = '<6sBB4s4s4s4sHIB'
+
+
+def _packed(address):
+    if address is None:
+        return(bytes(4))
+    return(bytes(address.packed))
+
+
+def load(mem):
+    payload = wc_sleepmem.read(mem, 'wifi', VERSION)
+    if payload is None:
+        return(None)
+    return(list(struct.unpack(_RECORD, payload)))
+
+
+def save(mem, record):
+    wc_sleepmem.write(mem, 'wifi', struct.pack(_RECORD, *record), VERSION)
+
+
+# Record of the current connection, keeping the failure count. The IP
+# configuration is stamped with now as a new lease.
+def _record(radio, failures, elapsed_ms, now):
+    ap = radio.ap_info
+    return([
+        bytes(ap.bssid) if ap else bytes(6),
+        ap.channel if ap else 0,
+        failures,
+        _packed(radio.ipv4_address),
+        _packed(radio.ipv4_subnet),
+        _packed(radio.ipv4_gateway),
+        _packed(radio.ipv4_dns),
+        min(elapsed_ms, 0xFFFF),
+        now & 0xFFFFFFFF,
+        0,
+        ])
+
+
+# Forget the IP configuration, so the next connect runs DHCP.
+def _drop_ip(record):
+    record[3:7] = [bytes(4)] * 4
+    record[8:10] = [0, 0]
+
+
+# Whether the IP configuration in record may still be reused at now.
+def _lease_valid(record, now):
+    leased_at, reuses = record[8:10]
+    return(leased_at <= now < leased_at + LEASE_SECONDS and reuses < REUSE_WAKES)
+
+
+# Poll until the radio has an address and a gateway.
+def wait_ready(radio, timeout=READY_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while radio.ipv4_address is None or radio.ipv4_gateway is None:
+        if time.monotonic() > deadline:
+            raise ConnectionError('No IP address after {}s'.format(timeout))
+        time.sleep(0.05)
+
+
+# Scan for ssid and return (bssid, channel) of the strongest AP, or None.
+def scan(radio, ssid):
+    best = None
+    print("\nAvailable WiFi networks:")
+    for network in radio.start_scanning_networks():
+        name = network.ssid
+        if isinstance(name, bytes):
+            name = str(name, "utf-8")
+        print("  {:>18}   RSSI: {:<4}  Channel: {:<2}".format(
+            name, network.rssi, network.channel ))
+        if name == ssid and (best is None or network.rssi > best.rssi):
+            best = network
+    radio.stop_scanning_networks()
+    if best is None:
+        return(None)
+    return(bytes(best.bssid), best.channel)
+
+
+def _use_static_ip(radio, record):
+    ip, netmask, gateway, dns = record[3:7]
+    if not any(ip) or not any(gateway):
+        return(False)
+    radio.stop_dhcp()
+    radio.set_ipv4_address(
+        ipv4=ipaddress.IPv4Address(ip),
+        netmask=ipaddress.IPv4Address(netmask),
+        gateway=ipaddress.IPv4Address(gateway),
+        ipv4_dns=ipaddress.IPv4Address(dns) if any(dns) else None)
+    return(True)
+
+
+# Connect to ssid, fast when the last good AP is cached in mem.
+# Returns the connect time in ms.
+def connect(radio, ssid, password='', mem=None, reuse_ip=True):
+    start = time.monotonic_ns()
+    now = int(time.time())
+    record = load(mem) if mem is not None else None
+    failures = record[2] if record else 0
+    if record and not _lease_valid(record, now):
+        _drop_ip(record)
+    attempt = 0
+
+    while True:
+        attempt += 1
+        target = None
+        static_ip = False
+        if record and failures < SCAN_AFTER and any(record[0]):
+            target = (record[0], record[1])
+            mode = 'cached AP'
+        elif failures >= SCAN_AFTER:
+            target = scan(radio, ssid)
+            mode = 'scan'
+        else:
+            mode = 'plain'
+
+        try:
+            print("\nConnecting to {} ({})".format(ssid, mode))
+            if mode == 'cached AP' and reuse_ip:
+                static_ip = _use_static_ip(radio, record)
+            if target:
+                radio.connect(ssid, password, channel=target[1], bssid=target[0],
+                              timeout=CONNECT_TIMEOUT)
+            else:
+                radio.connect(ssid, password, timeout=CONNECT_TIMEOUT)
+            wait_ready(radio)
+            break
+        except ConnectionError as e:
+            print("Connection Error: {}".format(e))
+            failures += 1
+            if static_ip:
+                radio.start_dhcp()
+                _drop_ip(record)
+            if record:
+                record[2] = failures
+                if mem is not None:
+                    save(mem, record)
+            if attempt >= MAX_ATTEMPTS:
+                raise
+
+    elapsed_ms = (time.monotonic_ns() - start) // 1000000
+    if mem is not None:
+        if static_ip:
+            # The same lease again: keep when it was handed out.
+            record[2] = 0
+            record[7] = min(elapsed_ms, 0xFFFF)
+            record[9] += 1
+            save(mem, record)
+        else:
+            save(mem, _record(radio, 0, elapsed_ms, now))
+    print("WiFi: connected in {} ms ({}, attempt {}, failures before {})".format(
+        elapsed_ms, mode, attempt, failures))
+    return(elapsed_ms)